@@ -0,0 +1,245 @@
+"""Moteur d'agrégation partagé par les pages de l'application"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Pool partagé par toutes les sessions : les noyaux groupby/value_counts de
+# pandas/NumPy relâchent le GIL, les agrégations indépendantes s'exécutent donc
+# réellement en parallèle sur les hôtes multi-cœurs.
+MAX_WORKERS = min(8, os.cpu_count() or 1)
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='aggregation')
+
+
+def submit_aggregations(df, aggregations):
+    """Soumet les agrégations {nom: fonction(df)} au pool sans attendre, retourne {nom: future}"""
+    return {name: _executor.submit(func, df) for name, func in aggregations.items()}
+
+
+def compute_aggregations(df, aggregations):
+    """Soumet les agrégations {nom: fonction(df)} au pool et retourne {nom: résultat}"""
+    futures = submit_aggregations(df, aggregations)
+    return {name: future.result() for name, future in futures.items()}
+
+
+def yearly_counts(df):
+    """Nombre d'incidents par année"""
+    return df.groupby('iyear').size().reset_index(name='incidents')
+
+
+def monthly_pivot(df):
+    """Tableau année x mois du nombre d'incidents"""
+    monthly_data = df.groupby(['iyear', 'imonth']).size().reset_index(name='incidents')
+    return monthly_data.pivot(index='iyear', columns='imonth', values='incidents').fillna(0)
+
+
+def value_counts(column, top=None):
+    """Fabrique une agrégation value_counts sur une colonne (limitée aux `top` premiers)"""
+    def aggregate(df):
+        counts = df[column].value_counts()
+        return counts.head(top) if top is not None else counts
+    return aggregate
+
+
+def filter_incidents(df, year_range=None, country=None, regions=None, attacks=None, cities=None):
+    """Applique les filtres de la barre latérale (un filtre vide ou None est ignoré)"""
+    filtered = df
+    if year_range is not None:
+        filtered = filtered[(filtered['iyear'] >= year_range[0]) & (filtered['iyear'] <= year_range[1])]
+    if country:
+        filtered = filtered[filtered['country_txt'] == country]
+    if regions:
+        filtered = filtered[filtered['region_txt'].isin(regions)]
+    if cities:
+        filtered = filtered[filtered['city'].isin(cities)]
+    if attacks:
+        filtered = filtered[filtered['attacktype1_txt'].isin(attacks)]
+    return filtered
+
+
+def filter_options(df):
+    """Valeurs proposées par les filtres de la barre latérale"""
+    return {
+        'years': [int(df['iyear'].min()), int(df['iyear'].max())],
+        'countries': sorted(df['country_txt'].dropna().unique().tolist()),
+        'regions': sorted(df['region_txt'].dropna().unique().tolist()),
+        'attack_types': sorted(df['attacktype1_txt'].dropna().unique().tolist()),
+    }
+
+
+def default_filters(options):
+    """Filtres appliqués à l'ouverture de la page principale"""
+    return dict(
+        year_range=tuple(options['years']),
+        country=None,
+        regions=options['regions'][:5],
+        attacks=options['attack_types'][:3]
+    )
+
+
+def headline_metrics(filtered, total):
+    """Métriques principales d'une sélection de `total` incidents au départ"""
+    return {
+        'incidents': len(filtered),
+        'delta': len(filtered) - total,
+        'killed': int(filtered['nkill'].sum()) if 'nkill' in filtered.columns else 0,
+        'wounded': int(filtered['nwound'].sum()) if 'nwound' in filtered.columns else 0,
+        'countries': int(filtered['country_txt'].nunique()),
+    }
+
+
+def build_summary(df):
+    """Résumé minuscule (options des filtres, métriques de la vue par défaut) affiché avant le chargement complet"""
+    options = filter_options(df)
+    default_view = filter_incidents(df, **default_filters(options))
+    return {
+        'rows': len(df),
+        'options': options,
+        'default_metrics': headline_metrics(default_view, len(df)),
+    }
+
+
+def france_subset(df):
+    """Incidents dont le pays contient 'France'"""
+    return df[df['country_txt'].str.contains('France', case=False, na=False)]
+
+
+def city_aggregates(map_data):
+    """Nombre d'incidents, victimes et première/dernière attaque par ville géolocalisée"""
+    # Victimes déjà normalisées au nettoyage (manquantes -> 0)
+    cities = map_data.groupby(['city', 'latitude', 'longitude']).agg(
+        nombre_incidents=('iyear', 'size'),
+        total_tues=('nkill', 'sum'),
+        total_blesses=('nwound', 'sum'),
+        premiere_attaque=('iyear', 'min'),
+        derniere_attaque=('iyear', 'max'),
+    ).reset_index()
+    cities[['total_tues', 'total_blesses']] = cities[['total_tues', 'total_blesses']].astype('int64')
+    return cities
+
+
+def group_stats(df, top=15):
+    """Incidents, victimes et période d'activité des groupes les plus actifs"""
+    stats = df.groupby('gname').agg(
+        Incidents=('eventid', 'count'),
+        Tués=('nkill', 'sum'),
+        Blessés=('nwound', 'sum'),
+        Début=('iyear', 'min'),
+        Fin=('iyear', 'max'),
+    )
+    stats[['Tués', 'Blessés']] = stats[['Tués', 'Blessés']].astype('int64')
+    stats = stats.sort_values('Incidents', ascending=False).head(top)
+    stats['Période'] = stats['Fin'] - stats['Début']
+    return stats
+
+
+# Strates de l'échantillon d'aperçu
+SAMPLE_STRATA = ['iyear', 'region_txt']
+
+
+def stratified_sample(df, fraction=0.05, min_per_stratum=5, seed=0):
+    """Échantillon stratifié par année et région, avec les effectifs de chaque strate"""
+    stratum = df.groupby(SAMPLE_STRATA, sort=False, dropna=False).ngroup().to_numpy()
+    population = np.bincount(stratum)
+    # Taille d'échantillon par strate, au moins `min_per_stratum` lignes sans dépasser la strate
+    sample_sizes = np.minimum(population, np.maximum(min_per_stratum, np.ceil(population * fraction))).astype(int)
+
+    # Tirage sans remise : clé aléatoire, rang dans la strate, on garde les n_h premiers
+    keys = np.random.default_rng(seed).random(len(df))
+    order = np.lexsort((keys, stratum))
+    starts = np.concatenate(([0], np.cumsum(population)[:-1]))
+    rank = np.empty(len(df), dtype=np.int64)
+    rank[order] = np.arange(len(df)) - starts[stratum[order]]
+    keep = rank < sample_sizes[stratum]
+
+    sample = df[keep].copy()
+    sample['_stratum'] = stratum[keep]
+    sample['_stratum_n'] = sample_sizes[stratum[keep]]
+    sample['_stratum_N'] = population[stratum[keep]]
+    return sample
+
+
+def estimate_counts(sample, by, z=1.96):
+    """Effectifs estimés depuis un échantillon stratifié (filtré), avec intervalle de confiance
+
+    Estimateur stratifié classique : pour chaque strate h, N_h * p_h avec p_h la part des
+    lignes échantillonnées de la strate qui tombent dans la modalité, et une variance
+    N_h² (1 - n_h/N_h) p_h (1 - p_h) / (n_h - 1).
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    cells = sample.groupby(by + ['_stratum'], dropna=False)
+    matched = cells.size()
+    n = cells['_stratum_n'].first()
+    N = cells['_stratum_N'].first()
+
+    p = matched / n
+    variance = (N ** 2 * (1 - n / N) * p * (1 - p) / (n - 1)).where(n > 1, 0)
+    totals = pd.DataFrame({'estimate': N * p, 'variance': variance}).groupby(level=by).sum()
+
+    margin = z * np.sqrt(totals['variance'])
+    return pd.DataFrame({
+        'estimate': totals['estimate'],
+        'lower': (totals['estimate'] - margin).clip(lower=0),
+        'upper': totals['estimate'] + margin,
+    }).sort_values('estimate', ascending=False)
+
+
+def estimated_value_counts(column, top=None):
+    """Équivalent de `value_counts` sur un échantillon stratifié (estimation et intervalle)"""
+    def aggregate(sample):
+        counts = estimate_counts(sample, column)
+        return counts.head(top) if top is not None else counts
+    return aggregate
+
+
+# Pays européens couverts par la vue de comparaison (liste d'analyze_data.py)
+EUROPEAN_COUNTRIES = [
+    'France', 'Germany', 'United Kingdom', 'Italy', 'Spain', 'Netherlands', 'Belgium', 'Greece',
+    'Portugal', 'Austria', 'Switzerland', 'Denmark', 'Sweden', 'Norway', 'Finland', 'Ireland',
+    'Luxembourg', 'Poland', 'Czech Republic', 'Hungary', 'Slovakia', 'Slovenia', 'Croatia',
+    'Romania', 'Bulgaria', 'Estonia', 'Latvia', 'Lithuania', 'Malta', 'Cyprus'
+]
+
+
+def comparison_cube(df, countries, dimension):
+    """Incidents, tués, blessés et succès par (pays, année, modalité) en une seule agrégation"""
+    subset = df[df['country_txt'].isin(countries)]
+    return subset.groupby(['country_txt', 'iyear', dimension], dropna=False, sort=False).agg(
+        incidents=('iyear', 'size'),
+        nkill=('nkill', 'sum'),
+        nwound=('nwound', 'sum'),
+        success=('success', 'sum'),
+    ).reset_index()
+
+
+def country_ratios(cube):
+    """Ratios comparables entre pays (victimes par incident, taux de succès, indice vs moyenne)"""
+    totals = cube.groupby('country_txt')[['incidents', 'nkill', 'nwound', 'success']].sum()
+    years_active = cube.groupby('country_txt')['iyear'].nunique()
+    ratios = pd.DataFrame({
+        'Incidents': totals['incidents'],
+        'Part (%)': (totals['incidents'] / totals['incidents'].sum() * 100).round(1),
+        'Incidents/an actif': (totals['incidents'] / years_active).round(1),
+        'Tués/incident': (totals['nkill'] / totals['incidents']).round(2),
+        'Blessés/incident': (totals['nwound'] / totals['incidents']).round(2),
+        'Taux de succès (%)': (totals['success'] / totals['incidents'] * 100).round(1),
+    })
+    # Indice 100 = moyenne des pays sélectionnés
+    ratios['Indice incidents (moy. = 100)'] = (ratios['Incidents'] / ratios['Incidents'].mean() * 100).round(0)
+    return ratios.sort_values('Incidents', ascending=False)
+
+
+def dimension_mix(cube, dimension):
+    """Part (%) de chaque modalité dans les incidents de chaque pays (tableau pays x modalité)"""
+    mix = cube.pivot_table(index='country_txt', columns=dimension, values='incidents', aggfunc='sum', fill_value=0)
+    return mix.div(mix.sum(axis=1), axis=0) * 100
+
+
+def group_overlap(cube, exclude=('Unknown',)):
+    """Nombre de groupes communs entre chaque paire de pays, et pays couverts par chaque groupe"""
+    cube = cube[~cube['gname'].isin(exclude)]
+    incidence = pd.crosstab(cube['country_txt'], cube['gname']).gt(0).astype(np.int32)
+    matrix = incidence.to_numpy()
+    overlap = pd.DataFrame(matrix @ matrix.T, index=incidence.index, columns=incidence.index)
+    spread = incidence.sum(axis=0).sort_values(ascending=False)
+    return overlap, spread
@@ -1,5 +1,6 @@
 import pandas as pd
 import warnings
+from analytics import EUROPEAN_COUNTRIES
 warnings.filterwarnings('ignore')
 
 # Charger les données
@@ -25,7 +26,7 @@ if len(france_data) > 0:
     print(f'\nAvec coordonnées: {len(france_coords)}/{len(france_data)}')
 
 # Europe
-european_countries = ['France', 'Germany', 'United Kingdom', 'Italy', 'Spain', 'Netherlands', 'Belgium', 'Greece', 'Portugal', 'Austria', 'Switzerland', 'Denmark', 'Sweden', 'Norway', 'Finland', 'Ireland', 'Luxembourg', 'Poland', 'Czech Republic', 'Hungary', 'Slovakia', 'Slovenia', 'Croatia', 'Romania', 'Bulgaria', 'Estonia', 'Latvia', 'Lithuania', 'Malta', 'Cyprus']
+european_countries = EUROPEAN_COUNTRIES
 
 europe_data = df[df['country_txt'].isin(european_countries)]
 print(f'\n=== EUROPE ===')
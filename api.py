@@ -0,0 +1,180 @@
+"""API HTTP/JSON exposant les agrégations du tableau de bord
+
+Lancement : python api.py [--host 127.0.0.1] [--port 8000]
+
+Les filtres reprennent ceux de la barre latérale (paramètres répétables) :
+    start, end, country, region, attack, city
+Exemples :
+    /global/yearly_counts?start=1990&end=2000&region=Western%20Europe
+    /global/country_counts?attack=Bombing/Explosion
+    /france/city_aggregates?city=Paris&city=Lyon
+
+Les tuiles précalculées par tiles.py sont servies sous /tiles/<calque>/<mesure>/<z>/<x>/<y>.png
+
+L'API est un déploiement distinct du tableau de bord : un autre processus, qui
+charge sa propre copie de la base au démarrage et garde son propre cache
+(lru_cache). Elle ne partage pas les caches Streamlit et ne voit pas les
+incidents ingérés en continu par le tableau de bord (ingest.py) : la redémarrer
+après une mise à jour des données. Filtres et agrégations sont ceux d'analytics.py,
+communs avec les pages.
+"""
+import argparse
+import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+
+import analytics
+import data_loader
+import tiles
+
+# Agrégations disponibles par périmètre, identiques à celles des pages
+GLOBAL_AGGREGATIONS = {
+    'yearly_counts': analytics.yearly_counts,
+    'monthly_pivot': analytics.monthly_pivot,
+    'country_counts': analytics.value_counts('country_txt', top=15),
+    'region_counts': analytics.value_counts('region_txt'),
+    'attack_counts': analytics.value_counts('attacktype1_txt'),
+    'weapon_counts': analytics.value_counts('weaptype1_txt', top=10),
+    'target_counts': analytics.value_counts('targtype1_txt', top=10),
+    'success_counts': analytics.value_counts('success'),
+    'group_stats': analytics.group_stats,
+}
+
+FRANCE_AGGREGATIONS = {
+    'yearly_counts': analytics.yearly_counts,
+    'attack_counts': analytics.value_counts('attacktype1_txt'),
+    'city_counts': analytics.value_counts('city', top=10),
+    'region_counts': analytics.value_counts('provstate', top=10),
+    'group_counts': analytics.value_counts('gname', top=10),
+    'target_counts': analytics.value_counts('targtype1_txt', top=8),
+    'weapon_counts': analytics.value_counts('weaptype1_txt', top=8),
+    'group_stats': analytics.group_stats,
+    'city_aggregates': lambda df: analytics.city_aggregates(
+        df.loc[df['has_coordinates'], ['latitude', 'longitude', 'city', 'iyear', 'nkill', 'nwound']]
+    ),
+}
+
+SCOPES = {'global': GLOBAL_AGGREGATIONS, 'france': FRANCE_AGGREGATIONS}
+
+# Jeu de données chargé une seule fois au démarrage, partagé par toutes les requêtes
+_datasets = {}
+
+
+def load_datasets():
+    """Charge la base complète et le sous-ensemble France"""
+    df = data_loader.read_dataset()
+    _datasets['global'] = df
+    _datasets['france'] = analytics.france_subset(df)
+    _datasets['options'] = analytics.filter_options(df)
+
+
+@lru_cache(maxsize=512)
+def compute(scope, name, filters):
+    """Agrégation sérialisée en JSON, mise en cache par signature de filtres"""
+    filtered = analytics.filter_incidents(_datasets[scope], **dict(filters))
+    return to_json(SCOPES[scope][name](filtered))
+
+
+def to_json(result):
+    """Sérialise une Series ou un DataFrame pandas en JSON"""
+    if hasattr(result, 'to_frame'):
+        result = result.rename_axis('label').reset_index(name='count')
+    elif result.index.name is not None:
+        result = result.reset_index()
+    result.columns = [str(col) for col in result.columns]
+    return result.to_json(orient='records', force_ascii=False)
+
+
+def parse_filters(query_params):
+    """Convertit les paramètres de requête en signature de filtres hashable"""
+    filters = []
+    if 'start' in query_params or 'end' in query_params:
+        start = int(query_params.get('start', -10**6))
+        end = int(query_params.get('end', 10**6))
+        filters.append(('year_range', (start, end)))
+    if 'country' in query_params:
+        filters.append(('country', query_params['country']))
+    for param, key in [('region', 'regions'), ('attack', 'attacks'), ('city', 'cities')]:
+        values = query_params.getlist(param)
+        if values:
+            filters.append((key, tuple(sorted(values))))
+    return tuple(filters)
+
+
+async def health(request):
+    return JSONResponse({'status': 'ok', 'incidents': len(_datasets.get('global', ()))})
+
+
+async def filter_options(request):
+    """Valeurs possibles des filtres, comme dans la barre latérale"""
+    return JSONResponse({
+        **_datasets['options'],
+        'aggregations': {scope: sorted(aggregations) for scope, aggregations in SCOPES.items()},
+    })
+
+
+async def aggregate(request):
+    scope = request.path_params['scope']
+    name = request.path_params['name']
+    if scope not in SCOPES or name not in SCOPES[scope]:
+        return JSONResponse({'error': f"Agrégation inconnue: {scope}/{name}"}, status_code=404)
+    try:
+        filters = parse_filters(request.query_params)
+    except ValueError as e:
+        return JSONResponse({'error': f"Filtre invalide: {e}"}, status_code=400)
+    # Calcul pandas hors de la boucle d'événements
+    body = await run_in_threadpool(compute, scope, name, filters)
+    return Response(body, media_type='application/json')
+
+
+EMPTY_TILE = tiles.empty_tile()
+
+
+async def tile(request):
+    """Tuile précalculée ; tuile transparente là où il n'y a aucun incident"""
+    manifest = _datasets.get('tiles')
+    preset = request.path_params['preset']
+    measure = request.path_params['measure']
+    if manifest is None or preset not in manifest['presets'] or measure not in manifest['measures']:
+        return JSONResponse({'error': f"Calque inconnu: {preset}/{measure}"}, status_code=404)
+    z, x, y = (request.path_params[key] for key in ('z', 'x', 'y'))
+    path = os.path.join(_datasets['tile_dir'], preset, measure, str(z), str(x), f"{y}.png")
+    # Cache navigateur : les tuiles ne changent qu'à la reconstruction
+    headers = {'Cache-Control': 'public, max-age=86400', 'Access-Control-Allow-Origin': '*'}
+    if os.path.exists(path):
+        return FileResponse(path, media_type='image/png', headers=headers)
+    return Response(EMPTY_TILE, media_type='image/png', headers=headers)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(load_datasets)
+    _datasets['tile_dir'] = tiles.find_tile_dir()
+    _datasets['tiles'] = tiles.read_manifest(_datasets['tile_dir'])
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health),
+        Route('/filters', filter_options),
+        Route('/tiles/{preset}/{measure}/{z:int}/{x:int}/{y:int}.png', tile),
+        Route('/{scope}/{name}', aggregate),
+    ],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,10 @@
+"""Couche graphique chargée à la demande
+
+plotly.express coûte environ 150 ms à l'import, au-delà de pandas. Les pages
+importent `px` et `go` depuis ce module plutôt que depuis Plotly : Plotly n'est
+chargé qu'à la création du premier graphique (voir lazy.py).
+"""
+from lazy import LazyModule
+
+px = LazyModule('plotly.express')
+go = LazyModule('plotly.graph_objects')
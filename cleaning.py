@@ -0,0 +1,90 @@
+"""Nettoyage vectorisé des incidents, exécuté une fois à l'ingestion
+
+Appliqué par bloc lors de la conversion en instantané (convert_data.py), aux
+dépôts de l'ingestion continue (ingest.py) et, à défaut d'instantané, une seule
+fois au chargement. Les pages n'ont plus à compléter ni filtrer ces colonnes à
+chaque affichage :
+- incidents sans année ou sans pays retirés ;
+- `event_date` : date de l'incident, mois ou jour inconnus (0 dans la GTD)
+  ramenés au 1er, avec `date_precision` ('day', 'month' ou 'year') ;
+- `nkill` / `nwound` : valeurs manquantes ou négatives ramenées à 0,
+  `nkill_known` / `nwound_known` indiquent si la valeur était renseignée ;
+- `latitude` / `longitude` : coordonnées hors bornes ou (0, 0) retirées,
+  `has_coordinates` indique si l'incident est géolocalisé ;
+- noms de villes, provinces et groupes sans espaces superflus (vide -> manquant).
+"""
+import numpy as np
+import pandas as pd
+
+# Colonnes ajoutées par le nettoyage : type ('datetime', 'text' ou 'bool')
+ADDED_COLUMNS = {
+    'event_date': 'datetime',
+    'date_precision': 'text',
+    'nkill_known': 'bool',
+    'nwound_known': 'bool',
+    'has_coordinates': 'bool',
+}
+
+CASUALTY_COLUMNS = ['nkill', 'nwound']
+TRIMMED_COLUMNS = ['city', 'provstate', 'gname', 'country_txt', 'region_txt']
+
+
+def is_clean(df):
+    """Vrai si le nettoyage a déjà été appliqué (colonnes ajoutées présentes)"""
+    return all(column in df.columns for column in ADDED_COLUMNS)
+
+
+def clean(df):
+    """Copie nettoyée du DataFrame (voir le docstring du module)"""
+    df = df.dropna(subset=['iyear', 'country_txt']).copy()
+
+    for column in TRIMMED_COLUMNS:
+        if column in df.columns:
+            text = df[column].str.strip().str.replace(r'\s+', ' ', regex=True)
+            df[column] = text.where(text != '')
+
+    _add_event_date(df)
+
+    for column in CASUALTY_COLUMNS:
+        values = pd.to_numeric(df[column], errors='coerce') if column in df.columns else pd.Series(np.nan, index=df.index)
+        df[f'{column}_known'] = values.notna().to_numpy()
+        df[column] = values.fillna(0).clip(lower=0).astype('float64')
+
+    if 'latitude' in df.columns and 'longitude' in df.columns:
+        latitude = pd.to_numeric(df['latitude'], errors='coerce')
+        longitude = pd.to_numeric(df['longitude'], errors='coerce')
+        valid = (
+            latitude.between(-90, 90) & longitude.between(-180, 180)
+            & ~((latitude == 0) & (longitude == 0))
+        )
+        df['latitude'] = latitude.where(valid)
+        df['longitude'] = longitude.where(valid)
+        df['has_coordinates'] = valid.to_numpy()
+    else:
+        df['has_coordinates'] = False
+    return df
+
+
+def _add_event_date(df):
+    """Ajoute `event_date` et `date_precision` (mois/jour à 0 = inconnus)"""
+    year = pd.to_numeric(df['iyear'], errors='coerce').astype('int64')
+    month = pd.to_numeric(df['imonth'], errors='coerce').fillna(0).astype('int64') if 'imonth' in df.columns else pd.Series(0, index=df.index)
+    day = pd.to_numeric(df['iday'], errors='coerce').fillna(0).astype('int64') if 'iday' in df.columns else pd.Series(0, index=df.index)
+
+    month_known = month.between(1, 12)
+    day_known = month_known & day.between(1, 31)
+    parts = pd.DataFrame({
+        'year': year,
+        'month': month.where(month_known, 1),
+        'day': day.where(day_known, 1),
+    })
+    dates = pd.to_datetime(parts, errors='coerce')
+    # Jour impossible (30 février...) : seule la précision au mois est conservée
+    invalid_day = dates.isna() & day_known
+    if invalid_day.any():
+        day_known &= ~invalid_day
+        parts.loc[invalid_day, 'day'] = 1
+        dates = pd.to_datetime(parts, errors='coerce')
+
+    df['event_date'] = dates
+    df['date_precision'] = np.select([day_known, month_known], ['day', 'month'], default='year')
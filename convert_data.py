@@ -0,0 +1,247 @@
+"""Conversion du classeur GTD en instantané colonnaire (Parquet)
+
+Le classeur est lu en flux directement depuis le .zip (ou depuis le .xlsx extrait),
+par blocs de lignes, avec openpyxl en mode lecture seule. La conversion des types
+et le nettoyage (cleaning.py) de chaque bloc sont répartis sur un pool de processus
+et les blocs sont écrits au fil de l'eau, ce qui borne la mémoire à quelques blocs
+en cours de traitement.
+
+`--engine calamine` utilise le lecteur natif python-calamine (paquet optionnel),
+plus rapide mais qui charge tout l'onglet en mémoire avant de produire la
+première ligne : la mémoire n'est alors plus bornée.
+
+Usage : python convert_data.py [--source fichier.zip|fichier.xlsx] [--output fichier.parquet] [--engine openpyxl|calamine]
+"""
+import argparse
+import os
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time as dtime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import analytics
+import cleaning
+import data_loader
+
+CHUNK_ROWS = 20_000
+
+# Lecteurs du classeur : openpyxl lit en flux, calamine charge tout l'onglet
+ENGINES = ('openpyxl', 'calamine')
+
+# Colonnes lues pour construire le résumé de démarrage de l'application
+SUMMARY_COLUMNS = ['iyear', 'country_txt', 'region_txt', 'attacktype1_txt', 'nkill', 'nwound']
+
+# Colonnes entières (les autres colonnes numériques sont converties en flottants)
+INTEGER_COLUMNS = {'eventid', 'iyear', 'imonth', 'iday'}
+
+# Colonnes de texte et de dates de la GTD : souvent vides sur les premiers milliers de lignes
+# (années 1970), leur type ne peut pas être déduit du premier bloc
+TEXT_COLUMNS = {
+    'approxdate', 'provstate', 'city', 'location', 'summary', 'corp1', 'target1', 'corp2', 'target2',
+    'corp3', 'target3', 'gname', 'gsubname', 'gname2', 'gsubname2', 'gname3', 'gsubname3', 'motive',
+    'weapdetail', 'propcomment', 'divert', 'kidhijcountry', 'ransomnote', 'addnotes', 'scite1',
+    'scite2', 'scite3', 'dbsource', 'related',
+}
+DATETIME_COLUMNS = {'resolution'}
+
+
+def open_source(path):
+    """Flux binaire du classeur : membre du .zip ou fichier .xlsx"""
+    if zipfile.is_zipfile(path) and not path.endswith('.xlsx'):
+        archive = zipfile.ZipFile(path, 'r')
+        return archive.open(data_loader.DATA_FILE)
+    return open(path, 'rb')
+
+
+def iter_rows(stream, engine='openpyxl'):
+    """Lignes du premier onglet (en-tête compris), lues en flux (openpyxl) ou d'un bloc (calamine)"""
+    if engine == 'calamine':
+        from python_calamine import CalamineWorkbook
+
+        # Tout l'onglet est chargé en mémoire avant la première ligne
+        workbook = CalamineWorkbook.from_filelike(stream)
+        for row in workbook.get_sheet_by_index(0).iter_rows():
+            # calamine renvoie '' pour les cellules vides
+            yield tuple(None if value == '' else value for value in row)
+    else:
+        from openpyxl import load_workbook
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            yield from workbook.worksheets[0].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+
+def iter_chunks(rows, chunk_rows=CHUNK_ROWS):
+    """Regroupe les lignes par blocs de `chunk_rows`"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def infer_kinds(header, rows):
+    """Type de chaque colonne ('int', 'float', 'datetime' ou 'text') : schéma connu de la GTD, sinon d'après un premier bloc"""
+    kinds = {}
+    for position, column in enumerate(header):
+        values = [row[position] for row in rows if position < len(row) and row[position] is not None]
+        if column in INTEGER_COLUMNS:
+            kinds[column] = 'int'
+        elif column in TEXT_COLUMNS:
+            kinds[column] = 'text'
+        elif column in DATETIME_COLUMNS:
+            kinds[column] = 'datetime'
+        elif not values:
+            # Colonne vide dans le premier bloc : les libellés GTD se terminent par _txt
+            kinds[column] = 'text' if column.endswith('_txt') else 'float'
+        elif all(isinstance(value, (datetime, date)) for value in values):
+            kinds[column] = 'datetime'
+        elif all(isinstance(value, (int, float, bool)) for value in values):
+            kinds[column] = 'float'
+        else:
+            kinds[column] = 'text'
+    return kinds
+
+
+def arrow_schema(header, kinds):
+    """Schéma Arrow de l'instantané"""
+    types = {'int': pa.int64(), 'float': pa.float64(), 'datetime': pa.timestamp('us'), 'text': pa.string(), 'bool': pa.bool_()}
+    return pa.schema([(column, types[kinds[column]]) for column in header])
+
+
+def convert_chunk(header, rows, kinds):
+    """Convertit un bloc de lignes brutes en table Arrow typée et nettoyée (exécuté dans un processus du pool)"""
+    df = pd.DataFrame.from_records(rows, columns=header)
+    for column in header:
+        kind = kinds[column]
+        raw = df[column]
+        if kind == 'int':
+            df[column] = pd.to_numeric(raw, errors='coerce').astype('Int64')
+        elif kind == 'float':
+            df[column] = pd.to_numeric(raw, errors='coerce').astype('float64')
+        elif kind == 'datetime':
+            df[column] = pd.to_datetime(raw, errors='coerce')
+        else:
+            df[column] = raw.map(_to_text, na_action='ignore').astype(object)
+        lost = raw.notna() & df[column].isna()
+        if lost.any():
+            # Type déduit à tort (colonne vide dans le premier bloc) : refus plutôt que perte silencieuse
+            raise ValueError(
+                f"colonne {column} ({kind}) : {int(lost.sum()):,} valeur(s) non convertible(s), "
+                f"par ex. {raw[lost].iloc[0]!r} ; ajouter la colonne à TEXT_COLUMNS dans convert_data.py"
+            )
+    # Nettoyage fait une fois pour toutes et stocké dans l'instantané
+    df = cleaning.clean(df)
+    return pa.Table.from_pandas(df, schema=arrow_schema(output_columns(header), kinds), preserve_index=False)
+
+
+def output_columns(header):
+    """Colonnes de l'instantané : celles du classeur puis celles ajoutées par le nettoyage"""
+    return header + [column for column in cleaning.ADDED_COLUMNS if column not in header]
+
+
+def _to_text(value):
+    """Texte d'une cellule ; les entiers stockés en flottants perdent leur « .0 »"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime, date, dtime)):
+        return value.isoformat()
+    return str(value)
+
+
+def convert(source, output, workers=None, chunk_rows=CHUNK_ROWS, engine='openpyxl'):
+    """Convertit `source` en Parquet `output`, retourne le nombre de lignes écrites"""
+    workers = workers or os.cpu_count() or 1
+    temporary = output + '.tmp'
+    with open_source(source) as stream:
+        rows = iter_rows(stream, engine)
+        header = [str(column) for column in next(rows)]
+        chunks = iter_chunks(rows, chunk_rows)
+        first = next(chunks, [])
+        kinds = {**infer_kinds(header, first), **cleaning.ADDED_COLUMNS}
+        schema = arrow_schema(output_columns(header), kinds)
+
+        try:
+            written = _write_chunks(header, first, chunks, kinds, schema, temporary, workers)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+
+    os.replace(temporary, output)
+    return written
+
+
+def _write_chunks(header, first, chunks, kinds, schema, path, workers):
+    """Convertit les blocs dans le pool et les écrit dans l'ordre, retourne le nombre de lignes"""
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool, pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        # Au plus 2 blocs par processus en vol : mémoire bornée, écriture dans l'ordre
+        pending = deque([pool.submit(convert_chunk, header, first, kinds)] if first else [])
+        for chunk in chunks:
+            pending.append(pool.submit(convert_chunk, header, chunk, kinds))
+            while len(pending) >= 2 * workers:
+                table = pending.popleft().result()
+                writer.write_table(table)
+                written += table.num_rows
+        while pending:
+            table = pending.popleft().result()
+            writer.write_table(table)
+            written += table.num_rows
+    return written
+
+
+def write_summary(output):
+    """Écrit à côté de l'instantané le résumé affiché par l'application avant le chargement complet"""
+    df = pd.read_parquet(output, columns=SUMMARY_COLUMNS)
+    path = os.path.join(os.path.dirname(output), data_loader.SUMMARY_FILE)
+    return data_loader.write_summary(analytics.build_summary(df), path)
+
+
+def default_source():
+    """Le .zip s'il existe (pas besoin de l'extraire), sinon le .xlsx"""
+    for path in (data_loader.DATA_ZIP, data_loader.DATA_FILE):
+        if os.path.exists(path):
+            return path
+    return data_loader.DATA_ZIP
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertit la base GTD en instantané Parquet")
+    parser.add_argument('--source', default=default_source(), help="Fichier .zip ou .xlsx source")
+    parser.add_argument('--output', default=data_loader.SNAPSHOT_FILE, help="Fichier Parquet produit")
+    parser.add_argument('--workers', type=int, default=None, help="Nombre de processus (défaut : tous les cœurs)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help="Lignes par bloc")
+    parser.add_argument('--engine', choices=ENGINES, default='openpyxl', help="Lecteur du classeur : openpyxl (en flux, mémoire bornée) ou calamine (plus rapide, charge tout l'onglet)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"[KO] Fichier source introuvable : {args.source}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        rows = convert(args.source, args.output, workers=args.workers, chunk_rows=args.chunk_rows, engine=args.engine)
+    except ImportError:
+        print("[KO] Le lecteur calamine nécessite le paquet python-calamine (pip install python-calamine)")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"[KO] {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"[OK] {rows:,} lignes écrites dans {args.output} en {elapsed:.1f} s")
+    print(f"[OK] Résumé de démarrage écrit dans {write_summary(args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""Moteur de filtrage croisé (brushing) avec recalcul incrémental
+
+Chaque dimension garde :
+- les codes de catégorie de chaque ligne et les lignes triées par code, pour
+  retrouver en une tranche les lignes d'une catégorie ;
+- les comptages de ses catégories sur les lignes retenues par toutes les AUTRES
+  dimensions (comportement habituel du crossfilter : un graphique ne se filtre
+  pas lui-même).
+
+Quand la sélection d'une dimension change, seules les lignes des catégories
+ajoutées ou retirées sont parcourues et leurs contributions sont reportées sur
+les comptages des autres dimensions.
+"""
+import numpy as np
+import pandas as pd
+
+
+class Crossfilter:
+    """Filtres liés sur plusieurs dimensions catégorielles d'un DataFrame"""
+
+    def __init__(self, df, dimensions):
+        """`dimensions` : {nom de dimension: colonne du DataFrame}"""
+        self.index = df.index
+        self.dimensions = list(dimensions)
+        self.categories = {}
+        self.codes = {}
+        self._rows_by_code = {}
+        self._offsets = {}
+        self.selected = {}
+        for name, column in dimensions.items():
+            codes, categories = pd.factorize(df[column], sort=True)
+            # Valeurs manquantes regroupées dans une catégorie dédiée
+            if (codes < 0).any():
+                codes = np.where(codes < 0, len(categories), codes)
+                categories = categories.append(pd.Index([None]))
+            self.codes[name] = codes.astype(np.int32)
+            self.categories[name] = categories
+            self._rows_by_code[name] = np.argsort(codes, kind='stable')
+            self._offsets[name] = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(categories)))))
+            self.selected[name] = np.ones(len(categories), dtype=bool)
+
+        # Nombre de dimensions qui rejettent chaque ligne
+        self.rejections = np.zeros(len(df), dtype=np.int16)
+        self.counts = {
+            name: np.bincount(self.codes[name], minlength=len(self.categories[name])).astype(np.int64)
+            for name in self.dimensions
+        }
+        self.total = len(df)
+
+    def _rows(self, name, category_codes):
+        """Lignes appartenant aux catégories données d'une dimension"""
+        offsets = self._offsets[name]
+        rows = self._rows_by_code[name]
+        return np.concatenate([rows[offsets[code]:offsets[code + 1]] for code in category_codes] or [np.empty(0, dtype=np.int64)])
+
+    def select(self, name, values=None):
+        """Restreint une dimension aux valeurs données (None ou vide : toutes les valeurs)"""
+        if values:
+            wanted = np.zeros(len(self.categories[name]), dtype=bool)
+            positions = self.categories[name].get_indexer(list(values))
+            wanted[positions[positions >= 0]] = True
+        else:
+            wanted = np.ones(len(self.categories[name]), dtype=bool)
+
+        changed = np.flatnonzero(wanted != self.selected[name])
+        if not len(changed):
+            return
+        rows = self._rows(name, changed)
+        # +1 : la ligne est désormais rejetée par cette dimension, -1 : elle est réintégrée
+        delta = np.where(wanted[self.codes[name][rows]], -1, 1).astype(np.int16)
+
+        before = self.rejections[rows]
+        after = before + delta
+        self.rejections[rows] = after
+        self.selected[name] = wanted
+
+        # Pour chaque autre dimension, une ligne compte si aucune dimension autre que
+        # celle-ci ne la rejette : seules les lignes dont ce statut change sont reportées
+        for other in self.dimensions:
+            if other == name:
+                continue
+            own_rejected = (~self.selected[other][self.codes[other][rows]]).astype(np.int16)
+            counted_before = (before - own_rejected) == 0
+            counted_after = (after - own_rejected) == 0
+            codes = self.codes[other][rows]
+            size = len(self.categories[other])
+            self.counts[other] += np.bincount(codes[counted_after & ~counted_before], minlength=size)
+            self.counts[other] -= np.bincount(codes[counted_before & ~counted_after], minlength=size)
+
+        self.total += int(np.count_nonzero(after == 0) - np.count_nonzero(before == 0))
+
+    def reset(self):
+        """Supprime toutes les sélections"""
+        for name in self.dimensions:
+            self.select(name, None)
+
+    def group(self, name):
+        """Comptages d'une dimension, filtrés par les autres dimensions (Series triée par catégorie)"""
+        return pd.Series(self.counts[name], index=self.categories[name], name='incidents')
+
+    def selection(self, name):
+        """Valeurs sélectionnées d'une dimension (liste vide si aucune restriction)"""
+        if self.selected[name].all():
+            return []
+        return list(self.categories[name][self.selected[name]])
+
+    def mask(self):
+        """Masque booléen des lignes retenues par toutes les dimensions"""
+        return self.rejections == 0
+
+    def filtered_index(self):
+        """Étiquettes des lignes retenues par toutes les dimensions"""
+        return self.index[self.mask()]
@@ -0,0 +1,126 @@
+"""Chargement de la Global Terrorism Database, indépendant de Streamlit"""
+import glob
+import json
+import os
+import zipfile
+import pandas as pd
+
+import cleaning
+
+DATA_FILE = 'globalterrorismdb_0522dist.xlsx'
+DATA_ZIP = 'globalterrorismdb_0522dist.zip'
+# Instantané colonnaire produit par convert_data.py (make snapshot)
+SNAPSHOT_FILE = 'globalterrorismdb_0522dist.parquet'
+# Résumé minuscule (options des filtres, métriques par défaut) lu avant les données
+SUMMARY_FILE = 'globalterrorismdb_0522dist.summary.json'
+# Partitions Parquet de l'exécution multi-processus (python partitioned.py build)
+PARTITION_DIR = '.partitions'
+# Fragments Parquet des incidents ingérés en continu (ingest.py)
+LIVE_DIR = '.live'
+
+# Répertoire racine (lancement depuis streamlit) puis répertoire parent (lancement depuis pages/)
+SEARCH_DIRS = ['.', '..']
+
+
+def read_dataset():
+    """Lit les données (instantané Parquet, fichier Excel ou ZIP) complétées des incidents ingérés"""
+    # Instantané et dépôts sont nettoyés à l'écriture ; le classeur l'est ici, une fois par chargement
+    df = _read_source()
+    if not cleaning.is_clean(df):
+        df = cleaning.clean(df)
+    live = read_live()
+    if live is not None:
+        if not cleaning.is_clean(live):
+            live = cleaning.clean(live)
+        df = pd.concat([df, live], ignore_index=True)
+    return df.reset_index(drop=True)
+
+
+def _read_source():
+    """Lit les données depuis l'instantané Parquet, le fichier Excel ou, à défaut, le ZIP"""
+    snapshot = find_snapshot()
+    if snapshot is not None:
+        return pd.read_parquet(snapshot)
+    for directory in SEARCH_DIRS:
+        path = os.path.join(directory, DATA_FILE)
+        if os.path.exists(path):
+            return pd.read_excel(path)
+    for directory in SEARCH_DIRS:
+        path = os.path.join(directory, DATA_ZIP)
+        if os.path.exists(path):
+            # Lecture directe depuis le .zip (pour GitHub/déploiement)
+            with zipfile.ZipFile(path, 'r') as zip_ref:
+                with zip_ref.open(DATA_FILE) as excel_file:
+                    return pd.read_excel(excel_file)
+    raise FileNotFoundError(
+        f"Le fichier '{DATA_FILE}' ou '{DATA_ZIP}' doit être dans le répertoire racine du projet."
+    )
+
+
+def read_live():
+    """Incidents ingérés en continu (fragments en ajout seul), None s'il n'y en a pas"""
+    for directory in SEARCH_DIRS:
+        fragments = sorted(glob.glob(os.path.join(directory, LIVE_DIR, '*.parquet')))
+        if fragments:
+            return pd.concat([pd.read_parquet(fragment) for fragment in fragments], ignore_index=True)
+    return None
+
+
+def find_snapshot():
+    """Chemin de l'instantané Parquet s'il existe et n'est pas plus ancien que les données source"""
+    for directory in SEARCH_DIRS:
+        path = os.path.join(directory, SNAPSHOT_FILE)
+        if os.path.exists(path) and _is_fresh(path, (DATA_FILE, DATA_ZIP)):
+            return path
+    return None
+
+
+def find_partitions():
+    """Répertoire des partitions s'il existe et n'est pas plus ancien que les données, sinon None"""
+    for directory in SEARCH_DIRS:
+        path = os.path.join(directory, PARTITION_DIR)
+        manifest = os.path.join(path, 'manifest.json')
+        if os.path.exists(manifest) and _is_fresh(manifest, (DATA_FILE, DATA_ZIP, SNAPSHOT_FILE, LIVE_DIR), directory):
+            return path
+    return None
+
+
+def read_summary():
+    """Résumé précalculé s'il existe et n'est pas plus ancien que les données, sinon None"""
+    for directory in SEARCH_DIRS:
+        path = os.path.join(directory, SUMMARY_FILE)
+        if os.path.exists(path) and _is_fresh(path, (DATA_FILE, DATA_ZIP, SNAPSHOT_FILE, LIVE_DIR)):
+            try:
+                with open(path, encoding='utf-8') as summary_file:
+                    return json.load(summary_file)
+            except (OSError, ValueError):
+                return None
+    return None
+
+
+def write_summary(summary, path=None):
+    """Enregistre le résumé à côté des données (écriture atomique)"""
+    if path is None:
+        path = os.path.join(data_directory(), SUMMARY_FILE)
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as summary_file:
+        json.dump(summary, summary_file, ensure_ascii=False)
+    os.replace(temporary, path)
+    return path
+
+
+def data_directory():
+    """Premier répertoire de recherche contenant les données"""
+    for directory in SEARCH_DIRS:
+        if any(os.path.exists(os.path.join(directory, name)) for name in (SNAPSHOT_FILE, DATA_FILE, DATA_ZIP)):
+            return directory
+    return SEARCH_DIRS[0]
+
+
+def _is_fresh(path, sources, directory=None):
+    """Vrai si `path` n'est pas plus ancien que les fichiers `sources` de `directory` (par défaut, le sien)"""
+    if directory is None:
+        directory = os.path.dirname(path)
+    candidates = [os.path.join(directory, name) for name in sources]
+    newest_source = max((os.path.getmtime(source) for source in candidates if os.path.exists(source)), default=0)
+    return os.path.getmtime(path) >= newest_source
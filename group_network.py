@@ -0,0 +1,183 @@
+"""Réseau de co-activité des groupes, calculé par produits de matrices creuses
+
+Deux groupes sont reliés lorsqu'ils ont frappé dans les mêmes villes ou les mêmes
+provinces. Une ville est identifiée par (pays, province, ville) et une province
+par (pays, province) : deux villes homonymes de pays différents restent
+distinctes, et les lieux inconnus ('Unknown', vides) ne relient personne. Chaque contexte (ville, province, année) donne une matrice d'incidence
+creuse contexte x groupe A ; le produit AᵀA compte, pour chaque paire de groupes,
+les contextes partagés. Le poids d'une arête est le nombre de villes et de provinces
+communes ; les années communes mesurent le recouvrement des périodes d'activité.
+Sur la base mondiale (~3 500 groupes), le calcul prend quelques secondes.
+
+Sur le réseau obtenu :
+- centralité de degré pondéré (force) et centralité de vecteur propre ;
+- communautés par propagation d'étiquettes pondérée.
+
+SciPy (~140 ms à l'import) n'est chargé qu'à la construction du premier réseau.
+"""
+import numpy as np
+import pandas as pd
+
+# Groupes non attribués, exclus du réseau
+EXCLUDED_GROUPS = ('Unknown',)
+
+# Lieux partagés comptés dans le poids des arêtes : libellé -> colonnes qui identifient le lieu
+PLACES = {
+    'villes': ['country_txt', 'provstate', 'city'],
+    'provinces': ['country_txt', 'provstate'],
+}
+
+# Valeurs de lieu qui ne désignent aucun lieu précis
+UNKNOWN_PLACES = ('Unknown',)
+
+
+def incidence(df, columns, groups):
+    """Matrice creuse contexte x groupe : 1 si le groupe a au moins un incident dans le contexte
+
+    Le contexte est identifié par une colonne ou par la combinaison de plusieurs ;
+    les lignes dont l'une de ces colonnes est vide ou inconnue sont ignorées.
+    """
+    from scipy import sparse
+
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    pairs = df[columns + ['gname']].dropna()
+    for column in columns:
+        pairs = pairs[~pairs[column].isin(UNKNOWN_PLACES)]
+    pairs = pairs.drop_duplicates()
+    if len(columns) == 1:
+        rows, contexts = pd.factorize(pairs[columns[0]])
+        size = len(contexts)
+    else:
+        rows = pairs.groupby(columns, sort=False).ngroup().to_numpy()
+        size = int(rows.max()) + 1 if len(rows) else 0
+    return sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=np.float32), (rows, groups.get_indexer(pairs['gname']))),
+        shape=(size, len(groups))
+    )
+
+
+def co_activity(matrix):
+    """Contextes partagés par chaque paire de groupes (triangle supérieur, sans la diagonale)"""
+    from scipy import sparse
+
+    return sparse.triu(matrix.T @ matrix, k=1).tocsr()
+
+
+def build_network(df, min_years=1, exclude=EXCLUDED_GROUPS):
+    """Nœuds (groupes et leurs indicateurs) et arêtes (lieux et années communs) de la sélection"""
+    from scipy import sparse
+
+    df = df[df['gname'].notna() & ~df['gname'].isin(exclude)]
+    counts = df['gname'].value_counts()
+    groups = pd.Index(counts.index, name='gname')
+
+    shared = {
+        label: co_activity(incidence(df, [column for column in columns if column in df.columns], groups))
+        for label, columns in PLACES.items() if columns[-1] in df.columns
+    }
+    combined = sparse.csr_matrix((len(groups), len(groups)), dtype=np.float32)
+    for matrix in shared.values():
+        combined = combined + matrix
+    combined = combined.tocoo()
+    source, target = combined.row, combined.col
+
+    # Années communes des seules paires déjà reliées par un lieu (produit ligne à ligne)
+    years = incidence(df, 'iyear', groups).T.tocsr()
+    common_years = np.asarray(years[source].multiply(years[target]).sum(axis=1)).ravel()
+
+    edges = pd.DataFrame({'source': groups[source], 'target': groups[target]})
+    for label, matrix in shared.items():
+        edges[label] = np.asarray(matrix[source, target]).ravel().astype(np.int64)
+    edges['années'] = common_years.astype(np.int64)
+    edges['poids'] = edges[list(shared)].sum(axis=1)
+    keep = (edges['années'] >= min_years).to_numpy()
+    weights = sparse.coo_matrix((edges['poids'].to_numpy(dtype=np.float64)[keep], (source[keep], target[keep])), shape=(len(groups), len(groups)))
+    weights = (weights + weights.T).tocsr()
+    edges = edges[keep].sort_values('poids', ascending=False).reset_index(drop=True)
+    nodes = pd.DataFrame({
+        'incidents': counts.to_numpy(),
+        'degré': np.diff(weights.indptr),
+        'force': np.asarray(weights.sum(axis=1)).ravel(),
+        'centralité': eigenvector_centrality(weights),
+        'communauté': label_propagation(weights),
+    }, index=groups)
+    return nodes, edges
+
+
+def eigenvector_centrality(weights, iterations=200, tolerance=1e-8):
+    """Centralité de vecteur propre (itération de la puissance), normalisée à 1 pour le plus central"""
+    from scipy import sparse
+
+    n = weights.shape[0]
+    if n == 0 or weights.nnz == 0:
+        return np.zeros(n)
+    # W + I : même vecteur propre dominant, sans oscillation sur les graphes bipartis
+    shifted = weights + sparse.identity(n, format='csr')
+    vector = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        following = shifted @ vector
+        following /= np.linalg.norm(following)
+        if np.abs(following - vector).max() < tolerance:
+            vector = following
+            break
+        vector = following
+    return vector / vector.max()
+
+
+def label_propagation(weights, iterations=50, seed=0):
+    """Communautés par propagation d'étiquettes pondérée, numérotées de la plus grande (1) à la plus petite"""
+    n = weights.shape[0]
+    labels = np.arange(n)
+    coo = weights.tocoo()
+    rng = np.random.default_rng(seed)
+    for _ in range(iterations):
+        votes = pd.DataFrame({'node': coo.row, 'label': labels[coo.col], 'weight': coo.data})
+        totals = votes.groupby(['node', 'label'], sort=False)['weight'].sum().reset_index()
+        # Étiquette la plus soutenue par les voisins (à égalité, la plus petite)
+        best = totals.sort_values(['node', 'weight', 'label'], ascending=[True, False, True]).drop_duplicates('node')
+        proposed = labels.copy()
+        proposed[best['node'].to_numpy()] = best['label'].to_numpy()
+        if np.array_equal(proposed, labels):
+            break
+        # Mise à jour d'une moitié des nœuds tirée au hasard : évite les oscillations des mises à jour synchrones
+        update = rng.random(n) < 0.5
+        labels = np.where(update, proposed, labels)
+    sizes = pd.Series(labels).value_counts(sort=True)
+    rank = pd.Series(np.arange(1, len(sizes) + 1), index=sizes.index)
+    return rank[labels].to_numpy()
+
+
+def communities(nodes, top=3):
+    """Taille, incidents et principaux groupes de chaque communauté"""
+    grouped = nodes.sort_values('incidents', ascending=False).groupby('communauté')
+    return pd.DataFrame({
+        'Groupes': grouped.size(),
+        'Incidents': grouped['incidents'].sum(),
+        'Principaux groupes': grouped.apply(lambda members: ', '.join(members.index[:top])),
+    }).sort_values('Incidents', ascending=False)
+
+
+def spring_layout(nodes, edges, iterations=150, seed=0):
+    """Positions 2D des nœuds (Fruchterman-Reingold, dense : pour afficher quelques dizaines de groupes)"""
+    n = len(nodes)
+    position = np.random.default_rng(seed).random((n, 2))
+    if n < 2:
+        return position
+    index = pd.Series(np.arange(n), index=nodes.index)
+    adjacency = np.zeros((n, n))
+    adjacency[index[edges['source']].to_numpy(), index[edges['target']].to_numpy()] = edges['poids'].to_numpy()
+    adjacency = np.log1p(adjacency + adjacency.T)
+    if adjacency.max() > 0:
+        adjacency /= adjacency.max()
+
+    k = 1.0 / np.sqrt(n)
+    for step in range(iterations):
+        delta = position[:, None, :] - position[None, :, :]
+        distance = np.linalg.norm(delta, axis=2).clip(0.01)
+        # Répulsion k²/d entre toutes les paires, attraction d²/k le long des arêtes
+        force = k * k / distance ** 2 - adjacency * distance / k
+        displacement = (delta * force[:, :, None]).sum(axis=1)
+        length = np.linalg.norm(displacement, axis=1).clip(1e-9)
+        temperature = 0.1 * (1 - step / iterations)
+        position += displacement / length[:, None] * np.minimum(length, temperature)[:, None]
+    return position
@@ -0,0 +1,334 @@
+"""Ingestion continue d'incidents avec agrégats maintenus incrémentalement
+
+Les analystes déposent des fichiers .jsonl (un incident par ligne, mêmes noms de
+colonnes que la GTD) dans incoming/. À chaque passage :
+- chaque ligne est validée contre le schéma de la base (colonnes connues, types,
+  champs obligatoires, bornes des dates et coordonnées, eventid inédit) ;
+- les lignes valides sont ajoutées au stockage colonnaire sous forme de fragments
+  Parquet en ajout seul (.live/), relus par data_loader au démarrage suivant ;
+- les lignes rejetées sont écrites dans incoming/rejected/ avec leur motif et le
+  fichier traité est déplacé dans incoming/processed/ ;
+- les agrégats (années, pays, groupes, villes) et les valeurs des filtres sont
+  mis à jour à partir du seul lot ingéré.
+
+Un seul processus consomme incoming/ à la fois : le premier qui scrute la boîte
+prend un verrou (incoming/.lock) qu'il garde jusqu'à sa fin. Quand l'application
+tourne, c'est elle qui ingère ; `ingest.py --watch` sert lorsqu'elle est arrêtée
+(ses fragments sont lus au démarrage suivant de l'application).
+
+Usage : python ingest.py [--watch] [--interval 2]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import analytics
+import cleaning
+import data_loader
+import text_store
+
+INBOX_DIR = 'incoming'
+# Sous-répertoires du dépôt : fichiers traités et lignes rejetées
+PROCESSED = 'processed'
+REJECTED = 'rejected'
+# Verrou du consommateur de la boîte de dépôt
+LOCK_FILE = '.lock'
+
+# Champs sans lesquels un incident ne peut pas être rangé dans les tableaux de bord
+REQUIRED_COLUMNS = ['eventid', 'iyear', 'imonth', 'iday', 'country_txt', 'region_txt', 'attacktype1_txt']
+
+# Bornes de validité : (minimum, maximum)
+RANGES = {
+    'iyear': (1970, datetime.now().year),
+    'imonth': (0, 12),
+    'iday': (0, 31),
+    'latitude': (-90, 90),
+    'longitude': (-180, 180),
+    'nkill': (0, None),
+    'nwound': (0, None),
+}
+
+
+def schema_from_frame(df):
+    """Type attendu de chaque colonne ('int', 'float', 'datetime' ou 'text') d'après la base chargée"""
+    schema = {}
+    for column, dtype in df.dtypes.items():
+        if column == 'text_id':
+            continue
+        if pd.api.types.is_integer_dtype(dtype):
+            schema[column] = 'int'
+        elif pd.api.types.is_float_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+            schema[column] = 'float'
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            schema[column] = 'datetime'
+        else:
+            schema[column] = 'text'
+    for column in text_store.TEXT_COLUMNS:
+        schema.setdefault(column, 'text')
+    return schema
+
+
+def validate_event(event, schema):
+    """Incident converti aux types de la base, ou ValueError avec le motif du rejet"""
+    if not isinstance(event, dict):
+        raise ValueError("l'incident doit être un objet JSON")
+    unknown = sorted(set(event) - set(schema))
+    if unknown:
+        raise ValueError(f"colonnes inconnues : {', '.join(unknown)}")
+    missing = [column for column in REQUIRED_COLUMNS if event.get(column) in (None, '')]
+    if missing:
+        raise ValueError(f"champs obligatoires manquants : {', '.join(missing)}")
+
+    row = {}
+    for column, value in event.items():
+        row[column] = _convert(column, value, schema[column])
+    for column, (low, high) in RANGES.items():
+        value = row.get(column)
+        if value is None:
+            continue
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise ValueError(f"{column} hors bornes : {value}")
+    return row
+
+
+def _convert(column, value, kind):
+    """Valeur convertie au type `kind` (None reste None)"""
+    if value is None or value == '':
+        return None
+    try:
+        if kind == 'int':
+            number = float(value)
+            if not number.is_integer():
+                raise ValueError
+            return int(number)
+        if kind == 'float':
+            return float(value)
+        if kind == 'datetime':
+            return pd.Timestamp(value).to_pydatetime()
+    except (TypeError, ValueError):
+        raise ValueError(f"{column} : valeur invalide pour le type {kind} ({value!r})")
+    return str(value)
+
+
+class LiveAggregates:
+    """Agrégats additifs de toute la base, mis à jour lot par lot"""
+
+    CITY_KEYS = ['city', 'latitude', 'longitude']
+
+    def __init__(self, df):
+        self.total = 0
+        self.year_counts = pd.Series(dtype='int64')
+        self.country_counts = pd.Series(dtype='int64')
+        self.group_counts = pd.Series(dtype='int64')
+        self.cities = pd.DataFrame(columns=['nombre_incidents', 'total_tues', 'total_blesses', 'premiere_attaque', 'derniere_attaque'])
+        self.values = {'countries': set(), 'regions': set(), 'attack_types': set()}
+        self.years = [None, None]
+        self.update(df)
+
+    def update(self, batch):
+        """Ajoute un lot d'incidents aux agrégats (coût proportionnel au lot)"""
+        if len(batch) == 0:
+            return
+        self.total += len(batch)
+        self.year_counts = self.year_counts.add(batch['iyear'].value_counts(), fill_value=0).astype('int64').sort_index()
+        self.country_counts = self.country_counts.add(batch['country_txt'].value_counts(), fill_value=0).astype('int64')
+        if 'gname' in batch.columns:
+            self.group_counts = self.group_counts.add(batch['gname'].value_counts(), fill_value=0).astype('int64')
+
+        if 'city' in batch.columns:
+            map_data = batch.loc[batch['has_coordinates'] & batch['city'].notna(), ['latitude', 'longitude', 'city', 'iyear', 'nkill', 'nwound']]
+            if len(map_data) > 0:
+                delta = analytics.city_aggregates(map_data).set_index(self.CITY_KEYS)
+                merged = pd.concat([self.cities, delta]) if len(self.cities) else delta
+                self.cities = merged.groupby(level=[0, 1, 2]).agg({
+                    'nombre_incidents': 'sum',
+                    'total_tues': 'sum',
+                    'total_blesses': 'sum',
+                    'premiere_attaque': 'min',
+                    'derniere_attaque': 'max',
+                })
+
+        for key, column in [('countries', 'country_txt'), ('regions', 'region_txt'), ('attack_types', 'attacktype1_txt')]:
+            self.values[key].update(batch[column].dropna().unique().tolist())
+        low, high = int(batch['iyear'].min()), int(batch['iyear'].max())
+        self.years = [low if self.years[0] is None else min(self.years[0], low), high if self.years[1] is None else max(self.years[1], high)]
+
+    def options(self):
+        """Valeurs des filtres de la barre latérale, au format de analytics.filter_options"""
+        return {
+            'years': list(self.years),
+            'countries': sorted(self.values['countries']),
+            'regions': sorted(self.values['regions']),
+            'attack_types': sorted(self.values['attack_types']),
+        }
+
+
+class LiveIngestor:
+    """Ingestion des dépôts JSONL, partagée par toutes les sessions"""
+
+    def __init__(self, base, inbox=INBOX_DIR, live_dir=data_loader.LIVE_DIR):
+        self.base = base
+        self.inbox = inbox
+        self.live_dir = live_dir
+        self.schema = schema_from_frame(base)
+        self.known_ids = set(base['eventid'].dropna().astype('int64').tolist()) if 'eventid' in base.columns else set()
+        self.aggregates = LiveAggregates(base)
+        self.batches = []
+        self.version = 0
+        self.rejected = 0
+        self.last_ingest = None
+        # Vrai si un autre processus consomme déjà la boîte de dépôt
+        self.inbox_busy = False
+        self._inbox_lock = None
+        self._lock = threading.Lock()
+
+    def _claim_inbox(self):
+        """Verrou exclusif sur la boîte de dépôt, gardé jusqu'à la fin du processus (libéré par le système)"""
+        if self._inbox_lock is not None:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            # Hors Unix : pas de verrou, un seul consommateur à lancer à la main
+            return True
+        handle = open(os.path.join(self.inbox, LOCK_FILE), 'w')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            self.inbox_busy = True
+            return False
+        self._inbox_lock = handle
+        self.inbox_busy = False
+        return True
+
+    def poll(self):
+        """Ingère les fichiers déposés depuis le dernier passage, retourne le nombre d'incidents ajoutés"""
+        if not os.path.isdir(self.inbox):
+            return 0
+        # Un seul passage à la fois ; les autres sessions ne font qu'attendre la fin
+        with self._lock:
+            if not self._claim_inbox():
+                return 0
+            added = 0
+            for name in sorted(os.listdir(self.inbox)):
+                path = os.path.join(self.inbox, name)
+                if name.endswith('.jsonl') and os.path.isfile(path):
+                    added += self._ingest_file(path)
+            return added
+
+    def _ingest_file(self, path):
+        """Valide un dépôt, écrit son fragment et met à jour les agrégats"""
+        name = os.path.basename(path)
+        rows, rejects, ids = [], [], set()
+        with open(path, encoding='utf-8') as drop:
+            for number, line in enumerate(drop, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"JSON invalide ({e.msg}, colonne {e.colno})")
+                    row = validate_event(event, self.schema)
+                    if row['eventid'] in self.known_ids or row['eventid'] in ids:
+                        raise ValueError(f"eventid déjà présent : {row['eventid']}")
+                except ValueError as e:
+                    rejects.append({'ligne': number, 'motif': str(e), 'contenu': line.rstrip('\n')})
+                    continue
+                ids.add(row['eventid'])
+                rows.append(row)
+
+        if rows:
+            # Fragment écrit avant de retenir les identifiants : en cas d'échec, le dépôt reste
+            # dans la boîte et sera relu tel quel au prochain passage
+            batch = self._to_frame(rows)
+            self._append_fragment(batch, name)
+            self.known_ids.update(ids)
+            self.aggregates.update(batch)
+            self.batches.append(batch)
+            self.version += 1
+            self.last_ingest = datetime.now()
+
+        if rejects:
+            os.makedirs(os.path.join(self.inbox, REJECTED), exist_ok=True)
+            with open(os.path.join(self.inbox, REJECTED, name), 'w', encoding='utf-8') as rejected:
+                for reject in rejects:
+                    rejected.write(json.dumps(reject, ensure_ascii=False) + '\n')
+            self.rejected += len(rejects)
+
+        os.makedirs(os.path.join(self.inbox, PROCESSED), exist_ok=True)
+        shutil.move(path, os.path.join(self.inbox, PROCESSED, name))
+        return len(rows)
+
+    def _to_frame(self, rows):
+        """Lot d'incidents nettoyé, aux colonnes et types de la base"""
+        batch = cleaning.clean(pd.DataFrame.from_records(rows))
+        columns = [column for column in self.schema if column in batch.columns or column in self.base.columns]
+        batch = batch.reindex(columns=columns)
+        for column in batch.columns:
+            if column in self.base.columns and column not in text_store.TEXT_COLUMNS:
+                dtype = self.base[column].dtype
+                if batch[column].isna().any() and (pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)):
+                    # Champ facultatif absent du dépôt : entier de la base élargi en flottant (NaN)
+                    dtype = np.dtype('float64')
+                batch[column] = batch[column].astype(dtype)
+        return batch
+
+    def _append_fragment(self, batch, name):
+        """Écrit le lot dans un nouveau fragment Parquet (ajout seul, écriture atomique)"""
+        os.makedirs(self.live_dir, exist_ok=True)
+        stem = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{os.path.splitext(name)[0]}"
+        temporary = os.path.join(self.live_dir, stem + '.tmp')
+        pq.write_table(pa.Table.from_pandas(batch, preserve_index=False), temporary)
+        os.replace(temporary, os.path.join(self.live_dir, stem + '.parquet'))
+
+    def frame(self):
+        """Base complétée des incidents ingérés depuis le démarrage (textes non rattachés : text_id = -1)"""
+        if not self.batches:
+            return self.base
+        live = pd.concat(self.batches, ignore_index=True).drop(columns=text_store.TEXT_COLUMNS, errors='ignore')
+        live['text_id'] = np.int32(-1)
+        live.index = pd.RangeIndex(len(self.base), len(self.base) + len(live))
+        return pd.concat([self.base, live.reindex(columns=self.base.columns)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingère les incidents déposés dans incoming/ (fichiers .jsonl)")
+    parser.add_argument('--watch', action='store_true', help="Surveille le répertoire en continu")
+    parser.add_argument('--interval', type=float, default=2.0, help="Intervalle de surveillance (secondes)")
+    args = parser.parse_args()
+
+    try:
+        base = data_loader.read_dataset()
+    except FileNotFoundError as e:
+        print(f"[KO] {e}")
+        sys.exit(1)
+
+    os.makedirs(INBOX_DIR, exist_ok=True)
+    ingestor = LiveIngestor(base)
+    while True:
+        rejected = ingestor.rejected
+        added = ingestor.poll()
+        if ingestor.inbox_busy:
+            print(f"[KO] {INBOX_DIR}/ est déjà consommé par un autre processus (application ou ingest.py)")
+            sys.exit(1)
+        if added or ingestor.rejected > rejected:
+            print(f"[OK] {added:,} incidents ingérés, {ingestor.rejected - rejected:,} lignes rejetées (voir {os.path.join(INBOX_DIR, REJECTED)})")
+        if not args.watch:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
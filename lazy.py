@@ -0,0 +1,26 @@
+"""Modules chargés à la demande
+
+Les pages déclarent leurs dépendances lourdes avec `LazyModule('nom')` plutôt
+qu'avec `import nom` : le module n'est importé qu'au premier accès à l'un de ses
+attributs. Le titre et la barre latérale s'affichent avant, et une page qui ne
+s'en sert pas ne le charge jamais. `python loadtest.py --imports` mesure le coût
+des imports restants de chaque page.
+"""
+import importlib
+
+
+class LazyModule:
+    """Module importé au premier accès à l'un de ses attributs"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self):
+        state = 'chargé' if self._module is not None else 'non chargé'
+        return f"<module {self._name} ({state})>"
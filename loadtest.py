@@ -0,0 +1,500 @@
+"""Test de charge : sessions simultanées sur l'application et la page France
+
+Chaque utilisateur simulé est une session AppTest qui exécute réellement les scripts
+Streamlit dans ce processus. Les caches et les pools sont partagés, comme entre les
+sessions d'un serveur. Chaque session suit un scénario d'interactions réaliste :
+ouverture de la page, période, pays ou régions, types d'attaque, villes... Chaque
+interaction déclenche une réexécution dont la durée est mesurée.
+
+Le rapport donne la latence des réexécutions (p50, p95, p99) et le débit. Il
+donne aussi la mémoire résidente du processus et de ses sous-processus, ainsi que
+le taux de succès de chaque cache st.cache_data / st.cache_resource. Chaque
+campagne est enregistrée dans loadtests/ pour comparer les versions entre elles.
+
+Le démarrage est mesuré à part, dans des interpréteurs neufs : coût des imports
+de chaque page (python -X importtime, Streamlit déjà chargé comme dans le
+serveur) et démarrage du pool de processus de l'exécution partitionnée.
+
+Usage : python loadtest.py [--users 8] [--iterations 3] [--pages app,france] [--label v1.2]
+        python loadtest.py --imports
+        python loadtest.py --compare loadtests/avant.json loadtests/apres.json [--tolerance 10]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from session_memory import process_rss
+
+RUNS_DIR = 'loadtests'
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PAGES = {
+    'app': 'streamlit_app.py',
+    'france': os.path.join('pages', '1_France.py'),
+    'europe': os.path.join('pages', '2_Europe.py'),
+    'tendances': os.path.join('pages', '3_Tendances.py'),
+    'administration': os.path.join('pages', '4_Administration.py'),
+}
+
+# Indicateurs comparés entre deux campagnes : (clé, libellé, plus grand = pire)
+COMPARED = [
+    ('p50', "p50 (ms)", True),
+    ('p95', "p95 (ms)", True),
+    ('p99', "p99 (ms)", True),
+    ('throughput', "Débit (réexécutions/s)", False),
+    ('errors', "Erreurs", True),
+]
+
+
+def widget(at, kind, label):
+    """Widget de la session `at` par type ('slider', 'selectbox'...) et libellé"""
+    for element in getattr(at, kind):
+        if element.label == label:
+            return element
+    raise LookupError(f"{kind} « {label} » introuvable")
+
+
+def random_range(rng, slider):
+    """Sous-période aléatoire d'au moins cinq ans (bornes du curseur si plus court)"""
+    low, high = slider.min, slider.max
+    if high - low <= 5:
+        return low, high
+    start = rng.randint(low, high - 5)
+    return start, rng.randint(start + 5, high)
+
+
+def app_scenario(rng):
+    """Interactions d'un utilisateur de la page principale : [(étape, action(at))]"""
+    def period(at):
+        slider = widget(at, 'slider', "Période")
+        slider.set_range(*random_range(rng, slider))
+
+    def country(at):
+        select = widget(at, 'selectbox', "Pays (optionnel)")
+        select.set_value(rng.choice(select.options[1:]))
+
+    def regions(at):
+        widget(at, 'selectbox', "Pays (optionnel)").set_value("Tous les pays")
+        select = widget(at, 'multiselect', "Régions")
+        select.set_value(rng.sample(select.options, rng.randint(1, min(4, len(select.options)))))
+
+    def attacks(at):
+        select = widget(at, 'multiselect', "Types d'attaque")
+        select.set_value(rng.sample(select.options, rng.randint(1, min(4, len(select.options)))))
+
+    def casualties(at):
+        at.radio(key='casualty_measure').set_value(rng.choice(['nkill', 'nwound', 'victimes']))
+
+    return [('période', period), ('pays', country), ('régions', regions), ('attaques', attacks), ('victimes', casualties)]
+
+
+def france_scenario(rng):
+    """Interactions d'un utilisateur de la page France : [(étape, action(at))]"""
+    def period(at):
+        slider = widget(at, 'slider', "Période")
+        slider.set_range(*random_range(rng, slider))
+
+    def cities(at):
+        select = widget(at, 'multiselect', "Villes (laisser vide pour toutes)")
+        select.set_value(rng.sample(select.options, rng.randint(1, min(3, len(select.options)))))
+
+    def attacks(at):
+        select = widget(at, 'multiselect', "Types d'attaque")
+        select.set_value(rng.sample(select.options, rng.randint(1, len(select.options))))
+
+    def network(at):
+        widget(at, 'radio', "Périmètre").set_value(rng.choice(['france', 'monde']))
+
+    def reset(at):
+        widget(at, 'multiselect', "Villes (laisser vide pour toutes)").set_value([])
+
+    return [('période', period), ('villes', cities), ('attaques', attacks), ('réseau', network), ('toutes villes', reset)]
+
+
+SCENARIOS = {'app': app_scenario, 'france': france_scenario}
+
+
+class CacheCounter:
+    """Succès et échecs de chaque fonction en cache (instrumentation de streamlit.runtime.caching)"""
+
+    def __init__(self):
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.available = False
+        self._lock = threading.Lock()
+
+    def install(self):
+        """Compte les lectures réussies (succès) et les valeurs calculées (échecs) ; sans effet si l'API interne a changé"""
+        try:
+            from streamlit.runtime.caching.cache_utils import CachedFunc
+            handle_hit, store = CachedFunc._handle_cache_hit, CachedFunc._store_computed_value
+        except (ImportError, AttributeError):
+            return
+        counter = self
+
+        def _handle_cache_hit(self, result):
+            counter.count(counter.hits, self._info)
+            return handle_hit(self, result)
+
+        def _store_computed_value(self, *args, **kwargs):
+            counter.count(counter.misses, self._info)
+            return store(self, *args, **kwargs)
+
+        CachedFunc._handle_cache_hit = _handle_cache_hit
+        CachedFunc._store_computed_value = _store_computed_value
+        self.available = True
+
+    def count(self, table, info):
+        # Les pages s'exécutent toutes en __main__ : le fichier distingue leurs fonctions
+        func = getattr(info, 'func', None)
+        origin = os.path.basename(func.__code__.co_filename) if hasattr(func, '__code__') else '?'
+        kind = str(getattr(info, 'cache_type', '')).split('.')[-1].lower()
+        name = f"{origin}:{getattr(func, '__qualname__', '?')} ({kind})"
+        with self._lock:
+            table[name] += 1
+
+    def report(self):
+        """{cache: {'hits', 'misses', 'rate'}} depuis le début de la campagne"""
+        caches = {}
+        for name in sorted(set(self.hits) | set(self.misses)):
+            hits, misses = self.hits[name], self.misses[name]
+            caches[name] = {'hits': hits, 'misses': misses, 'rate': round(hits / (hits + misses), 3)}
+        return caches
+
+
+class MemorySampler:
+    """Mémoire résidente du processus et de ses sous-processus (pool partitionné...), échantillonnée en continu"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak = {}
+        self.last = {}
+        self.names = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='loadtest-memory', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        for pid, (name, rss) in process_rss().items():
+            self.names[pid] = name
+            self.last[pid] = rss
+            self.peak[pid] = max(self.peak.get(pid, 0), rss)
+
+    def report(self):
+        """{pid: {'name', 'peak_mb', 'final_mb'}}"""
+        return {
+            str(pid): {'name': self.names[pid], 'peak_mb': round(self.peak[pid] / 2 ** 20, 1), 'final_mb': round(self.last[pid] / 2 ** 20, 1)}
+            for pid in sorted(self.peak)
+        }
+
+
+def import_times(page, top=8):
+    """Imports du script d'une page (sans exécuter main) dans un interpréteur neuf où Streamlit est déjà chargé"""
+    path = os.path.join(APP_DIR, PAGES[page])
+    code = f"import runpy, sys, streamlit; sys.path.insert(0, {APP_DIR!r}); runpy.run_path({path!r}, run_name='importtime')"
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True, cwd=APP_DIR)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1]}
+    # Lignes « import time: propre | cumulé | module », imbriquées par indentation ;
+    # seuls comptent les imports qui suivent celui de Streamlit
+    packages, modules, loaded = {}, 0, False
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if loaded:
+            modules += 1
+            if not name.startswith('  '):
+                packages[name.strip()] = int(cumulative) / 1000
+        loaded = loaded or name == ' streamlit'
+    heaviest = sorted(packages.items(), key=lambda item: -item[1])[:top]
+    return {
+        'total_ms': round(sum(packages.values()), 1),
+        'modules': modules,
+        'heaviest': {name: round(ms, 1) for name, ms in heaviest},
+    }
+
+
+def worker_start(workers=4):
+    """Démarrage d'un pool partitionné de `workers` processus, premier puis suivant (ms)"""
+    import partitioned
+    from concurrent.futures import ProcessPoolExecutor
+
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        # Chaque processus importe partitioned (et pandas, pyarrow) avant sa première tâche
+        with ProcessPoolExecutor(max_workers=workers, mp_context=partitioned.worker_context()) as pool:
+            list(pool.map(partitioned.reduce_partials, [[]] * workers, [['iyear']] * workers))
+        timings.append(round((time.perf_counter() - start) * 1000, 1))
+    return {'workers': workers, 'first': timings[0], 'next': timings[1]}
+
+
+def startup_report(pages, workers=4):
+    """Imports de chaque page et démarrage du pool, chacun mesuré dans un interpréteur neuf"""
+    code = f"import json, loadtest; print(json.dumps(loadtest.worker_start({workers})))"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=APP_DIR)
+    return {
+        'imports': {page: import_times(page) for page in pages},
+        'pool': json.loads(result.stdout) if result.returncode == 0 else {'error': result.stderr.strip().splitlines()[-1]},
+    }
+
+
+def print_startup(startup):
+    """Affichage texte du démarrage : imports par page et pool de processus"""
+    print("\n  Imports des pages (ms, Streamlit déjà chargé)")
+    for page, imports in startup['imports'].items():
+        if 'error' in imports:
+            print(f"    {page:<16} [KO] {imports['error']}")
+            continue
+        print(f"    {page:<16}{imports['total_ms']:>8,.0f}  ({imports['modules']} modules)")
+        for name, ms in imports['heaviest'].items():
+            print(f"      {name:<30}{ms:>8,.0f}")
+    pool = startup['pool']
+    if 'error' in pool:
+        print(f"\n  Pool de processus : [KO] {pool['error']}")
+    else:
+        print(f"\n  Pool de processus ({pool['workers']} processus) : {pool['first']:,.0f} ms au premier démarrage, {pool['next']:,.0f} ms ensuite")
+
+
+def startup_metrics(run):
+    """Indicateurs de démarrage d'une campagne : {clé: (libellé, valeur)}, plus grand = pire"""
+    startup = run.get('startup') or {}
+    metrics = {f'cold_{page}': (f"Démarrage à froid {page} (ms)", cold) for page, cold in run['cold_start_ms'].items()}
+    for page, imports in startup.get('imports', {}).items():
+        metrics[f'imports_{page}'] = (f"Imports {page} (ms)", imports.get('total_ms'))
+    for key, label in [('first', "Pool : premier démarrage (ms)"), ('next', "Pool : démarrage suivant (ms)")]:
+        metrics[f'pool_{key}'] = (label, startup.get('pool', {}).get(key))
+    return metrics
+
+
+def percentiles(durations):
+    """Latences p50/p95/p99 et moyenne en millisecondes"""
+    if not durations:
+        return {'p50': None, 'p95': None, 'p99': None, 'mean': None}
+    values = np.asarray(durations) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': round(p50, 1), 'p95': round(p95, 1), 'p99': round(p99, 1), 'mean': round(values.mean(), 1)}
+
+
+def run_user(user, page, iterations, think, seed, records, timeout):
+    """Une session : ouverture de la page puis `iterations` passages sur le scénario"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed * 1000 + user)
+    steps = SCENARIOS[page](rng)
+    at = AppTest.from_file(os.path.join(APP_DIR, PAGES[page]), default_timeout=timeout)
+
+    def timed(step, action=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            if action is not None:
+                action(at)
+            at.run()
+            if at.exception:
+                error = at.exception[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        records.append({'page': page, 'step': step, 'user': user, 'seconds': time.perf_counter() - start, 'error': error})
+        return error is None
+
+    if not timed('ouverture'):
+        return
+    for _ in range(iterations):
+        for step, action in steps:
+            time.sleep(rng.uniform(0, think) if think else 0)
+            timed(step, action)
+
+
+def run_campaign(users, iterations, pages, think=0.0, seed=0, warmup=True, timeout=300):
+    """Lance `users` sessions par page en parallèle et retourne le rapport de la campagne"""
+    startup = startup_report(pages)
+    counter = CacheCounter()
+    counter.install()
+    records = []
+
+    # Démarrage à froid mesuré à part : chargement des données, construction des caches
+    cold = {}
+    if warmup:
+        for page in pages:
+            warm_records = []
+            run_user(-1, page, 0, 0, seed, warm_records, timeout)
+            cold[page] = round(warm_records[0]['seconds'] * 1000, 1) if warm_records else None
+
+    sampler = MemorySampler()
+    sampler.start()
+    threads = [
+        threading.Thread(target=run_user, args=(user, page, iterations, think, seed, records, timeout), name=f'user-{page}-{user}')
+        for page in pages for user in range(users)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'config': {'users': users, 'iterations': iterations, 'pages': list(pages), 'think': think, 'seed': seed},
+        'host': {'python': platform.python_version(), 'cpus': os.cpu_count(), 'platform': platform.platform()},
+        'elapsed': round(elapsed, 2),
+        'reruns': len(records),
+        'throughput': round(len(records) / elapsed, 2) if elapsed else None,
+        'errors': sum(record['error'] is not None for record in records),
+        'cold_start_ms': cold,
+        'startup': startup,
+        'latency': percentiles([record['seconds'] for record in records]),
+        'pages': {},
+        'memory': sampler.report(),
+        'caches': counter.report() if counter.available else None,
+        'error_samples': sorted({record['error'] for record in records if record['error']})[:5],
+    }
+    for page in pages:
+        page_records = [record for record in records if record['page'] == page]
+        steps = {}
+        for step in dict.fromkeys(record['step'] for record in page_records):
+            steps[step] = percentiles([record['seconds'] for record in page_records if record['step'] == step])
+        report['pages'][page] = {
+            **percentiles([record['seconds'] for record in page_records]),
+            'reruns': len(page_records),
+            'errors': sum(record['error'] is not None for record in page_records),
+            'throughput': round(len(page_records) / elapsed, 2) if elapsed else None,
+            'steps': steps,
+        }
+    try:
+        import streamlit
+        report['host']['streamlit'] = streamlit.__version__
+    except ImportError:
+        pass
+    return report
+
+
+def print_report(report):
+    """Affichage texte d'une campagne"""
+    config = report['config']
+    print(f"[OK] {report['reruns']:,} réexécutions en {report['elapsed']:.1f} s ({report['throughput']:.1f}/s), "
+          f"{config['users']} utilisateurs par page, {report['errors']} erreur(s)")
+    for page, cold in report['cold_start_ms'].items():
+        print(f"  Démarrage à froid {page} : {cold:,.0f} ms")
+    print_startup(report['startup'])
+    print(f"\n  {'Page / étape':<28}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}  (ms)")
+    for page, stats in report['pages'].items():
+        print(f"  {page:<28}{stats['reruns']:>6}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}")
+        for step, step_stats in stats['steps'].items():
+            print(f"    {step:<26}{'':>6}{step_stats['p50']:>10}{step_stats['p95']:>10}{step_stats['p99']:>10}")
+    print("\n  Mémoire résidente (Mo) : pic / fin")
+    for pid, memory in report['memory'].items():
+        print(f"    {memory['name']:<20} {pid:>8} : {memory['peak_mb']:>8.1f} / {memory['final_mb']:.1f}")
+    if report['caches'] is None:
+        print("\n  Taux de succès des caches : indisponible (version de Streamlit non instrumentée)")
+    else:
+        print("\n  Taux de succès des caches : succès / échecs")
+        for name, cache in report['caches'].items():
+            print(f"    {name:<48} {cache['rate']:>6.1%}  ({cache['hits']} / {cache['misses']})")
+    for error in report['error_samples']:
+        print(f"  [KO] {error}")
+
+
+def save_report(report, label=None, directory=RUNS_DIR):
+    """Enregistre la campagne dans loadtests/<date>[-<label>].json, retourne le chemin"""
+    os.makedirs(directory, exist_ok=True)
+    report = {**report, 'label': label}
+    stem = datetime.now().strftime('%Y%m%d-%H%M%S') + (f"-{label}" if label else '')
+    path = os.path.join(directory, stem + '.json')
+    with open(path, 'w', encoding='utf-8') as run_file:
+        json.dump(report, run_file, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare(before, after, tolerance=10.0):
+    """Compare deux campagnes (globalement, page par page, démarrage), retourne les régressions au-delà de `tolerance` %"""
+    regressions = []
+    print(f"  {'Indicateur':<32}{'avant':>12}{'après':>12}{'écart':>10}")
+    scopes = [('global', *({**run['latency'], 'throughput': run['throughput'], 'errors': run['errors']} for run in (before, after)))]
+    scopes += [(page, before['pages'][page], after['pages'][page]) for page in before['pages'] if page in after['pages']]
+    rows = [(scope, label, old.get(key), new.get(key), higher_is_worse) for scope, old, new in scopes for key, label, higher_is_worse in COMPARED]
+    old_startup, new_startup = startup_metrics(before), startup_metrics(after)
+    rows += [('démarrage', label, value, new_startup[key][1], True) for key, (label, value) in old_startup.items() if key in new_startup]
+    current = None
+    for scope, label, old, new, higher_is_worse in rows:
+        if scope != current:
+            print(f"  [{scope}]")
+            current = scope
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else (0.0 if new == old else float('inf'))
+        worse = change > tolerance if higher_is_worse else change < -tolerance
+        flag = '  <- régression' if worse else ''
+        print(f"  {label:<32}{old:>12}{new:>12}{change:>+9.1f}%{flag}")
+        if worse:
+            regressions.append((scope, label, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge des pages Streamlit (sessions simultanées)")
+    parser.add_argument('--users', type=int, default=8, help="Utilisateurs simultanés par page")
+    parser.add_argument('--iterations', type=int, default=3, help="Passages sur le scénario par utilisateur")
+    parser.add_argument('--pages', default='app,france', help=f"Pages testées parmi {', '.join(SCENARIOS)} (toutes les pages pour --imports)")
+    parser.add_argument('--think', type=float, default=0.5, help="Temps de réflexion maximal entre deux interactions (s)")
+    parser.add_argument('--seed', type=int, default=0, help="Graine des scénarios")
+    parser.add_argument('--label', help="Nom de la campagne (ex. numéro de version)")
+    parser.add_argument('--no-save', action='store_true', help="N'enregistre pas la campagne dans loadtests/")
+    parser.add_argument('--imports', action='store_true', help="Mesure seulement le démarrage : imports des pages et pool de processus")
+    parser.add_argument('--compare', nargs=2, metavar=('AVANT', 'APRES'), help="Compare deux campagnes enregistrées")
+    parser.add_argument('--tolerance', type=float, default=10.0, help="Écart toléré avant de signaler une régression (%%)")
+    args = parser.parse_args()
+
+    if args.compare:
+        runs = []
+        for path in args.compare:
+            with open(path, encoding='utf-8') as run_file:
+                runs.append(json.load(run_file))
+        regressions = compare(*runs, tolerance=args.tolerance)
+        if regressions:
+            print(f"[KO] {len(regressions)} régression(s) au-delà de {args.tolerance:g} %")
+            sys.exit(1)
+        print("[OK] Aucune régression")
+        return
+
+    if args.imports:
+        print_startup(startup_report(list(PAGES)))
+        return
+
+    pages = [page.strip() for page in args.pages.split(',') if page.strip()]
+    unknown = [page for page in pages if page not in SCENARIOS]
+    if unknown:
+        parser.error(f"pages inconnues : {', '.join(unknown)}")
+
+    report = run_campaign(args.users, args.iterations, pages, think=args.think, seed=args.seed)
+    print_report(report)
+    if not args.no_save:
+        print(f"\n[OK] Campagne enregistrée dans {save_report(report, args.label)}")
+
+
+if __name__ == '__main__':
+    main()
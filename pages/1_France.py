@@ -1,11 +1,22 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime
 import warnings
+import analytics
+import data_loader
+import shared_data
+from charts import go, px
+from lazy import LazyModule
+
+group_network = LazyModule('group_network')
+partitioned = LazyModule('partitioned')
+session_memory = LazyModule('session_memory')
+sketches = LazyModule('sketches')
+text_store = LazyModule('text_store')
+spatial_index = LazyModule('spatial_index')
+tiles = LazyModule('tiles')
+
 warnings.filterwarnings('ignore')
 
 # Configuration de la page
@@ -15,55 +26,89 @@ st.set_page_config(
     layout="wide"
 )
 
-@st.cache_data
-def load_data():
-    """Charge les données depuis le fichier Excel ou ZIP"""
+@st.cache_data(max_entries=2)
+def load_data(version=0):
+    """Charge les données (chargement partagé avec la page principale), complétées des incidents ingérés pour une version > 0"""
     try:
-        # Essayer d'abord avec le chemin depuis le répertoire racine (quand lancé depuis streamlit)
-        df = pd.read_excel('globalterrorismdb_0522dist.xlsx')
-        df = df.dropna(subset=['iyear', 'country_txt'])
-        return df
-    except:
-        try:
-            # Essayer avec le chemin depuis le répertoire pages
-            df = pd.read_excel('../globalterrorismdb_0522dist.xlsx')
-            df = df.dropna(subset=['iyear', 'country_txt'])
-            return df
-        except:
-            try:
-                # Essayer de charger depuis le .zip (pour GitHub/déploiement)
-                import zipfile
-                with zipfile.ZipFile('globalterrorismdb_0522dist.zip', 'r') as zip_ref:
-                    with zip_ref.open('globalterrorismdb_0522dist.xlsx') as excel_file:
-                        df = pd.read_excel(excel_file)
-                        df = df.dropna(subset=['iyear', 'country_txt'])
-                        return df
-            except:
-                try:
-                    # Essayer avec le chemin parent pour le zip
-                    import zipfile
-                    with zipfile.ZipFile('../globalterrorismdb_0522dist.zip', 'r') as zip_ref:
-                        with zip_ref.open('globalterrorismdb_0522dist.xlsx') as excel_file:
-                            df = pd.read_excel(excel_file)
-                            df = df.dropna(subset=['iyear', 'country_txt'])
-                            return df
-                except Exception as e:
-                    st.error(f"Erreur lors du chargement des données: {e}")
-                    st.info("Le fichier 'globalterrorismdb_0522dist.xlsx' ou 'globalterrorismdb_0522dist.zip' doit être dans le répertoire racine du projet.")
-                    return None
+        return shared_data.dataset(version)
+    except Exception as e:
+        st.error(f"Erreur lors du chargement des données: {e}")
+        st.info("Le fichier 'globalterrorismdb_0522dist.xlsx' ou 'globalterrorismdb_0522dist.zip' doit être dans le répertoire racine du projet.")
+        return None
+
+
+@st.cache_resource
+def get_text_store():
+    """Stockage des résumés et motifs, partagé entre les sessions"""
+    return text_store.TextStore()
+
+
+@st.cache_resource(max_entries=2)
+def get_spatial_index(version):
+    """Index spatial de tous les incidents géolocalisés, construit une fois par version des données"""
+    return spatial_index.SpatialIndex.from_frame(load_data(version))
+
+
+@st.cache_data
+def load_tile_manifest():
+    """Calques de tuiles précalculés (make tiles), None s'ils n'ont pas été construits"""
+    return tiles.read_manifest()
+
+
+@st.cache_data(ttl=30)
+def tile_server_available():
+    """API des tuiles joignable (vérifié au plus toutes les 30 s)"""
+    return tiles.server_available()
+
+
+@st.cache_resource
+def get_partitions():
+    """Données partitionnées pour l'exécution multi-processus, None si elles n'ont pas été construites"""
+    directory = data_loader.find_partitions()
+    return partitioned.open_dataset(directory) if directory is not None else None
+
+
+@st.cache_resource(max_entries=2)
+def get_casualty_sketches(version):
+    """Sketches de quantiles des victimes par (ville, année, type d'attaque, groupe) en France"""
+    return sketches.build_sketches(
+        analytics.france_subset(load_data(version)),
+        by=['city', 'iyear', 'attacktype1_txt', 'gname']
+    )
+
+
+@st.cache_data
+def load_group_network(scope, year_range, cities, attacks, min_years, version):
+    """Réseau de co-activité des groupes, mis en cache par combinaison de filtres et version des données"""
+    df = load_data(version)
+    if scope == 'france':
+        df = analytics.filter_incidents(analytics.france_subset(df), year_range=year_range, cities=list(cities), attacks=list(attacks))
+    else:
+        df = analytics.filter_incidents(df, year_range=year_range, attacks=list(attacks))
+    return group_network.build_network(df, min_years=min_years)
+
+
+# Périmètres du réseau des groupes
+NETWORK_SCOPES = {
+    'france': "France (filtres de la page)",
+    'monde': "Monde (période et types d'attaque)",
+}
 
 
 def main():
     st.title(":material/flag: Analyse Détaillée du Terrorisme en France")
+    session_memory.track("France")
     st.markdown("### Données précises sur les incidents terroristes en France")
     
-    # Chargement des données
-    df = load_data()
+    # Chargement des données, complétées des incidents ingérés en continu (voir shared_data.py)
+    version = shared_data.live_version()
+    df = load_data(version)
     if df is None:
         st.stop()
+    store = get_text_store()
     
     # Filtrer uniquement la France
-    france_data = df[df['country_txt'].str.contains('France', case=False, na=False)]
+    france_data = analytics.france_subset(df)
     
     if len(france_data) == 0:
         st.warning("Aucun incident trouvé pour la France dans la base de données.")
@@ -99,18 +144,14 @@ def main():
         default=attack_types
     )
     
-    # Appliquer les filtres
-    filtered_france = france_data[
-        (france_data['iyear'] >= year_range[0]) & 
-        (france_data['iyear'] <= year_range[1])
-    ]
-    
-    # Filtre par ville (seulement si des villes sont sélectionnées)
-    if selected_cities:
-        filtered_france = filtered_france[filtered_france['city'].isin(selected_cities)]
-    
-    if selected_attacks:
-        filtered_france = filtered_france[filtered_france['attacktype1_txt'].isin(selected_attacks)]
+    # Appliquer les filtres ; la vue filtrée est rangée dans le magasin des sessions (voir session_memory.py)
+    view = repr((len(france_data), year_range, sorted(selected_cities), sorted(selected_attacks)))
+    filtered_france = session_memory.get_or_build('filtered_france', view, lambda: analytics.filter_incidents(
+        france_data,
+        year_range=year_range,
+        cities=selected_cities,
+        attacks=selected_attacks
+    ))
     
     if len(filtered_france) == 0:
         st.warning("Aucun incident trouvé avec les filtres sélectionnés.")
@@ -123,17 +164,41 @@ def main():
         st.metric("Total incidents France", f"{len(filtered_france):,}")
     
     with col2:
-        total_killed = filtered_france['nkill'].fillna(0).sum()
+        total_killed = filtered_france['nkill'].sum()
         st.metric("Victimes décédées", f"{int(total_killed):,}")
     
     with col3:
-        total_wounded = filtered_france['nwound'].fillna(0).sum()
+        total_wounded = filtered_france['nwound'].sum()
         st.metric("Victimes blessées", f"{int(total_wounded):,}")
     
     with col4:
         cities_count = filtered_france['city'].nunique()
         st.metric("Villes touchées", f"{cities_count}")
     
+    # Agrégations indépendantes calculées en parallèle avant la construction des graphiques
+    aggregations = {
+        'yearly_counts': analytics.yearly_counts,
+        'attack_counts': analytics.value_counts('attacktype1_txt'),
+        'city_counts': analytics.value_counts('city', top=10),
+        'month_counts': lambda df: df['imonth'].value_counts().sort_index(),
+    }
+    if 'provstate' in filtered_france.columns:
+        aggregations['region_counts'] = analytics.value_counts('provstate', top=10)
+    if 'gname' in filtered_france.columns:
+        aggregations['group_counts'] = analytics.value_counts('gname', top=10)
+    if 'targtype1_txt' in filtered_france.columns:
+        aggregations['target_counts'] = analytics.value_counts('targtype1_txt', top=8)
+    if 'weaptype1_txt' in filtered_france.columns:
+        aggregations['weapon_counts'] = analytics.value_counts('weaptype1_txt', top=8)
+    # Les partitions ignorent les incidents ingérés depuis le démarrage : agrégation en mémoire tant qu'il y en a
+    partitions = get_partitions() if not version else None
+    if partitions is not None:
+        # Données partitionnées : agrégats partiels calculés par le pool de processus puis fusionnés
+        filters = dict(year_range=year_range, cities=selected_cities, attacks=selected_attacks)
+        results = partitions.aggregate(filters, list(aggregations), scope='france')
+    else:
+        results = analytics.compute_aggregations(filtered_france, aggregations)
+    
     # Informations générales sur la France
     st.header(":material/bar_chart: Vue d'ensemble - France")
     
@@ -141,7 +206,7 @@ def main():
     
     with col1:
         # Évolution temporelle
-        yearly_counts = filtered_france.groupby('iyear').size().reset_index(name='incidents')
+        yearly_counts = results['yearly_counts']
         
         fig_timeline = px.line(
             yearly_counts, 
@@ -155,7 +220,7 @@ def main():
     
     with col2:
         # Répartition par type d'attaque
-        attack_counts = filtered_france['attacktype1_txt'].value_counts()
+        attack_counts = results['attack_counts']
         
         fig_attacks = px.pie(
             values=attack_counts.values,
@@ -172,7 +237,7 @@ def main():
     
     with col1:
         # Top villes
-        city_counts = filtered_france['city'].value_counts().head(10)
+        city_counts = results['city_counts']
         
         if len(city_counts) > 0:
             fig_cities = px.bar(
@@ -188,7 +253,7 @@ def main():
     with col2:
         # Répartition par région/département
         if 'provstate' in filtered_france.columns:
-            region_counts = filtered_france['provstate'].value_counts().head(10)
+            region_counts = results['region_counts']
             
             if len(region_counts) > 0:
                 fig_regions = px.bar(
@@ -205,19 +270,11 @@ def main():
     st.header(":material/map: Carte interactive des attentats en France")
     
     if 'latitude' in filtered_france.columns and 'longitude' in filtered_france.columns:
-        map_data = filtered_france[['latitude', 'longitude', 'city', 'iyear', 'attacktype1_txt', 'gname', 'nkill', 'nwound', 'summary']].dropna(subset=['latitude', 'longitude'])
+        map_data = filtered_france.loc[filtered_france['has_coordinates'], ['latitude', 'longitude', 'city', 'iyear', 'attacktype1_txt', 'gname', 'nkill', 'nwound']]
         
         if len(map_data) > 0:
             # Calculer le nombre d'incidents par ville pour la taille des marqueurs
-            city_incident_counts = map_data.groupby(['city', 'latitude', 'longitude']).size().reset_index(name='nombre_incidents')
-            city_details = map_data.groupby(['city', 'latitude', 'longitude']).agg({
-                'nkill': lambda x: int(x.fillna(0).sum()),
-                'nwound': lambda x: int(x.fillna(0).sum()),
-                'iyear': ['min', 'max']
-            }).reset_index()
-            
-            city_details.columns = ['city', 'latitude', 'longitude', 'total_tues', 'total_blesses', 'premiere_attaque', 'derniere_attaque']
-            city_map_data = city_incident_counts.merge(city_details, on=['city', 'latitude', 'longitude'])
+            city_map_data = analytics.city_aggregates(map_data)
             
             st.markdown(f"""
             **{len(city_map_data)} villes** touchées par des attentats en France.
@@ -228,19 +285,64 @@ def main():
             col1, col2 = st.columns([3, 1])
             
             with col2:
+                tile_manifest = load_tile_manifest()
+                map_styles = ["open-street-map", "carto-positron", "carto-darkmatter"]
+                if tile_manifest is not None and tile_server_available():
+                    # Tuiles locales : aucun fond externe ni point envoyé au navigateur
+                    map_styles.append("tuiles locales (hors ligne)")
                 map_style = st.radio(
                     "Style de carte:",
-                    ["open-street-map", "carto-positron", "carto-darkmatter"],
+                    map_styles,
                     index=0
                 )
+                use_tiles = map_style == "tuiles locales (hors ligne)"
                 
-                show_all = st.checkbox("Afficher tous les incidents individuels", value=False)
+                if use_tiles:
+                    tile_measure = st.radio(
+                        "Mesure:",
+                        options=list(tile_manifest['measures']),
+                        format_func=tile_manifest['measures'].get
+                    )
+                    show_all = False
+                else:
+                    show_all = st.checkbox("Afficher tous les incidents individuels", value=False)
+                
+                # Emprise de la carte : seuls les incidents visibles sont envoyés au navigateur
+                city_centers = map_data.groupby('city')[['latitude', 'longitude']].median()
+                city_options = map_data['city'].value_counts().index.tolist()
+                map_focus = st.selectbox("Centrer sur:", ["France entière"] + city_options)
+                map_zoom = st.slider("Zoom:", min_value=4.0, max_value=12.0, value=5.5, step=0.5)
+                
+                if map_focus == "France entière":
+                    map_center = {"lat": 46.5, "lon": 2.5}
+                else:
+                    map_center = {
+                        "lat": float(city_centers.loc[map_focus, 'latitude']),
+                        "lon": float(city_centers.loc[map_focus, 'longitude'])
+                    }
+                lat_min, lat_max, lon_min, lon_max = spatial_index.viewport_bounds(map_center, map_zoom)
+                visible_labels = get_spatial_index(version).bbox(lat_min, lat_max, lon_min, lon_max)
+                visible_data = map_data[map_data.index.isin(visible_labels)]
+                visible_cities = city_map_data[
+                    city_map_data['latitude'].between(lat_min, lat_max) &
+                    city_map_data['longitude'].between(lon_min, lon_max)
+                ]
+                st.caption(f"{len(visible_data):,} incidents dans la zone affichée")
             
             with col1:
-                if show_all:
+                if use_tiles:
+                    # Calque précalculé du type d'attaque sélectionné (ou de tous les incidents)
+                    tile_preset = tiles.preset_for(tile_manifest, selected_attacks if len(selected_attacks) < len(attack_types) else [])
+                    fig_map = go.Figure(go.Scattermapbox(lat=[], lon=[]))
+                    fig_map.update_layout(
+                        mapbox=tiles.mapbox_layout(tile_preset, tile_measure, map_center, map_zoom),
+                        height=700,
+                        title=f"{tile_manifest['measures'][tile_measure]} en France : {tile_manifest['presets'][tile_preset]}"
+                    )
+                elif show_all:
                     # Carte avec tous les incidents individuels
                     fig_map = px.scatter_mapbox(
-                        map_data,
+                        visible_data,
                         lat='latitude',
                         lon='longitude',
                         hover_name='city',
@@ -263,15 +365,15 @@ def main():
                         color='attacktype1_txt',
                         size='nkill',
                         size_max=20,
-                        zoom=5.5,
-                        center={"lat": 46.5, "lon": 2.5},
+                        zoom=map_zoom,
+                        center=map_center,
                         height=700,
                         title="Tous les incidents terroristes en France (par incident)"
                     )
                 else:
                     # Carte agrégée par ville avec marqueurs proportionnels
                     fig_map = px.scatter_mapbox(
-                        city_map_data,
+                        visible_cities,
                         lat='latitude',
                         lon='longitude',
                         hover_name='city',
@@ -295,16 +397,15 @@ def main():
                         color='nombre_incidents',
                         size_max=50,
                         color_continuous_scale='Reds',
-                        zoom=5.5,
-                        center={"lat": 46.5, "lon": 2.5},
+                        zoom=map_zoom,
+                        center=map_center,
                         height=700,
                         title="Incidents terroristes en France agrégés par ville"
                     )
                 
-                fig_map.update_layout(
-                    mapbox_style=map_style,
-                    margin={"r": 0, "t": 40, "l": 0, "b": 0}
-                )
+                if not use_tiles:
+                    fig_map.update_layout(mapbox_style=map_style)
+                fig_map.update_layout(margin={"r": 0, "t": 40, "l": 0, "b": 0})
                 
                 st.plotly_chart(fig_map, use_container_width=True)
             
@@ -347,6 +448,44 @@ def main():
                 use_container_width=True,
                 height=400
             )
+            
+            # Incidents à proximité d'une ville (requête par rayon sur l'index spatial)
+            st.markdown("---")
+            st.subheader(":material/near_me: Incidents à proximité d'une ville")
+            
+            col1, col2 = st.columns([1, 3])
+            
+            with col1:
+                nearby_city = st.selectbox("Ville de référence:", city_options, key="nearby_city")
+                radius_km = st.slider("Rayon (km):", min_value=5, max_value=300, value=50, step=5)
+            
+            nearby_labels, nearby_distances = get_spatial_index(version).radius(
+                float(city_centers.loc[nearby_city, 'latitude']),
+                float(city_centers.loc[nearby_city, 'longitude']),
+                radius_km
+            )
+            # Seuls les incidents qui respectent les filtres de la page sont conservés
+            in_filters = filtered_france.index.get_indexer(nearby_labels) >= 0
+            nearby = filtered_france.loc[nearby_labels[in_filters]].copy()
+            nearby['distance_km'] = nearby_distances[in_filters].round(1)
+            
+            with col2:
+                st.metric(f"Incidents à moins de {radius_km} km de {nearby_city}", f"{len(nearby):,}")
+                if len(nearby) > 0:
+                    nearby_display = nearby[['distance_km', 'iyear', 'city', 'attacktype1_txt', 'gname', 'nkill', 'nwound']].rename(columns={
+                        'distance_km': 'Distance (km)',
+                        'iyear': 'Année',
+                        'city': 'Ville',
+                        'attacktype1_txt': 'Type d\'attaque',
+                        'gname': 'Groupe',
+                        'nkill': 'Tués',
+                        'nwound': 'Blessés'
+                    })
+                    st.dataframe(
+                        nearby_display,
+                        use_container_width=True,
+                        height=300
+                    )
     
     # Analyse temporelle détaillée
     st.header(":material/calendar_month: Analyse temporelle détaillée")
@@ -355,7 +494,7 @@ def main():
     
     with col1:
         # Distribution par mois
-        month_counts = filtered_france['imonth'].value_counts().sort_index()
+        month_counts = results['month_counts']
         month_names = {1: 'Jan', 2: 'Fév', 3: 'Mar', 4: 'Avr', 5: 'Mai', 6: 'Jun',
                       7: 'Jul', 8: 'Aoû', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Déc'}
         
@@ -372,7 +511,7 @@ def main():
     with col2:
         # Groupes terroristes
         if 'gname' in filtered_france.columns:
-            group_counts = filtered_france['gname'].value_counts().head(10)
+            group_counts = results['group_counts']
             group_counts = group_counts[group_counts.index != 'Unknown']  # Exclure "Unknown"
             
             if len(group_counts) > 0:
@@ -410,7 +549,7 @@ def main():
         
         with col4:
             # Groupe le plus meurtrier
-            group_kills = filtered_france.groupby('gname')['nkill'].sum().fillna(0)
+            group_kills = filtered_france.groupby('gname')['nkill'].sum()
             group_kills = group_kills[group_kills.index != 'Unknown']
             if len(group_kills) > 0:
                 deadliest = group_kills.idxmax()
@@ -447,16 +586,7 @@ def main():
             st.markdown("#### Statistiques détaillées")
             
             # Tableau des top groupes avec statistiques
-            group_stats = filtered_france.groupby('gname').agg({
-                'eventid': 'count',
-                'nkill': lambda x: int(x.fillna(0).sum()),
-                'nwound': lambda x: int(x.fillna(0).sum()),
-                'iyear': ['min', 'max']
-            }).round(0)
-            
-            group_stats.columns = ['Incidents', 'Tués', 'Blessés', 'Début', 'Fin']
-            group_stats = group_stats.sort_values('Incidents', ascending=False).head(15)
-            group_stats['Période'] = group_stats['Fin'] - group_stats['Début']
+            group_stats = analytics.group_stats(filtered_france)
             
             st.dataframe(
                 group_stats,
@@ -485,11 +615,11 @@ def main():
                 st.metric("Total incidents", f"{len(action_directe)}")
             
             with col2:
-                ad_killed = int(action_directe['nkill'].fillna(0).sum())
+                ad_killed = int(action_directe['nkill'].sum())
                 st.metric("Victimes tuées", f"{ad_killed}")
             
             with col3:
-                ad_wounded = int(action_directe['nwound'].fillna(0).sum())
+                ad_wounded = int(action_directe['nwound'].sum())
                 st.metric("Victimes blessées", f"{ad_wounded}")
             
             with col4:
@@ -574,7 +704,8 @@ def main():
             
             ad_available_columns = [col for col in ad_display_columns if col in action_directe.columns]
             
-            ad_display_df = action_directe[ad_available_columns].copy()
+            # Résumés relus uniquement pour les incidents listés
+            ad_display_df = store.attach(action_directe[ad_available_columns + ['text_id']], ['summary']).drop(columns='text_id')
             ad_display_df = ad_display_df.rename(columns={
                 'iyear': 'Année',
                 'imonth': 'Mois',
@@ -640,11 +771,11 @@ def main():
                 stats = {
                     'Groupe': group,
                     'Incidents': len(group_data),
-                    'Tués': int(group_data['nkill'].fillna(0).sum()),
-                    'Blessés': int(group_data['nwound'].fillna(0).sum()),
+                    'Tués': int(group_data['nkill'].sum()),
+                    'Blessés': int(group_data['nwound'].sum()),
                     'Début': int(group_data['iyear'].min()),
                     'Fin': int(group_data['iyear'].max()),
-                    'Létalité moyenne': round(group_data['nkill'].fillna(0).mean(), 2),
+                    'Létalité moyenne': round(group_data['nkill'].mean(), 2),
                     'Villes ciblées': group_data['city'].nunique()
                 }
                 
@@ -657,6 +788,158 @@ def main():
                 comparison_df_stats,
                 use_container_width=True
             )
+        
+        # Réseau de co-activité : groupes actifs dans les mêmes villes et provinces
+        st.markdown("---")
+        st.subheader(":material/hub: Réseau des groupes")
+        
+        col1, col2 = st.columns([3, 1])
+        
+        with col2:
+            network_scope = st.radio(
+                "Périmètre",
+                options=list(NETWORK_SCOPES),
+                format_func=NETWORK_SCOPES.get
+            )
+            min_years = st.slider("Années d'activité communes (minimum)", min_value=1, max_value=10, value=1)
+            shown_groups = st.slider("Groupes affichés", min_value=10, max_value=100, value=40, step=5)
+            st.caption("Deux groupes sont reliés s'ils ont frappé dans les mêmes villes ou provinces au cours de périodes communes. Épaisseur : lieux partagés ; taille : incidents ; couleur : communauté.")
+        
+        nodes, edges = load_group_network(
+            network_scope,
+            year_range,
+            tuple(sorted(selected_cities)),
+            tuple(sorted(selected_attacks)),
+            min_years,
+            version
+        )
+        
+        with col1:
+            if len(edges) == 0:
+                st.info("Aucun groupe ne partage de lieu avec un autre dans la sélection.")
+            else:
+                # Groupes les plus centraux et arêtes qui les relient
+                shown = nodes.sort_values(['centralité', 'force'], ascending=False).head(shown_groups)
+                shown_edges = edges[edges['source'].isin(shown.index) & edges['target'].isin(shown.index)]
+                position = pd.DataFrame(group_network.spring_layout(shown, shown_edges), index=shown.index, columns=['x', 'y'])
+                
+                fig_network = go.Figure()
+                max_weight = shown_edges['poids'].max() if len(shown_edges) > 0 else 1
+                for weight_level in [1, 2, 3]:
+                    # Arêtes regroupées en trois épaisseurs (une trace par épaisseur)
+                    level = shown_edges[np.ceil(shown_edges['poids'] / max_weight * 3).clip(1, 3) == weight_level]
+                    if len(level) == 0:
+                        continue
+                    ends = [position.loc[level['source']].to_numpy(), position.loc[level['target']].to_numpy()]
+                    path = np.full((len(level) * 3, 2), np.nan)
+                    path[0::3], path[1::3] = ends
+                    fig_network.add_trace(go.Scatter(
+                        x=path[:, 0], y=path[:, 1],
+                        mode='lines',
+                        line=dict(width=weight_level * 1.5, color='rgba(120, 120, 120, 0.45)'),
+                        hoverinfo='skip',
+                        showlegend=False
+                    ))
+                fig_network.add_trace(go.Scatter(
+                    x=position['x'], y=position['y'],
+                    mode='markers',
+                    marker=dict(
+                        size=8 + 30 * np.sqrt(shown['incidents'] / shown['incidents'].max()),
+                        color=shown['communauté'],
+                        colorscale='Turbo',
+                        line=dict(width=1, color='white')
+                    ),
+                    text=[f"{name}<br>Communauté {row['communauté']}<br>{row['incidents']} incidents<br>{row['degré']} groupes liés" for name, row in shown.iterrows()],
+                    hoverinfo='text',
+                    showlegend=False
+                ))
+                fig_network.update_layout(
+                    title=f"Co-activité des {len(shown)} groupes les plus centraux",
+                    height=600,
+                    xaxis=dict(visible=False),
+                    yaxis=dict(visible=False),
+                    plot_bgcolor='white'
+                )
+                st.plotly_chart(fig_network, use_container_width=True)
+        
+        if len(edges) > 0:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.markdown("#### Groupes les plus centraux")
+                central = nodes.sort_values('centralité', ascending=False).head(15)
+                st.dataframe(
+                    central.rename(columns={
+                        'incidents': 'Incidents',
+                        'degré': 'Groupes liés',
+                        'force': 'Lieux partagés',
+                        'centralité': 'Centralité',
+                        'communauté': 'Communauté'
+                    }).rename_axis('Groupe').round({'Centralité': 3}),
+                    use_container_width=True
+                )
+            
+            with col2:
+                st.markdown("#### Communautés")
+                st.dataframe(group_network.communities(nodes).head(15), use_container_width=True)
+            
+            st.markdown("#### Liens les plus forts")
+            st.dataframe(
+                edges.head(15).rename(columns={
+                    'source': 'Groupe',
+                    'target': 'Groupe lié',
+                    'villes': 'Villes communes',
+                    'provinces': 'Provinces communes',
+                    'années': 'Années communes',
+                    'poids': 'Poids'
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+    
+    # Distribution des victimes par incident (sketches fusionnés, sans trier les incidents)
+    casualty_sketches = analytics.filter_incidents(
+        get_casualty_sketches(version),
+        year_range=year_range,
+        cities=selected_cities,
+        attacks=selected_attacks
+    )
+    if len(casualty_sketches) > 0:
+        st.header(":material/monitor_heart: Victimes par incident")
+        
+        casualty_measure = st.radio(
+            "Mesure",
+            options=list(sketches.MEASURES),
+            format_func=sketches.MEASURES.get,
+            horizontal=True,
+            key='casualty_measure'
+        )
+        measure_label = sketches.MEASURES[casualty_measure]
+        st.caption("Quantiles estimés à 1 % près en fusionnant des sketches précalculés, sur les seuls incidents au bilan renseigné. Moustaches du minimum au p99.")
+        
+        attack_quantiles = sketches.measure_quantiles(casualty_sketches, casualty_measure, 'attacktype1_txt')
+        group_quantiles = sketches.measure_quantiles(casualty_sketches, casualty_measure, 'gname', top=8)
+        if len(attack_quantiles) == 0:
+            st.info(f"Aucun bilan renseigné pour la mesure « {measure_label} » dans la sélection.")
+        else:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.plotly_chart(
+                    sketches.box_plot(attack_quantiles, f"{measure_label} par incident selon le type d'attaque", measure_label),
+                    use_container_width=True
+                )
+            
+            with col2:
+                st.plotly_chart(
+                    sketches.box_plot(group_quantiles, f"{measure_label} par incident : groupes les plus actifs", measure_label),
+                    use_container_width=True
+                )
+            
+            st.dataframe(
+                sketches.quantile_table(group_quantiles).rename_axis("Groupe"),
+                use_container_width=True
+            )
     
     # Analyse des cibles et armes
     st.header(":material/my_location: Analyse des cibles et moyens")
@@ -666,7 +949,7 @@ def main():
     with col1:
         # Types de cibles
         if 'targtype1_txt' in filtered_france.columns:
-            target_counts = filtered_france['targtype1_txt'].value_counts().head(8)
+            target_counts = results['target_counts']
             
             fig_targets = px.pie(
                 values=target_counts.values,
@@ -679,7 +962,7 @@ def main():
     with col2:
         # Types d'armes
         if 'weaptype1_txt' in filtered_france.columns:
-            weapon_counts = filtered_france['weaptype1_txt'].value_counts().head(8)
+            weapon_counts = results['weapon_counts']
             
             fig_weapons = px.pie(
                 values=weapon_counts.values,
@@ -699,7 +982,14 @@ def main():
         'gname', 'nkill', 'nwound', 'summary'
     ]
     
-    available_columns = [col for col in display_columns if col in filtered_france.columns]
+    # Recherche plein texte dans les résumés et motifs (index inversé)
+    search_query = st.text_input("Rechercher dans les résumés (ex. Paris, bomb, nom de groupe)", "")
+    table_france = filtered_france
+    if search_query:
+        table_france = filtered_france[filtered_france['text_id'].isin(store.search(search_query))]
+        st.caption(f"{len(table_france):,} incident(s) correspondant à « {search_query} »")
+    
+    available_columns = [col for col in display_columns if col in table_france.columns]
     
     # Renommer les colonnes pour l'affichage
     column_names = {
@@ -717,7 +1007,7 @@ def main():
         'summary': 'Résumé'
     }
     
-    display_df = filtered_france[available_columns].copy()
+    display_df = store.attach(table_france[available_columns + ['text_id']], ['summary']).drop(columns='text_id')
     display_df = display_df.rename(columns=column_names)
     
     st.dataframe(
@@ -739,10 +1029,17 @@ def main():
     
     with col2:
         st.subheader("Bilan humain")
-        total_casualties = int(filtered_france['nkill'].fillna(0).sum() + filtered_france['nwound'].fillna(0).sum())
+        total_casualties = int(filtered_france['nkill'].sum() + filtered_france['nwound'].sum())
         st.write(f"**Total victimes:** {total_casualties:,}")
         avg_per_incident = total_casualties / len(filtered_france) if len(filtered_france) > 0 else 0
         st.write(f"**Moyenne par incident:** {avg_per_incident:.1f}")
+        stats = sketches.quantiles(casualty_sketches) if len(casualty_sketches) > 0 else None
+        if stats is not None and 'victimes' in stats.index:
+            victims = stats.loc['victimes']
+            st.write(f"**Médiane par incident:** {victims['médiane']:.1f}")
+            st.write(f"**p90 / p99 par incident:** {victims['p90']:.1f} / {victims['p99']:.1f}")
+        else:
+            st.write("**Médiane par incident:** aucun bilan renseigné")
     
     with col3:
         st.subheader("Répartition")
@@ -755,7 +1052,7 @@ def main():
     # Option de téléchargement
     st.header(":material/download: Télécharger les données")
     if st.button("Télécharger les données France (CSV)"):
-        csv = filtered_france.to_csv(index=False)
+        csv = session_memory.get_or_build('csv_france', view, lambda: store.attach(filtered_france).drop(columns='text_id').to_csv(index=False))
         st.download_button(
             label="Télécharger CSV France",
             data=csv,
@@ -0,0 +1,193 @@
+import streamlit as st
+import warnings
+import analytics
+import shared_data
+from charts import px
+from lazy import LazyModule
+
+session_memory = LazyModule('session_memory')
+
+warnings.filterwarnings('ignore')
+
+# Configuration de la page
+st.set_page_config(
+    page_title="Comparaison Europe",
+    page_icon=":material/compare_arrows:",
+    layout="wide"
+)
+
+@st.cache_data(max_entries=2)
+def load_data(version=0):
+    """Charge les données (chargement partagé avec la page principale), complétées des incidents ingérés pour une version > 0"""
+    try:
+        return shared_data.dataset(version)
+    except Exception as e:
+        st.error(f"Erreur lors du chargement des données: {e}")
+        st.info("Le fichier 'globalterrorismdb_0522dist.xlsx' ou 'globalterrorismdb_0522dist.zip' doit être dans le répertoire racine du projet.")
+        return None
+
+
+@st.cache_data
+def load_cube(countries, year_range, dimension, version):
+    """Agrégation (pays, année, modalité) de la sélection, mise en cache par combinaison de filtres et version des données"""
+    df = analytics.filter_incidents(load_data(version), year_range=year_range)
+    return analytics.comparison_cube(df, list(countries), dimension)
+
+
+# Dimensions disponibles pour la composition des incidents
+MIX_DIMENSIONS = {
+    "Types d'attaque": 'attacktype1_txt',
+    "Types de cible": 'targtype1_txt',
+    "Types d'arme": 'weaptype1_txt',
+}
+
+
+def main():
+    st.title(":material/compare_arrows: Comparaison entre pays européens")
+    session_memory.track("Europe")
+    st.markdown("### Tendances, ratios, modes opératoires et groupes communs")
+
+    # Chargement des données, complétées des incidents ingérés en continu (voir shared_data.py)
+    version = shared_data.live_version()
+    df = load_data(version)
+    if df is None:
+        st.stop()
+
+    # Sidebar pour les filtres
+    st.sidebar.header(":material/filter_alt: Filtres Europe")
+
+    available_countries = sorted(df['country_txt'].dropna().unique())
+    default_countries = [country for country in analytics.EUROPEAN_COUNTRIES if country in available_countries]
+    selected_countries = st.sidebar.multiselect(
+        "Pays à comparer",
+        options=available_countries,
+        default=default_countries
+    )
+
+    min_year = int(df['iyear'].min())
+    max_year = int(df['iyear'].max())
+    year_range = st.sidebar.slider(
+        "Période",
+        min_value=min_year,
+        max_value=max_year,
+        value=(min_year, max_year),
+        step=1
+    )
+
+    mix_label = st.sidebar.radio("Composition par", list(MIX_DIMENSIONS))
+
+    if not selected_countries:
+        st.warning("Sélectionnez au moins un pays.")
+        st.stop()
+
+    countries = tuple(sorted(selected_countries))
+    mix_dimension = MIX_DIMENSIONS[mix_label]
+    cube = load_cube(countries, year_range, mix_dimension, version)
+
+    if len(cube) == 0:
+        st.warning("Aucun incident trouvé avec les filtres sélectionnés.")
+        st.stop()
+
+    # Métriques principales
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Total incidents", f"{int(cube['incidents'].sum()):,}")
+
+    with col2:
+        st.metric("Victimes décédées", f"{int(cube['nkill'].sum()):,}")
+
+    with col3:
+        st.metric("Victimes blessées", f"{int(cube['nwound'].sum()):,}")
+
+    with col4:
+        st.metric("Pays avec incidents", f"{cube['country_txt'].nunique()} / {len(countries)}")
+
+    # Évolution temporelle comparée
+    st.header(":material/timeline: Évolution comparée")
+
+    timeline = cube.groupby(['country_txt', 'iyear'])['incidents'].sum()
+    timeline_pivot = timeline.unstack('iyear', fill_value=0)
+    timeline_pivot = timeline_pivot.loc[timeline_pivot.sum(axis=1).sort_values(ascending=False).index]
+
+    fig_heatmap = px.imshow(
+        timeline_pivot,
+        title="Incidents par pays et par année",
+        labels=dict(x="Année", y="Pays", color="Incidents"),
+        aspect="auto",
+        color_continuous_scale='Reds'
+    )
+    fig_heatmap.update_layout(height=max(400, 22 * len(timeline_pivot)))
+    st.plotly_chart(fig_heatmap, use_container_width=True)
+
+    timeline_df = timeline.reset_index()
+    top_countries = timeline_pivot.index[:8].tolist()
+    fig_timeline = px.line(
+        timeline_df[timeline_df['country_txt'].isin(top_countries)],
+        x='iyear',
+        y='incidents',
+        color='country_txt',
+        title="Évolution des 8 pays les plus touchés de la sélection",
+        labels={'iyear': 'Année', 'incidents': 'Nombre d\'incidents', 'country_txt': 'Pays'}
+    )
+    fig_timeline.update_layout(height=450, hovermode='x unified')
+    st.plotly_chart(fig_timeline, use_container_width=True)
+
+    # Ratios comparables
+    st.header(":material/percent: Ratios par pays")
+
+    st.dataframe(
+        analytics.country_ratios(cube),
+        use_container_width=True
+    )
+
+    # Composition des incidents
+    st.header(f":material/stacked_bar_chart: Composition : {mix_label.lower()}")
+
+    mix = analytics.dimension_mix(cube, mix_dimension)
+    mix = mix.loc[timeline_pivot.index.intersection(mix.index)]
+    mix_long = mix.reset_index().melt(id_vars='country_txt', var_name='modalite', value_name='part')
+
+    fig_mix = px.bar(
+        mix_long,
+        x='part',
+        y='country_txt',
+        color='modalite',
+        orientation='h',
+        title=f"Répartition des incidents par pays ({mix_label.lower()})",
+        labels={'part': 'Part des incidents (%)', 'country_txt': 'Pays', 'modalite': mix_label}
+    )
+    fig_mix.update_layout(height=max(400, 22 * len(mix)), yaxis={'categoryorder': 'array', 'categoryarray': mix.index[::-1].tolist()})
+    st.plotly_chart(fig_mix, use_container_width=True)
+
+    # Groupes actifs dans plusieurs pays
+    st.header(":material/groups: Groupes communs")
+
+    overlap, spread = analytics.group_overlap(load_cube(countries, year_range, 'gname', version))
+
+    if len(overlap) > 1:
+        col1, col2 = st.columns([2, 1])
+
+        with col1:
+            fig_overlap = px.imshow(
+                overlap,
+                title="Nombre de groupes actifs dans les deux pays",
+                labels=dict(x="Pays", y="Pays", color="Groupes communs"),
+                aspect="auto",
+                color_continuous_scale='Blues'
+            )
+            fig_overlap.update_layout(height=max(400, 22 * len(overlap)))
+            st.plotly_chart(fig_overlap, use_container_width=True)
+
+        with col2:
+            st.markdown("#### Groupes présents dans plusieurs pays")
+            multi_country = spread[spread > 1].rename('Pays touchés').to_frame()
+            if len(multi_country) > 0:
+                st.dataframe(multi_country, use_container_width=True, height=400)
+            else:
+                st.info("Aucun groupe identifié n'est actif dans plusieurs pays de la sélection.")
+    else:
+        st.info("Sélectionnez au moins deux pays avec des groupes identifiés pour comparer leurs groupes.")
+
+if __name__ == "__main__":
+    main()
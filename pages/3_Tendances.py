@@ -0,0 +1,162 @@
+import streamlit as st
+import warnings
+import shared_data
+from charts import px
+from lazy import LazyModule
+
+session_memory = LazyModule('session_memory')
+trends = LazyModule('trends')
+
+warnings.filterwarnings('ignore')
+
+# Configuration de la page
+st.set_page_config(
+    page_title="Tendances et menaces",
+    page_icon=":material/trending_up:",
+    layout="wide"
+)
+
+@st.cache_data(max_entries=2)
+def load_data(version=0):
+    """Charge les données (chargement partagé avec la page principale), complétées des incidents ingérés pour une version > 0"""
+    try:
+        return shared_data.dataset(version)
+    except Exception as e:
+        st.error(f"Erreur lors du chargement des données: {e}")
+        st.info("Le fichier 'globalterrorismdb_0522dist.xlsx' ou 'globalterrorismdb_0522dist.zip' doit être dans le répertoire racine du projet.")
+        return None
+
+
+@st.cache_data
+def load_counts(column, version):
+    """Matrice entités x années, calculée une fois pour toutes les entités (par version des données)"""
+    return trends.count_matrix(load_data(version), column)
+
+
+@st.cache_data
+def load_trend_table(column, window, end_year, version):
+    """Indicateurs de tendance de toutes les entités, précalculés par paramètres"""
+    return trends.trend_table(load_counts(column, version), window=window, end_year=end_year)
+
+
+# Entités analysables : libellé -> colonne
+ENTITIES = {
+    "Pays": 'country_txt',
+    "Groupes": 'gname',
+    "Régions": 'region_txt',
+}
+
+
+def main():
+    st.title(":material/trending_up: Tendances et menaces croissantes")
+    session_memory.track("Tendances")
+    st.markdown("### Classement des pays et groupes dont l'activité progresse")
+
+    # Chargement des données, complétées des incidents ingérés en continu (voir shared_data.py)
+    version = shared_data.live_version()
+    df = load_data(version)
+    if df is None:
+        st.stop()
+
+    # Sidebar pour les paramètres
+    st.sidebar.header(":material/tune: Paramètres")
+
+    entity_label = st.sidebar.radio("Entités", list(ENTITIES))
+    column = ENTITIES[entity_label]
+
+    counts = load_counts(column, version)
+    years = counts.columns.tolist()
+
+    window = st.sidebar.slider("Fenêtre (années)", min_value=2, max_value=10, value=5)
+    end_year = st.sidebar.selectbox(
+        "Année de fin d'analyse",
+        options=years[::-1],
+        index=0
+    )
+    min_incidents = st.sidebar.number_input(
+        "Incidents minimum sur la fenêtre récente",
+        min_value=0,
+        value=10,
+        step=5
+    )
+    exclude_unknown = st.sidebar.checkbox("Exclure « Unknown »", value=True)
+
+    table = load_trend_table(column, window, end_year, version)
+    table = table[table['Incidents (fenêtre récente)'] >= min_incidents]
+    if exclude_unknown:
+        table = table[table.index != 'Unknown']
+
+    if len(table) == 0:
+        st.warning("Aucune entité ne correspond aux paramètres sélectionnés.")
+        st.stop()
+
+    # Métriques principales
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric("Entités analysées", f"{len(table):,}")
+
+    with col2:
+        rising = int((table['Croissance (%)'] > 0).sum())
+        st.metric("En progression", f"{rising:,}")
+
+    with col3:
+        with_anomalies = int((table['Anomalies récentes'] > 0).sum())
+        st.metric("Avec anomalies récentes", f"{with_anomalies:,}")
+
+    # Classement
+    st.header(":material/leaderboard: Classement « menace croissante »")
+    st.caption(
+        f"Fenêtre récente : {end_year - window + 1}-{end_year}, comparée aux {window} années précédentes. "
+        "Une anomalie est une année à plus de 3 écarts-types de la moyenne des années précédentes."
+    )
+
+    top = table.head(20)
+    fig_ranking = px.bar(
+        x=top['Score'],
+        y=top.index,
+        orientation='h',
+        color=top['Croissance (%)'],
+        color_continuous_scale='Reds',
+        title=f"Top 20 des {entity_label.lower()} par score de progression",
+        labels={'x': 'Score', 'y': entity_label, 'color': 'Croissance (%)'}
+    )
+    fig_ranking.update_layout(height=600, yaxis={'categoryorder': 'total ascending'})
+    st.plotly_chart(fig_ranking, use_container_width=True)
+
+    st.dataframe(
+        table,
+        use_container_width=True,
+        height=400
+    )
+
+    # Détail d'une entité
+    st.header(":material/show_chart: Détail d'une série")
+
+    entity = st.selectbox("Entité :", top.index.tolist())
+    series = trends.entity_series(counts.loc[:, :end_year], entity, window=window)
+
+    fig_series = px.line(
+        series.reset_index(names='iyear'),
+        x='iyear',
+        y=['incidents', 'moyenne_glissante'],
+        title=f"Évolution de {entity}",
+        labels={'iyear': 'Année', 'value': 'Nombre d\'incidents', 'variable': ''}
+    )
+    anomalies = series[series['anomalie']]
+    if len(anomalies) > 0:
+        fig_series.add_scatter(
+            x=anomalies.index,
+            y=anomalies['incidents'],
+            mode='markers',
+            marker=dict(color='#DC143C', size=12, symbol='x'),
+            name='Anomalie'
+        )
+    change_year = table.loc[entity, 'Année de rupture']
+    fig_series.add_vline(x=change_year, line_dash='dash', line_color='gray')
+    fig_series.update_layout(height=450, hovermode='x unified')
+    st.plotly_chart(fig_series, use_container_width=True)
+    st.caption(f"Rupture la plus marquée : {change_year} (ligne pointillée).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import streamlit as st
+import pandas as pd
+import hmac
+import os
+import warnings
+import session_memory
+warnings.filterwarnings('ignore')
+
+# Configuration de la page
+st.set_page_config(
+    page_title="Administration",
+    page_icon=":material/admin_panel_settings:",
+    layout="wide"
+)
+
+
+def admin_token():
+    """Jeton des actions d'administration : variable ADMIN_TOKEN ou secret `admin_token` (None si aucun)"""
+    token = os.environ.get('ADMIN_TOKEN')
+    if token:
+        return token
+    try:
+        return st.secrets.get('admin_token') or None
+    except FileNotFoundError:
+        return None
+
+
+def actions_allowed():
+    """Actions réservées aux détenteurs du jeton, saisi dans la barre latérale"""
+    token = admin_token()
+    if token is None:
+        return False
+    entered = st.sidebar.text_input("Jeton d'administration", type="password")
+    return bool(entered) and hmac.compare_digest(entered.encode('utf-8'), token.encode('utf-8'))
+
+
+def main():
+    st.title(":material/admin_panel_settings: Administration")
+    st.markdown("### Mémoire du processus, des sessions et des caches")
+    session_memory.track("Administration")
+    store = session_memory.store
+
+    # Limites en vigueur (variables d'environnement, voir session_memory.py)
+    st.sidebar.header(":material/tune: Limites")
+    st.sidebar.write(f"**Par session :** {store.session_limit / session_memory.MB:,.0f} Mo")
+    st.sidebar.write(f"**Toutes sessions :** {store.total_limit / session_memory.MB:,.0f} Mo")
+    st.sidebar.write(f"**Déchargement après :** {store.idle_seconds:,.0f} s d'inactivité")
+    st.sidebar.write(f"**Oubli après :** {store.expiry_seconds:,.0f} s d'inactivité")
+    st.sidebar.write(f"**Mode :** {'décharge sur disque' if store.eviction == 'spill' else 'libération'}")
+
+    processes = session_memory.process_rss()
+    sessions, objects = store.report()
+    caches = session_memory.cache_stats()
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Mémoire du processus", f"{sum(rss for _, rss in processes.values()) / session_memory.MB:,.0f} Mo")
+
+    with col2:
+        st.metric("Sessions suivies", f"{len(sessions)}")
+
+    with col3:
+        st.metric("Objets des sessions en mémoire", f"{store.memory() / session_memory.MB:,.1f} Mo")
+
+    with col4:
+        st.metric("Caches de données", f"{caches['octets'].sum() / session_memory.MB:,.1f} Mo")
+
+    st.caption(f"{store.spilled:,} déchargement(s) sur disque, {store.reloaded:,} rechargement(s), {store.dropped:,} objet(s) libéré(s) depuis le démarrage.")
+
+    # Ces actions touchent toutes les sessions : réservées aux détenteurs du jeton
+    allowed = actions_allowed()
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        if st.button("Décharger les sessions inactives", disabled=not allowed):
+            count = store.release_idle(seconds=60)
+            st.success(f"{count} objet(s) déchargé(s).")
+
+    with col2:
+        if st.button("Vider les caches de données", disabled=not allowed):
+            st.cache_data.clear()
+            st.success("Caches st.cache_data vidés.")
+
+    with col3:
+        st.button("Rafraîchir")
+
+    if admin_token() is None:
+        st.caption("Actions désactivées : définir la variable d'environnement ADMIN_TOKEN (ou le secret `admin_token`) pour les autoriser.")
+    elif not allowed:
+        st.caption("Saisir le jeton d'administration dans la barre latérale pour décharger les sessions ou vider les caches.")
+
+    st.header(":material/group: Sessions")
+    if len(sessions) > 0:
+        st.dataframe(sessions.sort_values('objets en mémoire (Mo)', ascending=False).round(2), use_container_width=True, hide_index=True)
+    else:
+        st.info("Aucune session suivie.")
+
+    st.subheader("Objets des sessions")
+    if len(objects) > 0:
+        st.dataframe(objects.sort_values('taille (Mo)', ascending=False).round(2), use_container_width=True, hide_index=True)
+    else:
+        st.info("Aucun objet lourd rangé par les sessions.")
+
+    st.header(":material/cached: Caches")
+    caches['octets'] = caches['octets'] / session_memory.MB
+    st.dataframe(
+        caches.rename(columns={'octets': 'taille (Mo)'}).sort_values('taille (Mo)', ascending=False).round(2),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption("Streamlit mesure la taille des entrées st.cache_data ; pour st.cache_resource, seul le nombre d'entrées est connu.")
+
+    st.header(":material/memory: Processus")
+    st.dataframe(
+        pd.DataFrame(
+            [{'pid': pid, 'processus': name, 'mémoire résidente (Mo)': rss / session_memory.MB} for pid, (name, rss) in processes.items()]
+        ).round(1),
+        use_container_width=True,
+        hide_index=True
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""Exécution partitionnée multi-processus (map-reduce) pour les jeux de données volumineux
+
+Les données sont découpées en fichiers Parquet par année ou par région, eux-mêmes
+découpés en groupes de lignes de taille fixe. Chaque groupe de lignes est une tâche
+du pool de processus : lecture des seules colonnes utiles, filtres de la barre
+latérale, puis agrégats partiels fusionnables (comptages et sommes par clé). Les
+partiels sont additionnés dans le processus principal et mis en forme comme les
+résultats de analytics.py, ce qui permet de réutiliser les mêmes graphiques.
+
+Usage :
+    python partitioned.py build [--by iyear|region_txt]
+    python partitioned.py benchmark [--scale 50] [--workers 1 2 4 8]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import analytics
+import data_loader
+
+MANIFEST_FILE = 'manifest.json'
+ROW_GROUP_ROWS = 50_000
+
+# Colonnes lues par les filtres de la barre latérale
+FILTER_COLUMNS = {
+    'year_range': 'iyear',
+    'country': 'country_txt',
+    'regions': 'region_txt',
+    'attacks': 'attacktype1_txt',
+    'cities': 'city',
+}
+
+
+def grouped(by, values=(), finalize=None):
+    """Agrégation fusionnable : nombre d'incidents (et sommes de `values`) par clé `by`"""
+    return {'by': list(by), 'values': list(values), 'finalize': finalize or (lambda table: table)}
+
+
+def counts(column, top=None):
+    """Équivalent fusionnable de analytics.value_counts"""
+    def finalize(table):
+        result = table['incidents'].sort_values(ascending=False, kind='stable').rename('count')
+        return result.head(top) if top is not None else result
+    return grouped([column], finalize=finalize)
+
+
+# Équivalents des agrégations de la page principale et de la page France
+AGGREGATIONS = {
+    'global': {
+        'yearly_counts': grouped(['iyear'], finalize=lambda table: table['incidents'].reset_index()),
+        'monthly_pivot': grouped(['iyear', 'imonth'], finalize=lambda table: table['incidents'].unstack(fill_value=0)),
+        'country_counts': counts('country_txt', top=15),
+        'region_counts': counts('region_txt'),
+        'attack_counts': counts('attacktype1_txt'),
+        'weapon_counts': counts('weaptype1_txt', top=10),
+        'target_counts': counts('targtype1_txt', top=10),
+        'success_counts': counts('success'),
+    },
+    'france': {
+        'yearly_counts': grouped(['iyear'], finalize=lambda table: table['incidents'].reset_index()),
+        'attack_counts': counts('attacktype1_txt'),
+        'city_counts': counts('city', top=10),
+        'month_counts': grouped(['imonth'], finalize=lambda table: table['incidents'].rename('count').sort_index()),
+        'region_counts': counts('provstate', top=10),
+        'group_counts': counts('gname', top=10),
+        'target_counts': counts('targtype1_txt', top=8),
+        'weapon_counts': counts('weaptype1_txt', top=8),
+    },
+}
+
+
+def write_partitions(df, directory, by='iyear', row_group_rows=ROW_GROUP_ROWS):
+    """Découpe `df` en un fichier Parquet par valeur de `by` et écrit le manifeste"""
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+    partitions = []
+    for position, (value, part) in enumerate(df.groupby(by, sort=True)):
+        name = f"part-{position:05d}.parquet"
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        pq.write_table(table, os.path.join(directory, name), row_group_size=row_group_rows, compression='zstd')
+        partitions.append({
+            'file': name,
+            'value': value.item() if isinstance(value, np.generic) else value,
+            'row_groups': pq.ParquetFile(os.path.join(directory, name)).num_row_groups,
+            'rows': len(part),
+        })
+    manifest = {'by': by, 'columns': list(df.columns), 'partitions': partitions}
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, ensure_ascii=False)
+    return manifest
+
+
+def map_row_group(path, row_group, columns, filters, scope, specs):
+    """Agrégats partiels d'un groupe de lignes (exécuté dans un processus du pool)"""
+    df = pq.ParquetFile(path).read_row_group(row_group, columns=columns).to_pandas()
+    if scope == 'france':
+        df = analytics.france_subset(df)
+    df = analytics.filter_incidents(df, **filters)
+    partials = {}
+    for name, (by, values) in specs.items():
+        groups = df.groupby(by)
+        sizes = groups.size()
+        table = groups[values].sum() if values else pd.DataFrame(index=sizes.index)
+        table['incidents'] = sizes
+        partials[name] = table
+    return partials
+
+
+def worker_context():
+    """Démarrage des processus du pool : forkserver (Unix) qui précharge ce module, spawn ailleurs"""
+    # Les deux partent d'un interpréteur neuf, sans les threads du serveur. Avec forkserver,
+    # pandas, pyarrow et ce module ne sont importés qu'une fois (par le serveur de processus,
+    # lancé depuis le répertoire du projet) : chaque processus du pool en est une copie.
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['partitioned'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def reduce_partials(partials, by, values=()):
+    """Somme des agrégats partiels de même clé"""
+    partials = [partial for partial in partials if len(partial) > 0]
+    if not partials:
+        index = pd.Index([], name=by[0]) if len(by) == 1 else pd.MultiIndex.from_arrays([[]] * len(by), names=by)
+        return pd.DataFrame({column: pd.Series(dtype='int64') for column in [*values, 'incidents']}, index=index)
+    combined = pd.concat(partials)
+    return combined.groupby(level=list(range(combined.index.nlevels))).sum()
+
+
+class PartitionedDataset:
+    """Jeu de données partitionné sur disque, agrégé par un pool de processus local"""
+
+    def __init__(self, directory, workers=None):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as manifest_file:
+            self.manifest = json.load(manifest_file)
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._reducer = ThreadPoolExecutor(max_workers=2, thread_name_prefix='partition-reduce')
+
+    @property
+    def pool(self):
+        """Pool de processus créé au premier usage (forkserver ou spawn : sûr depuis un serveur multi-thread)"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+        return self._pool
+
+    def partitions(self, filters):
+        """Partitions pouvant contenir des incidents retenus par les filtres"""
+        by = self.manifest['by']
+        selected = self.manifest['partitions']
+        if by == 'iyear' and filters.get('year_range') is not None:
+            start, end = filters['year_range']
+            selected = [partition for partition in selected if start <= partition['value'] <= end]
+        elif by == 'region_txt' and filters.get('regions'):
+            selected = [partition for partition in selected if partition['value'] in filters['regions']]
+        return selected
+
+    def aggregate(self, filters, names=None, scope='global'):
+        """Calcule les agrégations `names` de `scope` sur les données filtrées, retourne {nom: résultat}"""
+        aggregations = AGGREGATIONS[scope]
+        names = list(aggregations) if names is None else [name for name in names if name in aggregations]
+        available = set(self.manifest['columns'])
+        names = [name for name in names if set(aggregations[name]['by']) <= available]
+        specs = {name: (aggregations[name]['by'], aggregations[name]['values']) for name in names}
+
+        columns = {FILTER_COLUMNS[key] for key, value in filters.items() if value}
+        columns.update(column for by, values in specs.values() for column in by + values)
+        if scope == 'france':
+            columns.add('country_txt')
+        columns = sorted(columns & available)
+
+        tasks = [
+            self.pool.submit(map_row_group, os.path.join(self.directory, partition['file']), row_group, columns, filters, scope, specs)
+            for partition in self.partitions(filters)
+            for row_group in range(partition['row_groups'])
+        ]
+        partials = [task.result() for task in tasks]
+
+        results = {}
+        for name in names:
+            table = reduce_partials([partial[name] for partial in partials], *specs[name])
+            results[name] = aggregations[name]['finalize'](table)
+        return results
+
+    def submit(self, filters, names=None, scope='global'):
+        """Lance l'agrégation sans attendre, retourne {nom: future} comme analytics.submit_aggregations"""
+        aggregations = AGGREGATIONS[scope]
+        names = list(aggregations) if names is None else [name for name in names if name in aggregations]
+        combined = self._reducer.submit(self.aggregate, filters, names, scope)
+        futures = {name: Future() for name in names}
+
+        def dispatch(done):
+            error = done.exception()
+            for name, future in futures.items():
+                if error is not None:
+                    future.set_exception(error)
+                elif name in done.result():
+                    future.set_result(done.result()[name])
+                else:
+                    future.set_exception(KeyError(name))
+
+        combined.add_done_callback(dispatch)
+        return futures
+
+
+@lru_cache(maxsize=None)
+def open_dataset(directory):
+    """Jeu de données partitionné de `directory`, partagé (avec son pool) par toutes les pages"""
+    return PartitionedDataset(directory)
+
+
+def synthetic(df, scale):
+    """Données synthétiques : `scale` copies de `df` aux identifiants renumérotés"""
+    copies = pd.concat([df] * scale, ignore_index=True)
+    if 'eventid' in copies.columns:
+        copies['eventid'] = np.arange(len(copies), dtype=np.int64)
+    return copies
+
+
+def benchmark(scale=50, workers=None, by='iyear'):
+    """Temps d'agrégation de la page principale sur des données `scale` fois plus grandes, par nombre de processus"""
+    workers = workers or sorted({1, 2, 4, os.cpu_count() or 1})
+    columns = sorted({column for spec in AGGREGATIONS['global'].values() for column in spec['by']} | set(FILTER_COLUMNS.values()))
+    df = data_loader.read_dataset()
+    df = synthetic(df[[column for column in columns if column in df.columns]], scale)
+    print(f"Données synthétiques : {len(df):,} lignes ({scale}x)")
+
+    # Référence : agrégations en mémoire dans un seul processus
+    reference_aggregations = {
+        'yearly_counts': analytics.yearly_counts,
+        'country_counts': analytics.value_counts('country_txt', top=15),
+        'attack_counts': analytics.value_counts('attacktype1_txt'),
+    }
+    start = time.perf_counter()
+    reference = {name: aggregate(df) for name, aggregate in reference_aggregations.items()}
+    print(f"En mémoire (1 processus) : {time.perf_counter() - start:.2f} s")
+
+    directory = tempfile.mkdtemp(prefix='gtd-partitions-')
+    try:
+        write_partitions(df, directory, by=by)
+        del df
+        timings = {}
+        for count in workers:
+            dataset = PartitionedDataset(directory, workers=count)
+            dataset.aggregate({}, ['yearly_counts'])  # démarrage du pool hors mesure
+            start = time.perf_counter()
+            results = dataset.aggregate({})
+            timings[count] = time.perf_counter() - start
+            dataset.pool.shutdown()
+            print(f"Partitionné, {count} processus : {timings[count]:.2f} s (accélération x{timings[workers[0]] / timings[count]:.2f})")
+
+        assert results['yearly_counts'].set_index('iyear')['incidents'].equals(reference['yearly_counts'].set_index('iyear')['incidents'])
+        assert results['country_counts'].sort_index().equals(reference['country_counts'].sort_index())
+        assert results['attack_counts'].sort_index().equals(reference['attack_counts'].sort_index())
+        print("[OK] Résultats identiques aux agrégations en mémoire")
+    finally:
+        shutil.rmtree(directory)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exécution partitionnée multi-processus")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="Découpe les données en partitions")
+    build.add_argument('--by', default='iyear', choices=['iyear', 'region_txt'], help="Colonne de partitionnement")
+    build.add_argument('--output', default=data_loader.PARTITION_DIR, help="Répertoire des partitions")
+    bench = commands.add_parser('benchmark', help="Mesure l'accélération sur données synthétiques")
+    bench.add_argument('--scale', type=int, default=50, help="Facteur de multiplication des données")
+    bench.add_argument('--workers', type=int, nargs='+', default=None, help="Nombres de processus à comparer")
+    bench.add_argument('--by', default='iyear', choices=['iyear', 'region_txt'], help="Colonne de partitionnement")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        try:
+            df = data_loader.read_dataset()
+        except FileNotFoundError as e:
+            print(f"[KO] {e}")
+            sys.exit(1)
+        manifest = write_partitions(df, args.output, by=args.by)
+        print(f"[OK] {len(manifest['partitions'])} partitions écrites dans {args.output}")
+    else:
+        benchmark(scale=args.scale, workers=args.workers, by=args.by)
+
+
+if __name__ == '__main__':
+    main()
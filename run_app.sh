@@ -11,5 +11,6 @@ echo "Pour arrêter l'application, utilisez Ctrl+C"
 echo ""
 
 # Activation de l'environnement virtuel et lancement de Streamlit
+# (python -m : les processus du pool partitionné ne réimportent pas le lanceur)
 source .venv/bin/activate
-streamlit run streamlit_app.py
+python -m streamlit run streamlit_app.py
@@ -0,0 +1,309 @@
+"""Mémoire par session : comptabilité, limites, déchargement sur disque
+
+Les objets lourds propres à une session (vue filtrée, exploration croisée, export
+CSV) sont rangés dans un magasin partagé par le processus, et non dans
+st.session_state.
+Leur taille est mesurée à l'entrée, ce qui permet de les libérer ou de les
+décharger sur disque depuis n'importe quelle session. Les limites sont
+configurables par variables d'environnement :
+- SESSION_MEMORY_LIMIT_MB : mémoire d'une session (défaut 256 Mo) ; au-delà, ses
+  objets les moins récemment utilisés sont déchargés ;
+- SESSIONS_MEMORY_LIMIT_MB : mémoire de toutes les sessions (défaut 1024 Mo) ;
+  au-delà, les sessions inactives puis les plus lourdes sont déchargées ;
+- SESSION_IDLE_SECONDS : inactivité au-delà de laquelle les objets d'une session
+  sont déchargés (défaut 600 s) ;
+- SESSION_EXPIRY_SECONDS : inactivité au-delà de laquelle une session est
+  oubliée, objets déchargés compris (défaut 3600 s) ;
+- SESSION_EVICTION : 'spill' (décharge dans .session_spill/, rechargé à la
+  demande) ou 'drop' (libère l'objet, recalculé par la page).
+
+Un objet déchargé est rechargé de façon transparente par get().
+"""
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+SPILL_DIR = '.session_spill'
+MB = 2 ** 20
+
+
+def _setting(name, default):
+    """Réglage numérique lu dans l'environnement"""
+    return float(os.environ.get(name, default))
+
+
+def sizeof(obj, _seen=None):
+    """Taille approximative en octets d'un objet (DataFrame, tableaux, conteneurs, objets)"""
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(sizeof(key, seen) + sizeof(value, seen) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + sum(sizeof(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        return sys.getsizeof(obj) + sizeof(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+
+def process_rss():
+    """{pid: (nom, octets)} du processus courant et de ses descendants directs (Linux : /proc)"""
+    own = os.getpid()
+    if not os.path.isdir('/proc'):
+        import resource
+        # Hors Linux : pic du seul processus courant (ru_maxrss en octets sur macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {own: ('python', peak if sys.platform == 'darwin' else peak * 1024)}
+    result = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/status') as status:
+                fields = dict(line.split(':', 1) for line in status if ':' in line)
+        except OSError:
+            continue
+        pid, parent = int(entry), int(fields.get('PPid', '0').strip() or 0)
+        if (pid == own or parent == own) and 'VmRSS' in fields:
+            result[pid] = (fields['Name'].strip(), int(fields['VmRSS'].split()[0]) * 1024)
+    return result
+
+
+def cache_stats():
+    """Mémoire des caches st.cache_data (octets) et nombre d'entrées st.cache_resource, par fonction"""
+    from streamlit.runtime.caching import get_data_cache_stats_provider, get_resource_cache_stats_provider
+
+    rows = []
+    for kind, provider in [('cache_data', get_data_cache_stats_provider()), ('cache_resource', get_resource_cache_stats_provider())]:
+        for stats in provider.get_stats().values():
+            for stat in stats:
+                # Streamlit mesure les données en octets, les ressources en nombre d'entrées
+                rows.append({'cache': kind, 'fonction': stat.cache_name, 'octets' if kind == 'cache_data' else 'entrées': stat.byte_length})
+    return pd.DataFrame(rows, columns=['cache', 'fonction', 'octets', 'entrées'])
+
+
+class SessionStore:
+    """Objets lourds des sessions, mesurés et déchargés selon les limites"""
+
+    def __init__(self, session_limit, total_limit, idle_seconds, expiry_seconds, eviction='spill', spill_dir=SPILL_DIR):
+        self.session_limit = session_limit
+        self.total_limit = total_limit
+        self.idle_seconds = idle_seconds
+        self.expiry_seconds = expiry_seconds
+        self.eviction = eviction
+        self.spill_dir = spill_dir
+        # {session: {'page', 'last_seen', 'state_bytes', 'objects': {clé: {'value', 'bytes', 'path', 'last_used'}}}}
+        self.sessions = {}
+        self.spilled = 0
+        self.reloaded = 0
+        self.dropped = 0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_environment(cls):
+        """Magasin configuré par les variables d'environnement (voir le docstring du module)"""
+        return cls(
+            session_limit=_setting('SESSION_MEMORY_LIMIT_MB', 256) * MB,
+            total_limit=_setting('SESSIONS_MEMORY_LIMIT_MB', 1024) * MB,
+            idle_seconds=_setting('SESSION_IDLE_SECONDS', 600),
+            expiry_seconds=_setting('SESSION_EXPIRY_SECONDS', 3600),
+            eviction=os.environ.get('SESSION_EVICTION', 'spill'),
+        )
+
+    def _session(self, session):
+        return self.sessions.setdefault(session, {'page': None, 'last_seen': time.time(), 'state_bytes': 0, 'objects': {}})
+
+    def track(self, session, page, state_bytes):
+        """Activité d'une session : page affichée et taille de son st.session_state"""
+        with self._lock:
+            entry = self._session(session)
+            entry.update(page=page, last_seen=time.time(), state_bytes=state_bytes)
+            self.enforce(session)
+
+    def put(self, session, key, value):
+        """Range un objet de la session (mesuré une fois) puis applique les limites"""
+        with self._lock:
+            entry = self._session(session)
+            self._discard(entry['objects'].get(key))
+            now = time.time()
+            entry['objects'][key] = {'value': value, 'bytes': sizeof(value), 'path': None, 'last_used': now}
+            entry['last_seen'] = now
+            self.enforce(session, keep=key)
+
+    def get(self, session, key, default=None):
+        """Objet de la session, rechargé depuis le disque s'il a été déchargé"""
+        with self._lock:
+            entry = self.sessions.get(session)
+            item = entry['objects'].get(key) if entry else None
+            if item is None:
+                return default
+            if item['path'] is not None:
+                with open(item['path'], 'rb') as spill:
+                    item['value'] = pickle.load(spill)
+                os.remove(item['path'])
+                item['path'] = None
+                self.reloaded += 1
+            item['last_used'] = entry['last_seen'] = time.time()
+            self.enforce(session, keep=key)
+            return item['value']
+
+    def _discard(self, item):
+        """Supprime le fichier de déchargement d'un objet remplacé ou oublié"""
+        if item is not None and item['path'] is not None and os.path.exists(item['path']):
+            os.remove(item['path'])
+
+    def _evict(self, session, key):
+        """Décharge (ou libère) un objet en mémoire"""
+        item = self.sessions[session]['objects'][key]
+        if self.eviction == 'drop':
+            del self.sessions[session]['objects'][key]
+            self.dropped += 1
+            return
+        directory = os.path.join(self.spill_dir, session)
+        os.makedirs(directory, exist_ok=True)
+        item['path'] = os.path.join(directory, f"{key}.pkl")
+        with open(item['path'], 'wb') as spill:
+            pickle.dump(item['value'], spill, protocol=pickle.HIGHEST_PROTOCOL)
+        item['value'] = None
+        self.spilled += 1
+
+    def memory(self, session=None):
+        """Octets des objets en mémoire (d'une session, ou de toutes)"""
+        sessions = [session] if session is not None else list(self.sessions)
+        return sum(
+            item['bytes']
+            for name in sessions if name in self.sessions
+            for item in self.sessions[name]['objects'].values() if item['path'] is None
+        )
+
+    def enforce(self, current=None, keep=None, now=None):
+        """Applique expiration, inactivité et limites ; ne touche pas à l'objet `keep` de la session courante"""
+        with self._lock:
+            now = now or time.time()
+            for session, entry in list(self.sessions.items()):
+                idle = now - entry['last_seen']
+                if session != current and idle > self.expiry_seconds:
+                    self.forget(session)
+                elif session != current and idle > self.idle_seconds:
+                    for key, item in list(entry['objects'].items()):
+                        if item['path'] is None:
+                            self._evict(session, key)
+
+            def in_memory(session):
+                items = self.sessions[session]['objects'].items()
+                protected = keep if session == current else None
+                return sorted((item['last_used'], key) for key, item in items if item['path'] is None and key != protected)
+
+            # Limite par session : objets les moins récemment utilisés d'abord
+            for session in list(self.sessions):
+                for _, key in in_memory(session):
+                    if self.memory(session) <= self.session_limit:
+                        break
+                    self._evict(session, key)
+
+            # Limite globale : sessions les plus anciennement actives, puis les plus lourdes
+            order = sorted(self.sessions, key=lambda name: (name == current, self.sessions[name]['last_seen'], -self.memory(name)))
+            for session in order:
+                for _, key in in_memory(session):
+                    if self.memory() <= self.total_limit:
+                        return
+                    self._evict(session, key)
+
+    def release_idle(self, seconds=0):
+        """Décharge immédiatement les objets des sessions inactives depuis `seconds`, retourne leur nombre"""
+        with self._lock:
+            now = time.time()
+            count = 0
+            for session, entry in self.sessions.items():
+                if now - entry['last_seen'] >= seconds:
+                    for key, item in list(entry['objects'].items()):
+                        if item['path'] is None:
+                            self._evict(session, key)
+                            count += 1
+            return count
+
+    def forget(self, session):
+        """Oublie une session et supprime ses objets déchargés"""
+        with self._lock:
+            self.sessions.pop(session, None)
+            shutil.rmtree(os.path.join(self.spill_dir, session), ignore_errors=True)
+
+    def report(self):
+        """Sessions (page, inactivité, mémoire) et objets (taille, emplacement) : deux DataFrames"""
+        with self._lock:
+            now = time.time()
+            sessions, objects = [], []
+            for session, entry in self.sessions.items():
+                on_disk = sum(item['bytes'] for item in entry['objects'].values() if item['path'] is not None)
+                sessions.append({
+                    'session': session[:8],
+                    'page': entry['page'],
+                    'inactive (s)': round(now - entry['last_seen']),
+                    'état de session (Mo)': entry['state_bytes'] / MB,
+                    'objets en mémoire (Mo)': self.memory(session) / MB,
+                    'objets sur disque (Mo)': on_disk / MB,
+                })
+                for key, item in entry['objects'].items():
+                    objects.append({
+                        'session': session[:8],
+                        'objet': key,
+                        'type': type(item['value']).__name__ if item['path'] is None else 'déchargé',
+                        'taille (Mo)': item['bytes'] / MB,
+                        'emplacement': 'mémoire' if item['path'] is None else item['path'],
+                        'utilisé il y a (s)': round(now - item['last_used']),
+                    })
+            return pd.DataFrame(sessions), pd.DataFrame(objects)
+
+
+# Magasin du processus, partagé par toutes les sessions et toutes les pages
+store = SessionStore.from_environment()
+
+
+def session_id():
+    """Identifiant de la session Streamlit en cours ('local' hors session)"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'local'
+
+
+def track(page):
+    """À appeler à chaque exécution d'une page : activité et taille de l'état de la session"""
+    import streamlit as st
+
+    state_bytes = sum(sizeof(value) for value in st.session_state.to_dict().values())
+    store.track(session_id(), page, state_bytes)
+
+
+def put(key, value):
+    """Range un objet lourd de la session en cours"""
+    store.put(session_id(), key, value)
+
+
+def get(key, default=None):
+    """Objet lourd de la session en cours (rechargé s'il a été déchargé)"""
+    return store.get(session_id(), key, default)
+
+
+def get_or_build(key, signature, build):
+    """Objet de la session pour `signature`, reconstruit par `build()` (et rangé) quand la signature change"""
+    state = get(key)
+    if state is None or state[0] != signature:
+        state = (signature, build())
+        put(key, state)
+    return state[1]
@@ -0,0 +1,59 @@
+"""Données partagées par toutes les pages : chargement de la base et ingestion continue
+
+Les caches st.cache_resource sont propres à la fonction qui les déclare. Le
+chargement de la base et l'ingestor sont donc définis ici, une seule fois : toutes
+les pages partagent la même copie de la base et le même ingestor (seul
+propriétaire de incoming/), et voient les mêmes incidents ingérés.
+"""
+import streamlit as st
+
+import analytics
+import data_loader
+from lazy import LazyModule
+
+ingest = LazyModule('ingest')
+text_store = LazyModule('text_store')
+
+
+def read_data():
+    """Lit les données et déporte les textes libres (exécuté dans le thread de chargement)"""
+    # Les textes libres (résumé, motif) sont déportés dans le stockage compact
+    df = text_store.detach_text(data_loader.read_dataset())
+    if data_loader.read_summary() is None:
+        # Premier lancement : le résumé accélérera l'affichage des démarrages suivants
+        data_loader.write_summary(analytics.build_summary(df))
+    return df
+
+
+@st.cache_resource
+def start_loading():
+    """Lance le chargement des données en arrière-plan, une seule fois pour toutes les sessions"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix='data-loader').submit(read_data)
+
+
+@st.cache_resource
+def get_ingestor():
+    """Ingestion continue des dépôts incoming/*.jsonl, partagée par toutes les sessions et toutes les pages"""
+    return ingest.LiveIngestor(start_loading().result())
+
+
+def live_version():
+    """Ingère les dépôts en attente, retourne la version des données (0 : base seule)"""
+    if start_loading().exception() is not None:
+        # Échec du chargement : signalé à la page par dataset()
+        return 0
+    live = get_ingestor()
+    live.poll()
+    return live.version
+
+
+def dataset(version=0):
+    """Base (version 0) ou base complétée des incidents ingérés ; relance le chargement en cas d'échec"""
+    try:
+        return get_ingestor().frame() if version else start_loading().result()
+    except Exception:
+        # Nouvelle tentative au prochain rechargement de la page
+        start_loading.clear()
+        raise
@@ -0,0 +1,141 @@
+"""Sketches de quantiles fusionnables pour la distribution des victimes par incident
+
+Les victimes (tués, blessés) suivent une distribution à queue très lourde : sommes et
+moyennes en disent peu. Chaque cellule du cube (région, pays, année, type d'attaque,
+groupe) porte un sketch à la DDSketch : un histogramme à seaux logarithmiques dont
+l'erreur relative est bornée par RELATIVE_ACCURACY. Fusionner des sketches revient à
+additionner les effectifs des seaux identiques. Médiane, p90 et p99 d'une sélection
+quelconque se lisent donc sur quelques milliers de seaux, sans trier les incidents.
+
+Les sketches sont rangés dans un DataFrame long (dimensions, `measure`, `bucket`,
+`count`) : les filtres de analytics.filter_incidents s'y appliquent tels quels.
+Seules les valeurs renseignées (`nkill_known`, `nwound_known`, voir cleaning.py)
+entrent dans les distributions.
+"""
+import numpy as np
+import pandas as pd
+
+from charts import go
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+# Seau des valeurs nulles (la majorité des incidents), rangé avant tous les autres
+ZERO_BUCKET = int(np.iinfo(np.int32).min)
+
+# Dimensions des cellules du cube global
+CELL_DIMENSIONS = ['region_txt', 'country_txt', 'iyear', 'attacktype1_txt', 'gname']
+
+MEASURES = {
+    'victimes': "Victimes (tués + blessés)",
+    'nkill': "Tués",
+    'nwound': "Blessés",
+}
+
+QUANTILES = {'médiane': 0.5, 'p90': 0.9, 'p99': 0.99}
+QUANTILE_LABELS = {'incidents': "Incidents renseignés", 'médiane': "Médiane", 'p90': "p90", 'p99': "p99"}
+# Statistiques des boîtes : quartiles, moustaches du minimum au p99
+BOX_QUANTILES = {'min': 0.0, 'q1': 0.25, 'médiane': 0.5, 'q3': 0.75, 'p90': 0.9, 'p99': 0.99}
+
+
+def bucket_keys(values):
+    """Seau de chaque valeur positive ou nulle"""
+    values = np.asarray(values, dtype=np.float64)
+    keys = np.full(len(values), ZERO_BUCKET, dtype=np.int64)
+    positive = values > 0
+    keys[positive] = np.ceil(np.log(values[positive]) / np.log(GAMMA)).astype(np.int64)
+    return keys
+
+
+def bucket_values(keys):
+    """Valeur représentative de chaque seau (erreur relative au plus RELATIVE_ACCURACY)"""
+    keys = np.asarray(keys, dtype=np.int64)
+    zero = keys == ZERO_BUCKET
+    values = 2 * GAMMA ** np.where(zero, 0, keys).astype(np.float64) / (GAMMA + 1)
+    return np.where(zero, 0.0, values)
+
+
+def build_sketches(df, by=CELL_DIMENSIONS):
+    """Sketches de chaque cellule `by` pour chaque mesure"""
+    by = [column for column in by if column in df.columns]
+    values = {
+        'nkill': df['nkill'].to_numpy(dtype=np.float64),
+        'nwound': df['nwound'].to_numpy(dtype=np.float64),
+    }
+    known = {
+        'nkill': df['nkill_known'].to_numpy(dtype=bool),
+        'nwound': df['nwound_known'].to_numpy(dtype=bool),
+    }
+    values['victimes'] = values['nkill'] + values['nwound']
+    known['victimes'] = known['nkill'] & known['nwound']
+
+    parts = []
+    for measure in MEASURES:
+        mask = known[measure]
+        part = df.loc[mask, by].copy()
+        part['measure'] = measure
+        part['bucket'] = bucket_keys(values[measure][mask])
+        parts.append(part)
+    cells = pd.concat(parts, ignore_index=True)
+    return cells.groupby(by + ['measure', 'bucket'], dropna=False, sort=False).size().reset_index(name='count')
+
+
+def merge(*sketches):
+    """Fusion de jeux de sketches de mêmes dimensions (addition des effectifs par seau)"""
+    combined = pd.concat(sketches, ignore_index=True)
+    keys = [column for column in combined.columns if column != 'count']
+    return combined.groupby(keys, dropna=False, sort=False)['count'].sum().reset_index()
+
+
+def quantiles(sketches, by=None, levels=QUANTILES):
+    """Quantiles de chaque mesure, par modalité de `by`, après fusion des cellules
+
+    Retourne un DataFrame indexé par (by..., measure) : le nombre d'incidents
+    renseignés puis une colonne par niveau de `levels`.
+    """
+    by = [by] if isinstance(by, str) else list(by or [])
+    keys = by + ['measure']
+    merged = sketches.groupby(keys + ['bucket'], dropna=False)['count'].sum().reset_index()
+    groups = merged.groupby(keys, dropna=False)['count']
+    rank = groups.cumsum()
+    total = groups.transform('sum')
+
+    result = groups.sum().rename('incidents').to_frame()
+    for name, level in levels.items():
+        # Premier seau dont l'effectif cumulé dépasse le rang q (n - 1)
+        first = merged[rank > level * (total - 1)].groupby(keys, dropna=False)['bucket'].first()
+        result[name] = pd.Series(bucket_values(first.to_numpy()), index=first.index)
+    return result
+
+
+def measure_quantiles(sketches, measure, by, top=None):
+    """Quantiles d'une mesure par modalité de `by`, modalités les plus fréquentes en tête (vide si aucun bilan renseigné)"""
+    stats = quantiles(sketches, by, levels=BOX_QUANTILES)
+    if measure not in stats.index.get_level_values('measure'):
+        # Mesure jamais renseignée dans la sélection (ex. blessés inconnus pour les victimes)
+        return stats.iloc[:0].droplevel('measure')
+    stats = stats.xs(measure, level='measure')
+    stats = stats.sort_values('incidents', ascending=False)
+    return stats.head(top) if top is not None else stats
+
+
+def quantile_table(stats):
+    """Tableau affichable : incidents renseignés, médiane, p90 et p99"""
+    return stats[list(QUANTILE_LABELS)].round(1).rename(columns=QUANTILE_LABELS)
+
+
+def box_plot(stats, title, label):
+    """Boîtes à moustaches précalculées (quartiles, moustaches du minimum au p99)"""
+    names = [str(name) for name in stats.index]
+    fig = go.Figure(go.Box(
+        x=names,
+        q1=stats['q1'],
+        median=stats['médiane'],
+        q3=stats['q3'],
+        lowerfence=stats['min'],
+        upperfence=stats['p99'],
+        name=label,
+        boxpoints=False,
+        hoverinfo='x+y',
+    ))
+    fig.update_layout(title=title, yaxis_title=label, height=450, showlegend=False)
+    return fig
@@ -0,0 +1,115 @@
+"""Index spatial des incidents pour les requêtes par rayon et par emprise
+
+Les points sont triés par cellule d'une grille régulière en degrés : les cellules
+d'une même bande de latitude sont contiguës, une requête par emprise se réduit à
+quelques `searchsorted` puis à un filtrage exact des candidats.
+"""
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+class SpatialIndex:
+    """Grille triée sur latitude/longitude, construite une fois au chargement"""
+
+    def __init__(self, latitude, longitude, labels, cell_degrees=0.5):
+        latitude = np.asarray(latitude, dtype=np.float64)
+        longitude = np.asarray(longitude, dtype=np.float64)
+        labels = np.asarray(labels)
+        # Seules les coordonnées valides sont indexées
+        valid = (
+            np.isfinite(latitude) & np.isfinite(longitude)
+            & (np.abs(latitude) <= 90) & (np.abs(longitude) <= 180)
+        )
+        latitude, longitude, labels = latitude[valid], longitude[valid], labels[valid]
+
+        self.cell_degrees = cell_degrees
+        self.n_cols = int(np.ceil(360 / cell_degrees)) + 1
+        keys = self._row(latitude) * self.n_cols + self._col(longitude)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.latitude = latitude[order]
+        self.longitude = longitude[order]
+        self.labels = labels[order]
+
+    @classmethod
+    def from_frame(cls, df, cell_degrees=0.5):
+        """Index sur les colonnes latitude/longitude d'un DataFrame (étiquettes = index)"""
+        return cls(df['latitude'], df['longitude'], df.index.to_numpy(), cell_degrees)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _row(self, latitude):
+        return np.floor((np.asarray(latitude) + 90) / self.cell_degrees).astype(np.int64)
+
+    def _col(self, longitude):
+        return np.floor((np.asarray(longitude) + 180) / self.cell_degrees).astype(np.int64)
+
+    def _candidates(self, lat_min, lat_max, lon_min, lon_max):
+        """Positions des points des cellules recouvrant l'emprise (sans antiméridien)"""
+        col_min, col_max = self._col(lon_min), self._col(lon_max)
+        rows = np.arange(self._row(max(lat_min, -90)), self._row(min(lat_max, 90)) + 1)
+        if not len(rows):
+            return np.empty(0, dtype=np.int64)
+        starts = np.searchsorted(self.keys, rows * self.n_cols + col_min, side='left')
+        ends = np.searchsorted(self.keys, rows * self.n_cols + col_max, side='right')
+        return np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+
+    def bbox_positions(self, lat_min, lat_max, lon_min, lon_max):
+        """Positions (dans l'index) des points situés dans l'emprise"""
+        if lon_min > lon_max:
+            # Emprise à cheval sur l'antiméridien
+            return np.concatenate([
+                self.bbox_positions(lat_min, lat_max, lon_min, 180),
+                self.bbox_positions(lat_min, lat_max, -180, lon_max),
+            ])
+        candidates = self._candidates(lat_min, lat_max, lon_min, lon_max)
+        lat, lon = self.latitude[candidates], self.longitude[candidates]
+        inside = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+        return candidates[inside]
+
+    def bbox(self, lat_min, lat_max, lon_min, lon_max):
+        """Étiquettes des incidents situés dans l'emprise"""
+        return self.labels[self.bbox_positions(lat_min, lat_max, lon_min, lon_max)]
+
+    def radius(self, latitude, longitude, radius_km):
+        """Étiquettes et distances (km) des incidents à moins de `radius_km`, du plus proche au plus lointain"""
+        # Emprise englobant la calotte sphérique (toutes longitudes si elle contient un pôle)
+        angle = radius_km / EARTH_RADIUS_KM
+        lat_delta = np.degrees(angle)
+        if abs(latitude) + lat_delta >= 90 or angle >= np.pi / 2:
+            lon_min, lon_max = -180.0, 180.0
+        else:
+            lon_delta = np.degrees(np.arcsin(np.sin(angle) / np.cos(np.radians(latitude))))
+            lon_min = (longitude - lon_delta + 180) % 360 - 180
+            lon_max = (longitude + lon_delta + 180) % 360 - 180
+        positions = self.bbox_positions(latitude - lat_delta, latitude + lat_delta, lon_min, lon_max)
+
+        distances = haversine_km(latitude, longitude, self.latitude[positions], self.longitude[positions])
+        within = distances <= radius_km
+        positions, distances = positions[within], distances[within]
+        order = np.argsort(distances, kind='stable')
+        return self.labels[positions[order]], distances[order]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique en kilomètres (vectorisée)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def viewport_bounds(center, zoom, width_px=1000, height_px=700):
+    """Emprise approximative (lat_min, lat_max, lon_min, lon_max) d'une carte web-mercator"""
+    # Carte mapbox : le monde fait 512 * 2^zoom pixels de large
+    lon_span = 360 * width_px / (512 * 2 ** zoom)
+    lat_span = lon_span * height_px / width_px * np.cos(np.radians(center['lat']))
+    lon_min = (center['lon'] - lon_span / 2 + 180) % 360 - 180 if lon_span < 360 else -180.0
+    lon_max = (center['lon'] + lon_span / 2 + 180) % 360 - 180 if lon_span < 360 else 180.0
+    return (
+        max(center['lat'] - lat_span / 2, -90.0),
+        min(center['lat'] + lat_span / 2, 90.0),
+        lon_min,
+        lon_max,
+    )
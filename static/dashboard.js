@@ -0,0 +1,402 @@
+/* Tableau de bord statique : filtres, agrégations et graphiques calculés dans le navigateur
+ *
+ * Les données (data/*.js, écrites par static_export.py) sont des cubes précalculés :
+ * une ligne par combinaison de dimensions, colonnes d'entiers non signés en base64,
+ * dimensions codées par des dictionnaires de libellés partagés par tous les cubes.
+ * Les filtres sont conservés dans l'adresse (#...) : une vue se partage par un lien.
+ */
+(function (root) {
+  'use strict';
+
+  var TYPES = { Uint8: Uint8Array, Uint16: Uint16Array, Uint32: Uint32Array };
+  var MONTHS = ['Inconnu', 'Janv.', 'Févr.', 'Mars', 'Avr.', 'Mai', 'Juin', 'Juil.', 'Août', 'Sept.', 'Oct.', 'Nov.', 'Déc.'];
+
+  // --- Données ---
+
+  function decodeColumn(column) {
+    var binary = atob(column.data);
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    return new TYPES[column.type](bytes.buffer);
+  }
+
+  function decodeCubes(data) {
+    var cubes = {};
+    Object.keys(data.cubes).forEach(function (name) {
+      var cube = { rows: data.cubes[name].rows, columns: {} };
+      Object.keys(data.cubes[name].columns).forEach(function (column) {
+        cube.columns[column] = decodeColumn(data.cubes[name].columns[column]);
+      });
+      cubes[name] = cube;
+    });
+    return cubes;
+  }
+
+  // --- Filtres ---
+
+  function codesWhere(labels, keep) {
+    var flags = new Uint8Array(labels.length);
+    for (var i = 0; i < labels.length; i++) flags[i] = keep(labels[i], i) ? 1 : 0;
+    return flags;
+  }
+
+  function intersect(a, b) {
+    if (!a) return b;
+    for (var i = 0; i < a.length; i++) a[i] = a[i] && b[i];
+    return a;
+  }
+
+  // Codes retenus par dimension ({colonne: drapeaux}) ; un filtre vide ou absent est ignoré
+  function dimensionFilters(data, filters) {
+    var labels = data.dictionaries;
+    var result = {};
+    if (filters.years && labels.iyear) {
+      result.iyear = codesWhere(labels.iyear, function (year) {
+        return year !== null && year >= filters.years[0] && year <= filters.years[1];
+      });
+    }
+    if (labels.country_txt) {
+      var countries = null;
+      if (filters.country) {
+        countries = codesWhere(labels.country_txt, function (country) { return country === filters.country; });
+      }
+      if (filters.regions && filters.regions.length) {
+        countries = intersect(countries, codesWhere(labels.country_txt, function (_, code) {
+          return filters.regions.indexOf(data.region_of_country[code]) >= 0;
+        }));
+      }
+      if (countries) result.country_txt = countries;
+    }
+    [['attacks', 'attacktype1_txt'], ['cities', 'city']].forEach(function (pair) {
+      var values = filters[pair[0]];
+      if (values && values.length && labels[pair[1]]) {
+        result[pair[1]] = codesWhere(labels[pair[1]], function (label) { return values.indexOf(label) >= 0; });
+      }
+    });
+    return result;
+  }
+
+  // Indices des lignes du cube retenues par les filtres (sur les seules dimensions du cube)
+  function selectRows(cube, flags) {
+    var checks = Object.keys(flags).filter(function (column) { return cube.columns[column]; }).map(function (column) {
+      return [cube.columns[column], flags[column]];
+    });
+    var rows = new Uint32Array(cube.rows);
+    var count = 0;
+    for (var row = 0; row < cube.rows; row++) {
+      var keep = true;
+      for (var c = 0; c < checks.length && keep; c++) keep = checks[c][1][checks[c][0][row]] === 1;
+      if (keep) rows[count++] = row;
+    }
+    return rows.subarray(0, count);
+  }
+
+  // --- Agrégations ---
+
+  function total(cube, rows, measure) {
+    var values = cube.columns[measure];
+    var sum = 0;
+    for (var i = 0; i < rows.length; i++) sum += values[rows[i]];
+    return sum;
+  }
+
+  function sumBy(cube, rows, column, measure, size) {
+    var codes = cube.columns[column];
+    var values = cube.columns[measure];
+    var sums = new Float64Array(size);
+    for (var i = 0; i < rows.length; i++) sums[codes[rows[i]]] += values[rows[i]];
+    return sums;
+  }
+
+  function pivot(cube, rows, rowColumn, colColumn, measure, rowSize, colSize) {
+    var rowCodes = cube.columns[rowColumn];
+    var colCodes = cube.columns[colColumn];
+    var values = cube.columns[measure];
+    var cells = new Float64Array(rowSize * colSize);
+    for (var i = 0; i < rows.length; i++) {
+      var row = rows[i];
+      cells[rowCodes[row] * colSize + colCodes[row]] += values[row];
+    }
+    return cells;
+  }
+
+  // Libellés et valeurs non nuls triés par valeur décroissante, limités aux `top` premiers
+  function ranked(sums, labels, top) {
+    var entries = [];
+    for (var i = 0; i < sums.length; i++) {
+      if (sums[i] > 0 && labels[i] !== null) entries.push([labels[i], sums[i]]);
+    }
+    entries.sort(function (a, b) { return b[1] - a[1]; });
+    if (top) entries = entries.slice(0, top);
+    return { labels: entries.map(function (e) { return e[0]; }), values: entries.map(function (e) { return e[1]; }) };
+  }
+
+  function byRegion(data, countrySums) {
+    var sums = new Float64Array(data.regions.length);
+    for (var i = 0; i < countrySums.length; i++) {
+      var region = data.regions.indexOf(data.region_of_country[i]);
+      if (region >= 0) sums[region] += countrySums[i];
+    }
+    return ranked(sums, data.regions);
+  }
+
+  function countNonZero(sums, labels) {
+    var count = 0;
+    for (var i = 0; i < sums.length; i++) if (sums[i] > 0 && labels[i] !== null) count++;
+    return count;
+  }
+
+  // --- Pages : métriques et graphiques d'une sélection ---
+
+  function barChart(entries, title, axis, horizontal) {
+    return {
+      traces: [horizontal
+        ? { type: 'bar', orientation: 'h', x: entries.values, y: entries.labels }
+        : { type: 'bar', x: entries.labels, y: entries.values }],
+      layout: horizontal
+        ? { title: title, xaxis: { title: 'Nombre d\'incidents' }, yaxis: { title: axis, autorange: 'reversed' } }
+        : { title: title, xaxis: { title: axis }, yaxis: { title: 'Nombre d\'incidents' } }
+    };
+  }
+
+  function pieChart(entries, title) {
+    return { traces: [{ type: 'pie', labels: entries.labels, values: entries.values }], layout: { title: title } };
+  }
+
+  function yearlyChart(data, cube, rows, title, type) {
+    var years = ranked(sumBy(cube, rows, 'iyear', 'incidents', data.dictionaries.iyear.length), data.dictionaries.iyear);
+    var order = years.labels.map(function (_, i) { return i; }).sort(function (a, b) { return years.labels[a] - years.labels[b]; });
+    return {
+      traces: [{
+        type: type, mode: 'lines',
+        x: order.map(function (i) { return years.labels[i]; }),
+        y: order.map(function (i) { return years.values[i]; })
+      }],
+      layout: { title: title, xaxis: { title: 'Année' }, yaxis: { title: 'Nombre d\'incidents' } }
+    };
+  }
+
+  function heatmapChart(data, cube, rows) {
+    var years = data.dictionaries.iyear;
+    var months = data.dictionaries.imonth;
+    var cells = pivot(cube, rows, 'iyear', 'imonth', 'incidents', years.length, months.length);
+    var z = [];
+    var shown = [];
+    for (var y = 0; y < years.length; y++) {
+      var line = Array.prototype.slice.call(cells.subarray(y * months.length, (y + 1) * months.length));
+      if (line.some(function (v) { return v > 0; })) {
+        z.push(line);
+        shown.push(years[y]);
+      }
+    }
+    return {
+      traces: [{ type: 'heatmap', z: z, x: months.map(function (m) { return MONTHS[m] || m; }), y: shown, colorbar: { title: 'Incidents' } }],
+      layout: { title: 'Distribution des incidents par mois et année', xaxis: { title: 'Mois' }, yaxis: { title: 'Année', autorange: 'reversed' } }
+    };
+  }
+
+  var PAGES = {
+    global: {
+      controls: ['years', 'country', 'regions', 'attacks'],
+      metrics: function (data, cubes, rows) {
+        var main = cubes.main;
+        var countries = sumBy(main, rows.main, 'country_txt', 'incidents', data.dictionaries.country_txt.length);
+        return [
+          ['Incidents totaux', total(main, rows.main, 'incidents')],
+          ['Victimes décédées', total(main, rows.main, 'nkill')],
+          ['Victimes blessées', total(main, rows.main, 'nwound')],
+          ['Pays affectés', countNonZero(countries, data.dictionaries.country_txt)]
+        ];
+      },
+      charts: function (data, cubes, rows) {
+        var d = data.dictionaries;
+        var main = cubes.main;
+        var countries = sumBy(main, rows.main, 'country_txt', 'incidents', d.country_txt.length);
+        var successes = total(main, rows.main, 'success');
+        return [
+          [yearlyChart(data, main, rows.main, 'Nombre d\'incidents terroristes par année', 'scatter')],
+          [heatmapChart(data, main, rows.main)],
+          [barChart(ranked(countries, d.country_txt, 15), 'Top 15 des pays les plus touchés', 'Pays', true),
+            pieChart(byRegion(data, countries), 'Distribution par région')],
+          [barChart(ranked(sumBy(main, rows.main, 'attacktype1_txt', 'incidents', d.attacktype1_txt.length), d.attacktype1_txt), 'Types d\'attaques les plus fréquents', 'Type d\'attaque', true),
+            pieChart(ranked(sumBy(cubes.weapons, rows.weapons, 'weaptype1_txt', 'incidents', d.weaptype1_txt.length), d.weaptype1_txt, 10), 'Types d\'armes utilisées (Top 10)')],
+          [barChart(ranked(sumBy(cubes.targets, rows.targets, 'targtype1_txt', 'incidents', d.targtype1_txt.length), d.targtype1_txt, 10), 'Types de cibles les plus visées', 'Type de cible', true),
+            pieChart({ labels: ['Succès', 'Échec'], values: [successes, total(main, rows.main, 'incidents') - successes] }, 'Taux de succès des attaques')]
+        ];
+      }
+    },
+    france: {
+      controls: ['years', 'cities', 'attacks'],
+      metrics: function (data, cubes, rows) {
+        var main = cubes.main;
+        var cities = sumBy(main, rows.main, 'city', 'incidents', data.dictionaries.city.length);
+        return [
+          ['Total incidents France', total(main, rows.main, 'incidents')],
+          ['Victimes décédées', total(main, rows.main, 'nkill')],
+          ['Victimes blessées', total(main, rows.main, 'nwound')],
+          ['Villes touchées', countNonZero(cities, data.dictionaries.city)]
+        ];
+      },
+      charts: function (data, cubes, rows) {
+        var d = data.dictionaries;
+        var main = cubes.main;
+        var groups = ranked(sumBy(main, rows.main, 'gname', 'incidents', d.gname.length), d.gname, 11);
+        var known = groups.labels.indexOf('Unknown');
+        if (known >= 0) {
+          groups.labels.splice(known, 1);
+          groups.values.splice(known, 1);
+        }
+        var months = ranked(sumBy(main, rows.main, 'imonth', 'incidents', d.imonth.length), d.imonth);
+        return [
+          [yearlyChart(data, main, rows.main, 'Évolution des incidents en France par année', 'scatter'),
+            pieChart(ranked(sumBy(main, rows.main, 'attacktype1_txt', 'incidents', d.attacktype1_txt.length), d.attacktype1_txt), 'Types d\'attaques en France')],
+          [barChart(ranked(sumBy(main, rows.main, 'city', 'incidents', d.city.length), d.city, 10), 'Top 10 des villes les plus touchées', 'Ville', true),
+            barChart(ranked(sumBy(main, rows.main, 'provstate', 'incidents', d.provstate.length), d.provstate, 10), 'Top 10 des régions/départements', 'Région', true)],
+          [barChart({ labels: months.labels.map(function (m) { return MONTHS[m] || m; }), values: months.values }, 'Distribution des incidents par mois', 'Mois', false),
+            barChart({ labels: groups.labels.slice(0, 10), values: groups.values.slice(0, 10) }, 'Groupes terroristes les plus actifs', 'Groupe', true)],
+          [pieChart(ranked(sumBy(main, rows.main, 'targtype1_txt', 'incidents', d.targtype1_txt.length), d.targtype1_txt, 8), 'Types de cibles visées'),
+            pieChart(ranked(sumBy(main, rows.main, 'weaptype1_txt', 'incidents', d.weaptype1_txt.length), d.weaptype1_txt, 8), 'Types d\'armes utilisées')]
+        ];
+      }
+    }
+  };
+
+  // Métriques et graphiques d'une page pour des filtres donnés (sans navigateur : utilisable sous Node)
+  function computeView(page, data, cubes, filters) {
+    var flags = dimensionFilters(data, filters);
+    var rows = {};
+    Object.keys(cubes).forEach(function (name) { rows[name] = selectRows(cubes[name], flags); });
+    return { metrics: PAGES[page].metrics(data, cubes, rows), charts: PAGES[page].charts(data, cubes, rows) };
+  }
+
+  // --- Interface ---
+
+  function element(tag, attributes, children) {
+    var node = document.createElement(tag);
+    Object.keys(attributes || {}).forEach(function (key) { node[key] = attributes[key]; });
+    (children || []).forEach(function (child) { node.appendChild(child); });
+    return node;
+  }
+
+  function multiSelect(id, label, options) {
+    var select = element('select', { id: id, multiple: true, size: 8 },
+      options.map(function (option) { return element('option', { value: option, textContent: option }); }));
+    return element('label', { textContent: label }, [select]);
+  }
+
+  function buildControls(page, data) {
+    var d = data.dictionaries;
+    var years = d.iyear.filter(function (year) { return year !== null; });
+    var container = document.getElementById('filters');
+    var named = function (values) { return values.filter(function (value) { return value !== null; }); };
+    PAGES[page].controls.forEach(function (control) {
+      if (control === 'years') {
+        container.appendChild(element('label', { textContent: 'Période' }, [element('div', { className: 'years' }, [
+          element('input', { id: 'year-min', type: 'number', min: years[0], max: years[years.length - 1] }),
+          element('input', { id: 'year-max', type: 'number', min: years[0], max: years[years.length - 1] })
+        ])]));
+      } else if (control === 'country') {
+        container.appendChild(element('label', { textContent: 'Pays' }, [element('select', { id: 'country' },
+          [element('option', { value: '', textContent: 'Tous' })].concat(named(d.country_txt).map(function (country) {
+            return element('option', { value: country, textContent: country });
+          })))]));
+      } else if (control === 'regions') {
+        container.appendChild(multiSelect('regions', 'Régions', data.regions));
+      } else if (control === 'attacks') {
+        container.appendChild(multiSelect('attacks', 'Types d\'attaques', named(d.attacktype1_txt)));
+      } else if (control === 'cities') {
+        container.appendChild(multiSelect('cities', 'Villes', named(d.city)));
+      }
+    });
+  }
+
+  function selectedValues(id) {
+    return Array.prototype.filter.call(document.getElementById(id).options, function (option) { return option.selected; })
+      .map(function (option) { return option.value; });
+  }
+
+  function readControls(page) {
+    var filters = { years: [Number(document.getElementById('year-min').value), Number(document.getElementById('year-max').value)] };
+    PAGES[page].controls.forEach(function (control) {
+      if (control === 'country') filters.country = document.getElementById('country').value || null;
+      else if (control !== 'years') filters[control] = selectedValues(control);
+    });
+    return filters;
+  }
+
+  function writeControls(page, filters) {
+    document.getElementById('year-min').value = filters.years[0];
+    document.getElementById('year-max').value = filters.years[1];
+    PAGES[page].controls.forEach(function (control) {
+      if (control === 'country') {
+        document.getElementById('country').value = filters.country || '';
+      } else if (control !== 'years') {
+        var values = filters[control] || [];
+        Array.prototype.forEach.call(document.getElementById(control).options, function (option) {
+          option.selected = values.indexOf(option.value) >= 0;
+        });
+      }
+    });
+  }
+
+  function filtersFromHash() {
+    try {
+      return location.hash.length > 1 ? JSON.parse(decodeURIComponent(location.hash.slice(1))) : null;
+    } catch (e) {
+      return null;
+    }
+  }
+
+  function render(page, data, cubes, filters) {
+    var view = computeView(page, data, cubes, filters);
+    document.getElementById('metrics').replaceChildren.apply(document.getElementById('metrics'), view.metrics.map(function (metric) {
+      return element('div', { className: 'metric' }, [
+        element('span', { textContent: metric[0] }),
+        element('strong', { textContent: metric[1].toLocaleString('en-US') })
+      ]);
+    }));
+    var charts = document.getElementById('charts');
+    // Conteneurs créés une fois, puis mis à jour par Plotly.react
+    if (!charts.childElementCount) {
+      view.charts.forEach(function (line) {
+        charts.appendChild(element('div', { className: 'row' }, line.map(function () { return element('div', { className: 'chart' }); })));
+      });
+    }
+    view.charts.forEach(function (line, i) {
+      line.forEach(function (chart, j) {
+        Plotly.react(charts.children[i].children[j], chart.traces, Object.assign({ margin: { t: 50 } }, chart.layout), { responsive: true });
+      });
+    });
+  }
+
+  function start() {
+    var data = root.DASHBOARD_DATA;
+    var page = document.body.dataset.page;
+    var cubes = decodeCubes(data);
+    buildControls(page, data);
+
+    var apply = function (filters) {
+      writeControls(page, filters);
+      render(page, data, cubes, filters);
+    };
+    var presets = document.getElementById('presets');
+    data.presets.forEach(function (preset) {
+      presets.appendChild(element('button', { type: 'button', textContent: preset.name, onclick: function () {
+        location.hash = encodeURIComponent(JSON.stringify(preset.filters));
+      } }));
+    });
+    document.getElementById('filters').addEventListener('change', function () {
+      location.hash = encodeURIComponent(JSON.stringify(readControls(page)));
+    });
+    window.addEventListener('hashchange', function () { apply(filtersFromHash() || data.presets[0].filters); });
+
+    document.getElementById('footer').textContent = data.incidents.toLocaleString('en-US') + ' incidents, export statique du ' + data.generated.replace('T', ' à ');
+    apply(filtersFromHash() || data.presets[0].filters);
+  }
+
+  if (typeof module !== 'undefined' && module.exports) {
+    module.exports = { decodeCubes: decodeCubes, dimensionFilters: dimensionFilters, selectRows: selectRows, computeView: computeView };
+  } else {
+    document.addEventListener('DOMContentLoaded', start);
+  }
+})(typeof window !== 'undefined' ? window : this);
@@ -0,0 +1,208 @@
+"""Export statique du tableau de bord : vue mondiale et vue France
+
+`python static_export.py` écrit dans site/ un site autonome :
+- index.html (vue mondiale) et france.html (vue France), avec des vues
+  prédéfinies (vue par défaut de l'application, Europe de l'Ouest, Corse...) ;
+- data/global.js et data/france.js : cubes précalculés en colonnes binaires
+  compactes (entiers non signés en base64, libellés en dictionnaires partagés) ;
+- dashboard.js : filtres, agrégations et graphiques calculés dans le navigateur ;
+- plotly.min.js : copie locale de Plotly (aucune ressource externe).
+
+Le site peut être servi par n'importe quel serveur de fichiers statiques, ou
+ouvert directement depuis le disque : aucun calcul côté serveur par visiteur.
+
+Usage : python static_export.py [--output site]
+"""
+import argparse
+import base64
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import analytics
+import data_loader
+
+OUTPUT_DIR = 'site'
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+# Cubes exportés : {nom: (dimensions, mesures)} ; `incidents` compte les incidents de chaque cellule
+GLOBAL_CUBES = {
+    'main': (['iyear', 'imonth', 'country_txt', 'attacktype1_txt'], ['incidents', 'nkill', 'nwound', 'success']),
+    'weapons': (['iyear', 'country_txt', 'attacktype1_txt', 'weaptype1_txt'], ['incidents']),
+    'targets': (['iyear', 'country_txt', 'attacktype1_txt', 'targtype1_txt'], ['incidents']),
+}
+FRANCE_CUBES = {
+    'main': (
+        ['iyear', 'imonth', 'city', 'provstate', 'attacktype1_txt', 'gname', 'targtype1_txt', 'weaptype1_txt'],
+        ['incidents', 'nkill', 'nwound'],
+    ),
+}
+
+# Plus petit type entier non signé capable de contenir une colonne
+_UNSIGNED = [(np.uint8, 'Uint8'), (np.uint16, 'Uint16'), (np.uint32, 'Uint32')]
+
+
+def encode_column(values):
+    """Colonne d'entiers positifs en base64, dans le plus petit type non signé (petit-boutiste)"""
+    values = np.asarray(values, dtype=np.int64)
+    high = int(values.max()) if len(values) else 0
+    for dtype, name in _UNSIGNED:
+        if high <= np.iinfo(dtype).max:
+            data = values.astype(np.dtype(dtype).newbyteorder('<')).tobytes()
+            return {'type': name, 'data': base64.b64encode(data).decode('ascii')}
+    raise ValueError(f"valeur trop grande pour un export 32 bits : {high}")
+
+
+def dictionaries(df, columns):
+    """Libellés triés de chaque dimension, partagés par tous les cubes ; None pour les valeurs manquantes"""
+    result = {}
+    for column in columns:
+        labels = sorted(df[column].dropna().unique().tolist())
+        if df[column].isna().any():
+            labels.append(None)
+        result[column] = [label.item() if hasattr(label, 'item') else label for label in labels]
+    return result
+
+
+def build_cube(df, dimensions, measures, labels):
+    """Cube agrégé encodé en colonnes : codes des dimensions puis sommes des mesures"""
+    aggregations = {'incidents': ('iyear', 'size')}
+    for measure in measures:
+        if measure != 'incidents' and measure in df.columns:
+            aggregations[measure] = (measure, 'sum')
+    cube = df.groupby(dimensions, dropna=False, observed=True).agg(**aggregations).reset_index()
+
+    columns = {}
+    for column in dimensions:
+        index = pd.Index(labels[column])
+        codes = index.get_indexer(cube[column])
+        if None in labels[column]:
+            # Valeurs manquantes : dernier code du dictionnaire
+            codes = np.where(cube[column].isna(), len(index) - 1, codes)
+        columns[column] = encode_column(codes)
+    for measure in aggregations:
+        columns[measure] = encode_column(cube[measure].round().astype(np.int64))
+    return {'rows': len(cube), 'columns': columns}
+
+
+def build_payload(df, cubes, presets):
+    """Données d'une page : dictionnaires, cubes encodés et vues prédéfinies"""
+    cubes = {name: ([column for column in dimensions if column in df.columns], measures) for name, (dimensions, measures) in cubes.items()}
+    labels = dictionaries(df, sorted({column for dimensions, _ in cubes.values() for column in dimensions}))
+    payload = {
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'incidents': len(df),
+        'dictionaries': labels,
+        'cubes': {name: build_cube(df, dimensions, measures, labels) for name, (dimensions, measures) in cubes.items()},
+        'presets': presets,
+    }
+    if 'country_txt' in labels:
+        # Région de chaque pays (la GTD rattache chaque pays à une seule région)
+        region_of = df.groupby('country_txt')['region_txt'].agg(lambda regions: regions.mode().iloc[0])
+        payload['regions'] = sorted(df['region_txt'].dropna().unique().tolist())
+        payload['region_of_country'] = [region_of.get(country) for country in labels['country_txt']]
+    return payload
+
+
+def global_presets(df):
+    """Vues prédéfinies de la page mondiale : vue par défaut de l'application puis vues courantes"""
+    options = analytics.filter_options(df)
+    defaults = analytics.default_filters(options)
+    low, high = options['years']
+    presets = [
+        {'name': "Vue par défaut", 'filters': {'years': list(defaults['year_range']), 'country': None, 'regions': defaults['regions'], 'attacks': defaults['attacks']}},
+        {'name': "Tous les incidents", 'filters': {'years': [low, high], 'country': None, 'regions': [], 'attacks': []}},
+    ]
+    for name, regions in [("Europe de l'Ouest", ['Western Europe']), ("Moyen-Orient et Afrique du Nord", ['Middle East & North Africa'])]:
+        if set(regions) <= set(options['regions']):
+            presets.append({'name': name, 'filters': {'years': [low, high], 'country': None, 'regions': regions, 'attacks': []}})
+    if low <= 2001 <= high:
+        presets.append({'name': "Depuis 2001", 'filters': {'years': [2001, high], 'country': None, 'regions': [], 'attacks': []}})
+    return presets
+
+
+def france_presets(france):
+    """Vues prédéfinies de la page France : filtres par défaut de la page puis villes et périodes courantes"""
+    low, high = int(france['iyear'].min()), int(france['iyear'].max())
+    cities = set(france['city'].dropna())
+    presets = [{'name': "Vue par défaut", 'filters': {'years': [low, high], 'cities': [], 'attacks': []}}]
+    for name, selection in [("Paris", ['Paris']), ("Corse", ['Ajaccio', 'Bastia']), ("Marseille, Lyon, Nice", ['Marseille', 'Lyon', 'Nice'])]:
+        selection = [city for city in selection if city in cities]
+        if selection:
+            presets.append({'name': name, 'filters': {'years': [low, high], 'cities': selection, 'attacks': []}})
+    if low <= 2015 <= high:
+        presets.append({'name': "Depuis 2015", 'filters': {'years': [2015, high], 'cities': [], 'attacks': []}})
+    return presets
+
+
+def write_page(directory, name, title, page, data_file):
+    """Page HTML à partir du gabarit"""
+    with open(os.path.join(TEMPLATE_DIR, 'dashboard.html'), encoding='utf-8') as template:
+        html = template.read()
+    for key, value in {'title': title, 'page': page, 'data': data_file}.items():
+        html = html.replace('{{' + key + '}}', value)
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as output:
+        output.write(html)
+
+
+def write_data(directory, name, payload):
+    """Données d'une page sous forme de script (chargeable sans serveur, y compris depuis le disque)"""
+    os.makedirs(os.path.join(directory, 'data'), exist_ok=True)
+    path = os.path.join(directory, 'data', name)
+    with open(path, 'w', encoding='utf-8') as output:
+        output.write('window.DASHBOARD_DATA = ')
+        json.dump(payload, output, ensure_ascii=False, separators=(',', ':'))
+        output.write(';\n')
+    return os.path.getsize(path)
+
+
+def export_site(df, directory=OUTPUT_DIR):
+    """Écrit le site statique complet, retourne {fichier: taille en octets}"""
+    from plotly.offline import get_plotlyjs
+
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+
+    france = analytics.france_subset(df)
+    sizes = {
+        'data/global.js': write_data(directory, 'global.js', build_payload(df, GLOBAL_CUBES, global_presets(df))),
+        'data/france.js': write_data(directory, 'france.js', build_payload(france, FRANCE_CUBES, france_presets(france))),
+    }
+    write_page(directory, 'index.html', "Analyse du Terrorisme Mondial", 'global', 'data/global.js')
+    write_page(directory, 'france.html', "Analyse du Terrorisme en France", 'france', 'data/france.js')
+    shutil.copy(os.path.join(TEMPLATE_DIR, 'dashboard.js'), os.path.join(directory, 'dashboard.js'))
+    with open(os.path.join(directory, 'plotly.min.js'), 'w', encoding='utf-8') as plotly_file:
+        plotly_file.write(get_plotlyjs())
+    for name in ['index.html', 'france.html', 'dashboard.js', 'plotly.min.js']:
+        sizes[name] = os.path.getsize(os.path.join(directory, name))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporte le tableau de bord en site statique autonome")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="Répertoire du site")
+    args = parser.parse_args()
+
+    try:
+        df = data_loader.read_dataset()
+    except FileNotFoundError as e:
+        print(f"[KO] {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    sizes = export_site(df, args.output)
+    elapsed = time.perf_counter() - start
+    for name, size in sizes.items():
+        print(f"  {name:<16} {size / 1024:>10,.0f} Ko")
+    print(f"[OK] Site statique écrit dans {args.output}/ en {elapsed:.1f} s (ouvrir {os.path.join(args.output, 'index.html')})")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,21 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import numpy as np
 from datetime import datetime
 import warnings
+import analytics
+import data_loader
+from charts import go, px
+from lazy import LazyModule
+from shared_data import get_ingestor, start_loading
+
+ingest = LazyModule('ingest')
+partitioned = LazyModule('partitioned')
+session_memory = LazyModule('session_memory')
+sketches = LazyModule('sketches')
+text_store = LazyModule('text_store')
+tiles = LazyModule('tiles')
+crossfilter = LazyModule('crossfilter')
+
 warnings.filterwarnings('ignore')
 
 # Configuration de la page
@@ -19,40 +29,383 @@ st.set_page_config(
 # Cache pour charger les données
 @st.cache_data
 def load_data():
-    """Charge les données depuis le fichier Excel ou ZIP"""
+    """Charge les données depuis le fichier Excel ou ZIP (attend le chargement en arrière-plan)"""
     try:
-        # Essayer de charger le .xlsx directement
-        df = pd.read_excel('globalterrorismdb_0522dist.xlsx')
-        df = df.dropna(subset=['iyear', 'country_txt'])
-        return df
-    except:
-        try:
-            # Essayer de charger depuis le .zip (pour GitHub/déploiement)
-            import zipfile
-            with zipfile.ZipFile('globalterrorismdb_0522dist.zip', 'r') as zip_ref:
-                with zip_ref.open('globalterrorismdb_0522dist.xlsx') as excel_file:
-                    df = pd.read_excel(excel_file)
-                    df = df.dropna(subset=['iyear', 'country_txt'])
-                    return df
-        except Exception as e:
-            st.error(f"Erreur lors du chargement des données: {e}")
-            return None
+        return start_loading().result()
+    except Exception as e:
+        # Nouvelle tentative au prochain rechargement de la page
+        start_loading.clear()
+        st.error(f"Erreur lors du chargement des données: {e}")
+        return None
+
+@st.cache_data(max_entries=2)
+def load_live_data(version):
+    """Données complétées des incidents ingérés, reconstruites à chaque nouvelle version"""
+    return get_ingestor().frame()
+
+@st.cache_resource
+def get_base_sketches():
+    """Sketches de quantiles des victimes par cellule du cube, construits une fois au chargement"""
+    return sketches.build_sketches(start_loading().result())
+
+@st.cache_data(max_entries=2)
+def load_sketches(version):
+    """Sketches de la base fusionnés avec ceux des incidents ingérés depuis le démarrage"""
+    batches = get_ingestor().batches
+    if not batches:
+        return get_base_sketches()
+    return sketches.merge(get_base_sketches(), sketches.build_sketches(pd.concat(batches, ignore_index=True)))
+
+@st.cache_resource
+def get_text_store():
+    """Stockage des résumés et motifs, partagé entre les sessions"""
+    return text_store.TextStore()
+
+@st.cache_resource
+def get_partitions():
+    """Données partitionnées pour l'exécution multi-processus, None si elles n'ont pas été construites"""
+    directory = data_loader.find_partitions()
+    return partitioned.open_dataset(directory) if directory is not None else None
+
+@st.cache_data
+def load_tile_manifest():
+    """Calques de tuiles précalculés (make tiles), None s'ils n'ont pas été construits"""
+    return tiles.read_manifest()
+
+@st.cache_data(ttl=30)
+def tile_server_available():
+    """API des tuiles joignable (vérifié au plus toutes les 30 s)"""
+    return tiles.server_available()
+
+@st.cache_data
+def load_preview_sample():
+    """Échantillon stratifié (année x région) précalculé pour le mode aperçu"""
+    df = load_data()
+    return analytics.stratified_sample(df) if df is not None else None
+
+# Taille de sélection à partir de laquelle le mode aperçu s'active
+PREVIEW_MIN_ROWS = 50_000
+
+# Agrégations estimées en mode aperçu : (nom, colonne, top)
+PREVIEW_COUNTS = [
+    ('country_counts', 'country_txt', 15),
+    ('region_counts', 'region_txt', None),
+    ('attack_counts', 'attacktype1_txt', None),
+    ('weapon_counts', 'weaptype1_txt', 10),
+    ('target_counts', 'targtype1_txt', 10),
+    ('success_counts', 'success', None),
+]
+
+def bar_chart(counts, title, label, estimated=False):
+    """Barres horizontales, avec barres d'erreur pour les estimations"""
+    if estimated:
+        fig = px.bar(
+            x=counts['estimate'],
+            y=counts.index,
+            orientation='h',
+            error_x=counts['upper'] - counts['estimate'],
+            error_x_minus=counts['estimate'] - counts['lower'],
+            title=f"{title} (aperçu)",
+            labels={'x': 'Nombre d\'incidents (estimé)', 'y': label}
+        )
+    else:
+        fig = px.bar(
+            x=counts.values,
+            y=counts.index,
+            orientation='h',
+            title=title,
+            labels={'x': 'Nombre d\'incidents', 'y': label}
+        )
+    fig.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
+    return fig
+
+def pie_chart(counts, title, names=None, estimated=False):
+    """Camembert à partir de comptages exacts ou estimés"""
+    values = counts['estimate'] if estimated else counts.values
+    fig = px.pie(
+        values=values,
+        names=names if names is not None else counts.index,
+        title=f"{title} (aperçu)" if estimated else title
+    )
+    fig.update_layout(height=500)
+    return fig
+
+def draw_charts(slots, results, estimated=False):
+    """Dessine (ou redessine) les graphiques des onglets dans leurs emplacements"""
+    yearly_counts = results['yearly_counts']
+    if estimated:
+        # Courbe estimée avec bande de confiance
+        fig_timeline = go.Figure([
+            go.Scatter(x=yearly_counts.index, y=yearly_counts['upper'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'),
+            go.Scatter(x=yearly_counts.index, y=yearly_counts['lower'], mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(99, 110, 250, 0.2)', name='Intervalle à 95 %'),
+            go.Scatter(x=yearly_counts.index, y=yearly_counts['estimate'], mode='lines', name='Estimation')
+        ])
+        fig_timeline.update_layout(
+            title="Nombre d'incidents terroristes par année (aperçu)",
+            xaxis_title='Année',
+            yaxis_title='Nombre d\'incidents (estimé)'
+        )
+    else:
+        fig_timeline = px.line(
+            yearly_counts, 
+            x='iyear', 
+            y='incidents',
+            title="Nombre d'incidents terroristes par année",
+            labels={'iyear': 'Année', 'incidents': 'Nombre d\'incidents'}
+        )
+    fig_timeline.update_layout(height=500)
+    slots['yearly_counts'].plotly_chart(fig_timeline, use_container_width=True)
+    
+    fig_heatmap = px.imshow(
+        results['monthly_pivot'],
+        title="Distribution des incidents par mois et année" + (" (aperçu)" if estimated else ""),
+        labels=dict(x="Mois", y="Année", color="Incidents"),
+        aspect="auto"
+    )
+    slots['monthly_pivot'].plotly_chart(fig_heatmap, use_container_width=True)
+    
+    slots['country_counts'].plotly_chart(
+        bar_chart(results['country_counts'], "Top 15 des pays les plus touchés", 'Pays', estimated),
+        use_container_width=True
+    )
+    slots['region_counts'].plotly_chart(
+        pie_chart(results['region_counts'], "Distribution par région", estimated=estimated),
+        use_container_width=True
+    )
+    slots['attack_counts'].plotly_chart(
+        bar_chart(results['attack_counts'], "Types d'attaques les plus fréquents", 'Type d\'attaque', estimated),
+        use_container_width=True
+    )
+    if 'weapon_counts' in results:
+        slots['weapon_counts'].plotly_chart(
+            pie_chart(results['weapon_counts'], "Types d'armes utilisées (Top 10)", estimated=estimated),
+            use_container_width=True
+        )
+    if 'target_counts' in results:
+        slots['target_counts'].plotly_chart(
+            bar_chart(results['target_counts'], "Types de cibles les plus visées", 'Type de cible', estimated),
+            use_container_width=True
+        )
+    if 'success_counts' in results:
+        success_counts = results['success_counts']
+        success_labels = {1: 'Succès', 0: 'Échec'}
+        slots['success_counts'].plotly_chart(
+            pie_chart(
+                success_counts,
+                "Taux de succès des attaques",
+                names=[success_labels.get(x, f'Inconnu ({x})') for x in success_counts.index],
+                estimated=estimated
+            ),
+            use_container_width=True
+        )
+
+# Dimensions de l'exploration croisée : {nom: colonne}
+CROSSFILTER_DIMENSIONS = {
+    'year': 'iyear',
+    'country': 'country_txt',
+    'region': 'region_txt',
+    'attack': 'attacktype1_txt',
+}
+CROSSFILTER_LABELS = {'year': 'Année', 'country': 'Pays', 'region': 'Région', 'attack': 'Type d\'attaque'}
+
+def get_crossfilter(filtered_df, signature):
+    """Crossfilter de la session, reconstruit seulement quand les filtres de la barre latérale changent"""
+    # Rangé dans le magasin des sessions : mesuré, et déchargé sur disque selon les limites
+    return session_memory.get_or_build('crossfilter', signature, lambda: crossfilter.Crossfilter(filtered_df, CROSSFILTER_DIMENSIONS))
+
+def selected_values(key, field):
+    """Valeurs cliquées sur un graphique (barres : axe `field`, camembert : libellé)"""
+    event = st.session_state.get(key)
+    if not event:
+        return []
+    points = event.get('selection', {}).get('points', [])
+    return [point.get('label', point.get(field)) for point in points]
+
+def highlight(counts, selection):
+    """Couleur des barres : sélection mise en évidence"""
+    return ['#EF553B' if value in selection else '#636EFA' for value in counts.index]
+
+def render_crossfilter(filtered_df, signature):
+    """Graphiques liés : un clic sur une année, un pays, une région ou un type d'attaque filtre les autres"""
+    cf = get_crossfilter(filtered_df, signature)
+    generation = st.session_state.setdefault('crossfilter_generation', 0)
+    keys = {name: f"cf_{name}_{generation}" for name in CROSSFILTER_DIMENSIONS}
+    
+    # Seule la dimension dont la sélection a changé déclenche un recalcul (incrémental)
+    fields = {'year': 'x', 'country': 'y', 'region': 'label', 'attack': 'y'}
+    for name in CROSSFILTER_DIMENSIONS:
+        cf.select(name, selected_values(keys[name], fields[name]))
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.markdown("Cliquez sur une barre ou une part (Maj+clic pour en ajouter) : les autres graphiques se filtrent en conséquence.")
+    with col2:
+        if st.button("Réinitialiser la sélection"):
+            cf.reset()
+            st.session_state['crossfilter_generation'] = generation + 1
+            st.rerun()
+    
+    active = [f"**{CROSSFILTER_LABELS[name]}** : {', '.join(str(value) for value in cf.selection(name))}" for name in CROSSFILTER_DIMENSIONS if cf.selection(name)]
+    st.metric("Incidents retenus", f"{cf.total:,}")
+    if active:
+        st.caption(" · ".join(active))
+    
+    year_counts = cf.group('year')
+    fig_years = px.bar(
+        x=year_counts.index,
+        y=year_counts.values,
+        title="Incidents par année",
+        labels={'x': 'Année', 'y': 'Nombre d\'incidents'}
+    )
+    fig_years.update_traces(marker_color=highlight(year_counts, cf.selection('year')))
+    fig_years.update_layout(height=350)
+    st.plotly_chart(fig_years, use_container_width=True, on_select="rerun", selection_mode="points", key=keys['year'])
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        country_counts = cf.group('country').sort_values(ascending=False).head(15)
+        fig_countries = px.bar(
+            x=country_counts.values,
+            y=country_counts.index,
+            orientation='h',
+            title="Top 15 des pays",
+            labels={'x': 'Nombre d\'incidents', 'y': 'Pays'}
+        )
+        fig_countries.update_traces(marker_color=highlight(country_counts, cf.selection('country')))
+        fig_countries.update_layout(height=450, yaxis={'categoryorder': 'total ascending'})
+        st.plotly_chart(fig_countries, use_container_width=True, on_select="rerun", selection_mode="points", key=keys['country'])
+    
+    with col2:
+        region_counts = cf.group('region')
+        region_counts = region_counts[region_counts > 0]
+        fig_regions = px.pie(
+            values=region_counts.values,
+            names=region_counts.index,
+            title="Répartition par région"
+        )
+        fig_regions.update_layout(height=450)
+        st.plotly_chart(fig_regions, use_container_width=True, on_select="rerun", selection_mode="points", key=keys['region'])
+    
+    with col3:
+        attack_counts = cf.group('attack').sort_values(ascending=False)
+        fig_attacks = px.bar(
+            x=attack_counts.values,
+            y=attack_counts.index,
+            orientation='h',
+            title="Types d'attaques",
+            labels={'x': 'Nombre d\'incidents', 'y': 'Type d\'attaque'}
+        )
+        fig_attacks.update_traces(marker_color=highlight(attack_counts, cf.selection('attack')))
+        fig_attacks.update_layout(height=450, yaxis={'categoryorder': 'total ascending'})
+        st.plotly_chart(fig_attacks, use_container_width=True, on_select="rerun", selection_mode="points", key=keys['attack'])
+
+# Intervalle de scrutation du répertoire de dépôt (secondes)
+LIVE_REFRESH_SECONDS = 5
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def render_live_feed():
+    """Ingère les nouveaux dépôts et affiche les agrégats tenus à jour incrémentalement"""
+    live = get_ingestor()
+    live.poll()
+    if live.version != st.session_state.get('live_version', live.version):
+        # Nouveaux incidents : toute la page est recalculée avec les données à jour
+        st.rerun()
+    
+    aggregates = live.aggregates
+    ingested = sum(len(batch) for batch in live.batches)
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Incidents dans la base", f"{aggregates.total:,}", delta=f"{ingested:,}" if ingested else None)
+    
+    with col2:
+        st.metric("Lignes rejetées", f"{live.rejected:,}")
+    
+    with col3:
+        last_ingest = live.last_ingest.strftime('%H:%M:%S') if live.last_ingest else "—"
+        st.metric("Dernier dépôt", last_ingest)
+    
+    if live.inbox_busy:
+        st.warning(f"`{ingest.INBOX_DIR}/` est consommé par un autre processus (`ingest.py --watch`) : ses incidents apparaîtront au prochain démarrage de l'application.")
+    st.caption(f"Déposez des fichiers .jsonl (un incident par ligne, colonnes de la GTD) dans `{ingest.INBOX_DIR}/` : ils sont validés et intégrés toutes les {LIVE_REFRESH_SECONDS} secondes. Les lignes invalides sont décrites dans `{ingest.INBOX_DIR}/{ingest.REJECTED}/`.")
+    
+    fig_years = px.line(
+        x=aggregates.year_counts.index,
+        y=aggregates.year_counts.values,
+        title="Incidents par année (base complète)",
+        labels={'x': 'Année', 'y': 'Nombre d\'incidents'}
+    )
+    fig_years.update_layout(height=350)
+    st.plotly_chart(fig_years, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.plotly_chart(bar_chart(aggregates.country_counts.nlargest(10), "Pays les plus touchés", 'Pays'), use_container_width=True)
+    
+    with col2:
+        groups = aggregates.group_counts.drop('Unknown', errors='ignore').nlargest(10)
+        st.plotly_chart(bar_chart(groups, "Groupes les plus actifs", 'Groupe'), use_container_width=True)
+    
+    if len(aggregates.cities) > 0:
+        st.markdown("#### Villes les plus touchées")
+        st.dataframe(
+            aggregates.cities.nlargest(10, 'nombre_incidents').reset_index(),
+            use_container_width=True
+        )
+    
+    if live.batches:
+        st.markdown("#### Derniers incidents ingérés")
+        latest = pd.concat(live.batches[-5:], ignore_index=True).tail(20)
+        display_columns = [col for col in ['eventid', 'iyear', 'imonth', 'iday', 'country_txt', 'city', 'attacktype1_txt', 'gname', 'nkill', 'nwound', 'summary'] if col in latest.columns]
+        st.dataframe(latest[display_columns].iloc[::-1], use_container_width=True)
+
+def render_metrics(slot, metrics):
+    """Affiche les métriques principales dans l'emplacement `slot`"""
+    col1, col2, col3, col4 = slot.container().columns(4)
+    
+    with col1:
+        st.metric(
+            "Total des incidents",
+            f"{metrics['incidents']:,}",
+            delta=f"{metrics['delta']:,}"
+        )
+    
+    with col2:
+        st.metric("Victimes décédées", f"{metrics['killed']:,}")
+    
+    with col3:
+        st.metric("Victimes blessées", f"{metrics['wounded']:,}")
+    
+    with col4:
+        st.metric("Pays affectés", f"{metrics['countries']}")
 
 def main():
     st.title(":material/public: Analyse du Terrorisme Mondial")
+    session_memory.track("Accueil")
     st.markdown("### Exploration interactive de la Global Terrorism Database")
     
-    # Chargement des données
-    df = load_data()
-    if df is None:
-        st.stop()
+    # Chargement des données en arrière-plan : la page s'affiche sans attendre,
+    # à partir du résumé précalculé quand il existe
+    loader = start_loading()
+    summary = data_loader.read_summary() if not loader.done() else None
+    if summary is None:
+        df = load_data()
+        if df is None:
+            st.stop()
+        # Valeurs des filtres tenues à jour par l'ingestion continue
+        options = get_ingestor().aggregates.options()
+    else:
+        df = None
+        options = summary['options']
     
     # Sidebar pour les filtres
     st.sidebar.header(":material/filter_alt: Filtres")
     
     # Filtre par année
-    min_year = int(df['iyear'].min())
-    max_year = int(df['iyear'].max())
+    min_year, max_year = options['years']
     year_range = st.sidebar.slider(
         "Période",
         min_value=min_year,
@@ -62,7 +415,7 @@ def main():
     )
     
     # Filtre par pays
-    countries = sorted(df['country_txt'].dropna().unique())
+    countries = options['countries']
     selected_country = st.sidebar.selectbox(
         "Pays (optionnel)",
         options=["Tous les pays"] + countries,
@@ -70,7 +423,7 @@ def main():
     )
     
     # Filtre par région
-    regions = sorted(df['region_txt'].dropna().unique())
+    regions = options['regions']
     selected_regions = st.sidebar.multiselect(
         "Régions",
         options=regions,
@@ -78,28 +431,47 @@ def main():
     )
     
     # Filtre par type d'attaque
-    attack_types = sorted(df['attacktype1_txt'].dropna().unique())
+    attack_types = options['attack_types']
     selected_attacks = st.sidebar.multiselect(
         "Types d'attaque",
         options=attack_types,
         default=attack_types[:3]
     )
     
+    # Aperçu rapide sur échantillon pour les très grandes sélections
+    preview_mode = st.sidebar.checkbox(
+        "Mode aperçu rapide",
+        value=False,
+        help=f"Au-delà de {PREVIEW_MIN_ROWS:,} incidents, les graphiques sont d'abord estimés sur un échantillon stratifié puis affinés."
+    )
+    
     # Appliquer les filtres
-    filtered_df = df[
-        (df['iyear'] >= year_range[0]) & 
-        (df['iyear'] <= year_range[1])
-    ]
+    filters = dict(
+        year_range=year_range,
+        country=selected_country if selected_country != "Tous les pays" else None,
+        regions=selected_regions,
+        attacks=selected_attacks
+    )
     
-    # Filtre par pays spécifique
-    if selected_country != "Tous les pays":
-        filtered_df = filtered_df[filtered_df['country_txt'] == selected_country]
+    # Métriques principales : celles de la vue par défaut sont connues avant les données
+    metrics_slot = st.empty()
+    if df is None:
+        if filters == analytics.default_filters(options):
+            render_metrics(metrics_slot, summary['default_metrics'])
+        with st.spinner("Chargement des données détaillées..."):
+            df = load_data()
+        if df is None:
+            st.stop()
     
-    if selected_regions:
-        filtered_df = filtered_df[filtered_df['region_txt'].isin(selected_regions)]
+    # Incidents ingérés en continu depuis le démarrage
+    live = get_ingestor()
+    if live.version:
+        df = load_live_data(live.version)
+    st.session_state['live_version'] = live.version
     
-    if selected_attacks:
-        filtered_df = filtered_df[filtered_df['attacktype1_txt'].isin(selected_attacks)]
+    # Vue filtrée de la session, rangée dans le magasin des sessions (voir session_memory.py)
+    view = repr((live.version, len(df), sorted(filters.items())))
+    filtered_df = session_memory.get_or_build('filtered', view, lambda: analytics.filter_incidents(df, **filters))
     
     # Vérification si des données existent après filtrage
     if len(filtered_df) == 0:
@@ -119,67 +491,72 @@ def main():
         st.markdown("- Élargissez la période temporelle")
         st.markdown("- Supprimez certains filtres (régions, types d'attaques)")
         st.markdown("- Sélectionnez un autre pays")
+        metrics_slot.empty()
         st.stop()
     
-    # Métriques principales
-    col1, col2, col3, col4 = st.columns(4)
+    render_metrics(metrics_slot, analytics.headline_metrics(filtered_df, len(df)))
     
-    with col1:
-        st.metric(
-            "Total des incidents",
-            f"{len(filtered_df):,}",
-            delta=f"{len(filtered_df) - len(df):,}"
-        )
+    # Agrégations indépendantes calculées en parallèle avant la construction des graphiques
+    aggregations = {
+        'yearly_counts': analytics.yearly_counts,
+        'monthly_pivot': analytics.monthly_pivot,
+        'country_counts': analytics.value_counts('country_txt', top=15),
+        'region_counts': analytics.value_counts('region_txt'),
+        'attack_counts': analytics.value_counts('attacktype1_txt'),
+    }
+    if 'weaptype1_txt' in filtered_df.columns:
+        aggregations['weapon_counts'] = analytics.value_counts('weaptype1_txt', top=10)
+    if 'targtype1_txt' in filtered_df.columns:
+        aggregations['target_counts'] = analytics.value_counts('targtype1_txt', top=10)
+    if 'success' in filtered_df.columns:
+        aggregations['success_counts'] = analytics.value_counts('success')
     
-    with col2:
-        total_killed = filtered_df['nkill'].sum() if 'nkill' in filtered_df.columns else 0
-        st.metric("Victimes décédées", f"{int(total_killed):,}")
+    # Mode aperçu : graphiques estimés sur l'échantillon stratifié, affinés en fin de page
+    use_preview = preview_mode and len(filtered_df) >= PREVIEW_MIN_ROWS
+    if use_preview:
+        sample_df = analytics.filter_incidents(load_preview_sample(), **filters)
+        preview_aggregations = {
+            'yearly_counts': lambda sample: analytics.estimate_counts(sample, 'iyear').sort_index(),
+            'monthly_pivot': lambda sample: analytics.estimate_counts(sample, ['iyear', 'imonth'])['estimate'].unstack(fill_value=0).sort_index(),
+        }
+        for name, column, top in PREVIEW_COUNTS:
+            if name in aggregations:
+                preview_aggregations[name] = analytics.estimated_value_counts(column, top=top)
+        # Calcul direct sur l'échantillon (petit), avant de soumettre les agrégations exactes :
+        # dans le pool, l'aperçu attendrait derrière elles
+        preview_results = {name: func(sample_df) for name, func in preview_aggregations.items()}
     
-    with col3:
-        total_wounded = filtered_df['nwound'].sum() if 'nwound' in filtered_df.columns else 0
-        st.metric("Victimes blessées", f"{int(total_wounded):,}")
-    
-    with col4:
-        countries_count = filtered_df['country_txt'].nunique()
-        st.metric("Pays affectés", f"{countries_count}")
+    # Les partitions ignorent les incidents ingérés depuis le démarrage : agrégation en mémoire tant qu'il y en a
+    partitions = get_partitions() if not live.version else None
+    if partitions is not None:
+        # Données partitionnées : agrégats partiels calculés par le pool de processus puis fusionnés
+        futures = partitions.submit(filters, list(aggregations))
+    else:
+        futures = analytics.submit_aggregations(filtered_df, aggregations)
     
     # Onglets pour différentes visualisations
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs([
         ":material/timeline: Tendances temporelles", 
         ":material/map: Répartition géographique", 
         ":material/gpp_bad: Types d'attaques", 
         ":material/my_location: Cibles", 
-        ":material/table_chart: Données détaillées"
+        ":material/table_chart: Données détaillées",
+        ":material/ads_click: Exploration croisée",
+        ":material/sensors: En direct"
     ])
     
+    # Emplacements des graphiques, remplis par draw_charts
+    slots = {}
+    
     with tab1:
         st.header("Évolution temporelle des incidents")
         
-        # Graphique des incidents par année
-        yearly_counts = filtered_df.groupby('iyear').size().reset_index(name='incidents')
+        if use_preview:
+            st.caption(":material/speed: Mode aperçu : estimations sur un échantillon stratifié (intervalles à 95 %), remplacées par les valeurs exactes dès qu'elles sont calculées.")
         
-        fig_timeline = px.line(
-            yearly_counts, 
-            x='iyear', 
-            y='incidents',
-            title="Nombre d'incidents terroristes par année",
-            labels={'iyear': 'Année', 'incidents': 'Nombre d\'incidents'}
-        )
-        fig_timeline.update_layout(height=500)
-        st.plotly_chart(fig_timeline, use_container_width=True)
-        
-        # Heatmap par mois et année
-        if len(filtered_df) > 0:
-            monthly_data = filtered_df.groupby(['iyear', 'imonth']).size().reset_index(name='incidents')
-            monthly_pivot = monthly_data.pivot(index='iyear', columns='imonth', values='incidents').fillna(0)
-            
-            fig_heatmap = px.imshow(
-                monthly_pivot,
-                title="Distribution des incidents par mois et année",
-                labels=dict(x="Mois", y="Année", color="Incidents"),
-                aspect="auto"
-            )
-            st.plotly_chart(fig_heatmap, use_container_width=True)
+        # Graphique des incidents par année puis heatmap par mois et année
+        slots['yearly_counts'] = st.empty()
+        slots['monthly_pivot'] = st.empty()
     
     with tab2:
         st.header("Répartition géographique")
@@ -188,33 +565,45 @@ def main():
         
         with col1:
             # Top pays
-            country_counts = filtered_df['country_txt'].value_counts().head(15)
-            
-            fig_countries = px.bar(
-                x=country_counts.values,
-                y=country_counts.index,
-                orientation='h',
-                title="Top 15 des pays les plus touchés",
-                labels={'x': 'Nombre d\'incidents', 'y': 'Pays'}
-            )
-            fig_countries.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
-            st.plotly_chart(fig_countries, use_container_width=True)
+            slots['country_counts'] = st.empty()
         
         with col2:
             # Top régions
-            region_counts = filtered_df['region_txt'].value_counts()
-            
-            fig_regions = px.pie(
-                values=region_counts.values,
-                names=region_counts.index,
-                title="Distribution par région"
-            )
-            fig_regions.update_layout(height=500)
-            st.plotly_chart(fig_regions, use_container_width=True)
+            slots['region_counts'] = st.empty()
         
-        # Carte mondiale si les coordonnées sont disponibles
-        if 'latitude' in filtered_df.columns and 'longitude' in filtered_df.columns:
-            map_data = filtered_df[['latitude', 'longitude', 'country_txt', 'city', 'iyear', 'attacktype1_txt']].dropna()
+        # Carte mondiale : tuiles précalculées servies par l'API, sinon points
+        tile_manifest = load_tile_manifest()
+        if tile_manifest is not None and tile_server_available():
+            st.subheader("Carte des incidents")
+            
+            col1, col2 = st.columns([3, 1])
+            
+            with col2:
+                tile_presets = list(tile_manifest['presets'])
+                tile_preset = st.selectbox(
+                    "Calque",
+                    options=tile_presets,
+                    index=tile_presets.index(tiles.preset_for(tile_manifest, selected_attacks)),
+                    format_func=tile_manifest['presets'].get
+                )
+                tile_measure = st.radio(
+                    "Mesure",
+                    options=list(tile_manifest['measures']),
+                    format_func=tile_manifest['measures'].get
+                )
+                st.caption("Calques précalculés sur toute la période, servis par l'API (make api) : seul le calque choisi s'applique.")
+            
+            with col1:
+                fig_map = go.Figure(go.Scattermapbox(lat=[], lon=[]))
+                fig_map.update_layout(
+                    mapbox=tiles.mapbox_layout(tile_preset, tile_measure, {"lat": 20, "lon": 0}, 1),
+                    height=600,
+                    margin={"r": 0, "t": 40, "l": 0, "b": 0},
+                    title=f"{tile_manifest['measures'][tile_measure]} : {tile_manifest['presets'][tile_preset]}"
+                )
+                st.plotly_chart(fig_map, use_container_width=True)
+        elif 'latitude' in filtered_df.columns and 'longitude' in filtered_df.columns:
+            map_data = filtered_df.loc[filtered_df['has_coordinates'], ['latitude', 'longitude', 'country_txt', 'city', 'iyear', 'attacktype1_txt']]
             if len(map_data) > 0:
                 st.subheader("Carte des incidents")
                 
@@ -230,6 +619,8 @@ def main():
                 )
                 fig_map.update_layout(mapbox_style="open-street-map")
                 st.plotly_chart(fig_map, use_container_width=True)
+                if tile_manifest is not None:
+                    st.caption(f"Tuiles précalculées disponibles mais API injoignable ({tiles.TILE_URL}) : affichage par points.")
     
     with tab3:
         st.header("Types d'attaques")
@@ -238,30 +629,50 @@ def main():
         
         with col1:
             # Types d'attaques
-            attack_counts = filtered_df['attacktype1_txt'].value_counts()
-            
-            fig_attacks = px.bar(
-                x=attack_counts.values,
-                y=attack_counts.index,
-                orientation='h',
-                title="Types d'attaques les plus fréquents",
-                labels={'x': 'Nombre d\'incidents', 'y': 'Type d\'attaque'}
-            )
-            fig_attacks.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
-            st.plotly_chart(fig_attacks, use_container_width=True)
+            slots['attack_counts'] = st.empty()
         
         with col2:
             # Types d'armes
-            if 'weaptype1_txt' in filtered_df.columns:
-                weapon_counts = filtered_df['weaptype1_txt'].value_counts().head(10)
-                
-                fig_weapons = px.pie(
-                    values=weapon_counts.values,
-                    names=weapon_counts.index,
-                    title="Types d'armes utilisées (Top 10)"
+            slots['weapon_counts'] = st.empty()
+        
+        # Distribution des victimes par incident : fusion des sketches des cellules sélectionnées
+        casualty_sketches = analytics.filter_incidents(load_sketches(live.version), **filters)
+        if len(casualty_sketches) > 0:
+            st.subheader("Victimes par incident")
+            
+            col1, col2 = st.columns([3, 1])
+            
+            with col2:
+                casualty_measure = st.radio(
+                    "Mesure",
+                    options=list(sketches.MEASURES),
+                    format_func=sketches.MEASURES.get,
+                    key='casualty_measure'
+                )
+                dimension_labels = {'country_txt': "Pays", 'gname': "Groupe"}
+                casualty_dimension = st.radio(
+                    "Comparer par",
+                    options=list(dimension_labels),
+                    format_func=dimension_labels.get
+                )
+                st.caption("Quantiles estimés à 1 % près en fusionnant des sketches précalculés, sur les seuls incidents au bilan renseigné. Moustaches du minimum au p99.")
+            
+            with col1:
+                attack_quantiles = sketches.measure_quantiles(casualty_sketches, casualty_measure, 'attacktype1_txt')
+                if len(attack_quantiles) > 0:
+                    st.plotly_chart(
+                        sketches.box_plot(attack_quantiles, f"{sketches.MEASURES[casualty_measure]} par incident selon le type d'attaque", sketches.MEASURES[casualty_measure]),
+                        use_container_width=True
+                    )
+                else:
+                    st.info(f"Aucun bilan renseigné pour la mesure « {sketches.MEASURES[casualty_measure]} » dans la sélection.")
+            
+            dimension_quantiles = sketches.measure_quantiles(casualty_sketches, casualty_measure, casualty_dimension, top=15)
+            if len(dimension_quantiles) > 0:
+                st.dataframe(
+                    sketches.quantile_table(dimension_quantiles).rename_axis(dimension_labels[casualty_dimension]),
+                    use_container_width=True
                 )
-                fig_weapons.update_layout(height=500)
-                st.plotly_chart(fig_weapons, use_container_width=True)
     
     with tab4:
         st.header("Analyse des cibles")
@@ -270,32 +681,14 @@ def main():
         
         with col1:
             # Types de cibles
-            if 'targtype1_txt' in filtered_df.columns:
-                target_counts = filtered_df['targtype1_txt'].value_counts().head(10)
-                
-                fig_targets = px.bar(
-                    x=target_counts.values,
-                    y=target_counts.index,
-                    orientation='h',
-                    title="Types de cibles les plus visées",
-                    labels={'x': 'Nombre d\'incidents', 'y': 'Type de cible'}
-                )
-                fig_targets.update_layout(height=500, yaxis={'categoryorder': 'total ascending'})
-                st.plotly_chart(fig_targets, use_container_width=True)
+            slots['target_counts'] = st.empty()
         
         with col2:
             # Succès des attaques
-            if 'success' in filtered_df.columns:
-                success_counts = filtered_df['success'].value_counts()
-                success_labels = {1: 'Succès', 0: 'Échec'}
-                
-                fig_success = px.pie(
-                    values=success_counts.values,
-                    names=[success_labels.get(x, f'Inconnu ({x})') for x in success_counts.index],
-                    title="Taux de succès des attaques"
-                )
-                fig_success.update_layout(height=500)
-                st.plotly_chart(fig_success, use_container_width=True)
+            slots['success_counts'] = st.empty()
+    
+    if use_preview:
+        draw_charts(slots, preview_results, estimated=True)
     
     with tab5:
         st.header("Données détaillées")
@@ -307,23 +700,43 @@ def main():
             'nkill', 'nwound', 'summary'
         ]
         
-        available_columns = [col for col in display_columns if col in filtered_df.columns]
+        # Recherche plein texte dans les résumés et motifs (index inversé)
+        store = get_text_store()
+        search_query = st.text_input("Rechercher dans les résumés (ex. Paris, bomb, nom de groupe)", "")
+        table_df = filtered_df
+        if search_query:
+            table_df = filtered_df[filtered_df['text_id'].isin(store.search(search_query))]
         
-        st.subheader(f"Échantillon des données ({len(filtered_df):,} incidents)")
+        available_columns = [col for col in display_columns if col in table_df.columns]
+        
+        # Les résumés ne sont relus que pour les lignes affichées
+        st.subheader(f"Échantillon des données ({len(table_df):,} incidents)")
         st.dataframe(
-            filtered_df[available_columns].head(1000),
+            store.attach(table_df[available_columns + ['text_id']].head(1000), ['summary']).drop(columns='text_id'),
             use_container_width=True
         )
         
         # Option de téléchargement
         if st.button("Télécharger les données filtrées (CSV)"):
-            csv = filtered_df.to_csv(index=False)
+            csv = session_memory.get_or_build('csv', view, lambda: store.attach(filtered_df).drop(columns='text_id').to_csv(index=False))
             st.download_button(
                 label="Télécharger CSV",
                 data=csv,
                 file_name=f"terrorism_data_{datetime.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv"
             )
+    
+    with tab6:
+        st.header("Exploration croisée")
+        render_crossfilter(filtered_df, view)
+    
+    with tab7:
+        st.header("Flux en direct")
+        render_live_feed()
+    
+    # Résultats exacts (remplacent l'aperçu le cas échéant)
+    results = {name: future.result() for name, future in futures.items()}
+    draw_charts(slots, results)
 
 if __name__ == "__main__":
     main()
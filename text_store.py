@@ -0,0 +1,210 @@
+"""Stockage compact des colonnes de texte libre (résumé, motif)
+
+Les textes sont retirés du DataFrame au chargement et écrits une fois sur disque :
+- `<colonne>.bin` : blocs de BLOCK_ROWS textes, encodés en JSON puis compressés (zlib)
+- `<colonne>.idx.npy` : position de chaque bloc dans le fichier .bin
+- `terms.json`, `term_offsets.npy`, `postings.npy` : index inversé terme -> lignes
+
+Le DataFrame ne garde qu'une colonne `text_id` ; les textes sont relus via mmap
+uniquement pour les lignes affichées.
+
+Le stockage n'est jamais réécrit en place : il est construit dans un répertoire
+temporaire voisin puis substitué à l'ancien (os.replace). Un `TextStore` déjà
+ouvert continue de lire l'ancienne version, dont les fichiers restent valides
+tant qu'ils sont projetés en mémoire.
+"""
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = '.text_store'
+TEXT_COLUMNS = ['summary', 'motive']
+BLOCK_ROWS = 64
+MAX_CACHED_BLOCKS = 256
+
+_TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Termes en minuscules d'un texte"""
+    return _TOKEN.findall(text.lower())
+
+
+def detach_text(df, directory=STORE_DIR, columns=TEXT_COLUMNS):
+    """Retire les colonnes de texte du DataFrame, en (re)construisant le stockage si nécessaire"""
+    columns = [col for col in columns if col in df.columns]
+    df = df.reset_index(drop=True)
+    df['text_id'] = np.arange(len(df), dtype=np.int32)
+    signature = _signature(df, columns)
+    if _read_meta(directory).get('signature') != signature:
+        build_store(df, directory, columns, signature)
+    return df.drop(columns=columns)
+
+
+def build_store(df, directory, columns, signature=None):
+    """Écrit les blocs compressés, leurs positions et l'index inversé dans un répertoire temporaire, puis le met en place"""
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    building = tempfile.mkdtemp(prefix=os.path.basename(directory) + '.tmp-', dir=parent)
+    try:
+        for column in columns:
+            values = df[column].astype(object).where(df[column].notna(), None).tolist()
+            offsets = [0]
+            with open(os.path.join(building, f'{column}.bin'), 'wb') as f:
+                for start in range(0, len(values), BLOCK_ROWS):
+                    block = zlib.compress(json.dumps(values[start:start + BLOCK_ROWS]).encode('utf-8'))
+                    f.write(block)
+                    offsets.append(offsets[-1] + len(block))
+            np.save(os.path.join(building, f'{column}.idx.npy'), np.array(offsets, dtype=np.int64))
+
+        _build_index(df, building, columns)
+        with open(os.path.join(building, 'meta.json'), 'w') as f:
+            json.dump({'signature': signature, 'columns': columns, 'rows': len(df)}, f)
+        _swap(building, directory)
+    finally:
+        shutil.rmtree(building, ignore_errors=True)
+
+
+def _swap(building, directory):
+    """Remplace le stockage par le répertoire construit ; l'ancien est mis de côté puis supprimé"""
+    retired = None
+    if os.path.exists(directory):
+        retired = tempfile.mkdtemp(prefix=os.path.basename(directory) + '.old-', dir=os.path.dirname(os.path.abspath(directory)))
+        os.replace(directory, retired)
+    try:
+        os.replace(building, directory)
+    except OSError:
+        # Un autre processus a mis en place sa version entre-temps (même source, même contenu)
+        pass
+    if retired is not None:
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+def _build_index(df, directory, columns):
+    """Index inversé : pour chaque terme, les `text_id` triés des lignes qui le contiennent"""
+    pairs = []
+    for column in columns:
+        tokens = df[column].dropna().astype(str).str.lower().str.findall(_TOKEN.pattern)
+        exploded = tokens.explode().dropna()
+        pairs.append(pd.DataFrame({
+            'term': exploded.to_numpy(dtype=object),
+            'row': df['text_id'].to_numpy()[exploded.index.to_numpy()],
+        }))
+    if not pairs:
+        # Aucune colonne de texte : index vide
+        pairs.append(pd.DataFrame({'term': np.empty(0, dtype=object), 'row': np.empty(0, dtype=np.int32)}))
+    postings = pd.concat(pairs, ignore_index=True).drop_duplicates()
+    codes, terms = pd.factorize(postings['term'], sort=True)
+    order = np.lexsort((postings['row'].to_numpy(), codes))
+    counts = np.bincount(codes, minlength=len(terms))
+
+    np.save(os.path.join(directory, 'postings.npy'), postings['row'].to_numpy()[order].astype(np.int32))
+    np.save(os.path.join(directory, 'term_offsets.npy'), np.concatenate(([0], np.cumsum(counts))).astype(np.int64))
+    with open(os.path.join(directory, 'terms.json'), 'w', encoding='utf-8') as f:
+        json.dump(list(terms), f, ensure_ascii=False)
+
+
+def _signature(df, columns):
+    """Empreinte des données source, pour savoir si le stockage est à jour"""
+    key = df['eventid'] if 'eventid' in df.columns else df['text_id']
+    return f"{len(df)}:{','.join(columns)}:{int(pd.util.hash_pandas_object(key, index=False).sum())}"
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class TextStore:
+    """Accès en lecture aux textes (par `text_id`) et recherche plein texte"""
+
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+        self.columns = _read_meta(directory).get('columns', [])
+        self._files = {}
+        self._maps = {}
+        self._offsets = {}
+        for column in self.columns:
+            self._files[column] = open(os.path.join(directory, f'{column}.bin'), 'rb')
+            self._maps[column] = mmap.mmap(self._files[column].fileno(), 0, access=mmap.ACCESS_READ)
+            self._offsets[column] = np.load(os.path.join(directory, f'{column}.idx.npy'))
+        # Blocs décompressés récemment lus, partagés par les sessions (accès sous verrou)
+        self._blocks = OrderedDict()
+        self._blocks_lock = threading.Lock()
+
+        try:
+            with open(os.path.join(directory, 'terms.json'), encoding='utf-8') as f:
+                self.terms = json.load(f)
+            self.term_offsets = np.load(os.path.join(directory, 'term_offsets.npy'))
+            self.postings = np.load(os.path.join(directory, 'postings.npy'), mmap_mode='r')
+        except (OSError, ValueError):
+            # Stockage absent ou incomplet : aucune ligne ne correspond aux recherches
+            self.terms = []
+            self.term_offsets = np.zeros(1, dtype=np.int64)
+            self.postings = np.empty(0, dtype=np.int32)
+
+    def _block(self, column, block_id):
+        key = (column, block_id)
+        with self._blocks_lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                return block
+        # Décompression hors verrou : deux sessions peuvent décoder le même bloc, sans conséquence
+        offsets = self._offsets[column]
+        raw = self._maps[column][offsets[block_id]:offsets[block_id + 1]]
+        block = json.loads(zlib.decompress(raw))
+        with self._blocks_lock:
+            self._blocks[key] = block
+            while len(self._blocks) > MAX_CACHED_BLOCKS:
+                self._blocks.popitem(last=False)
+        return block
+
+    def fetch(self, column, text_ids):
+        """Textes d'une colonne pour les `text_id` donnés (None si absent ou négatif)"""
+        if column not in self._maps:
+            return [None] * len(text_ids)
+        # text_id négatif : ligne ajoutée après la construction du stockage (ingestion continue)
+        return [
+            self._block(column, int(text_id) // BLOCK_ROWS)[int(text_id) % BLOCK_ROWS] if text_id >= 0 else None
+            for text_id in text_ids
+        ]
+
+    def attach(self, df, columns=None):
+        """Copie du DataFrame avec les colonnes de texte rechargées (en fin de tableau)"""
+        df = df.copy()
+        for column in columns or self.columns:
+            if column in self.columns:
+                df[column] = self.fetch(column, df['text_id'].to_numpy())
+        return df
+
+    def _term_rows(self, token):
+        """Lignes contenant un terme commençant par `token`"""
+        start = bisect_left(self.terms, token)
+        end = bisect_left(self.terms, token + '\U0010ffff', start)
+        if start == end:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.asarray(self.postings[self.term_offsets[start]:self.term_offsets[end]]))
+
+    def search(self, query):
+        """`text_id` des lignes contenant tous les termes de la requête (préfixes acceptés)"""
+        tokens = tokenize(query)
+        if not tokens:
+            return np.empty(0, dtype=np.int32)
+        rows = self._term_rows(tokens[0])
+        for token in tokens[1:]:
+            rows = np.intersect1d(rows, self._term_rows(token), assume_unique=True)
+        return rows
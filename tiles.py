@@ -0,0 +1,264 @@
+"""Tuiles raster précalculées des couches d'incidents (carte mondiale et carte France)
+
+Les incidents sont projetés en Web Mercator puis accumulés pixel par pixel, par
+niveau de zoom, pour chaque calque (tous les incidents ou un type d'attaque) et
+chaque mesure (incidents ou victimes). Seules les tuiles non vides sont écrites,
+en PNG 256 x 256 à palette transparente, dans .tiles/<calque>/<mesure>/<z>/<x>/<y>.png.
+Les tuiles sont servies par api.py (/tiles/...) : la carte n'envoie plus aucun
+point au navigateur et n'a besoin d'aucun fond de carte externe. L'adresse de
+l'API, telle que le navigateur la voit, se règle par la variable d'environnement
+TILE_URL (défaut http://127.0.0.1:8000).
+
+Usage : python tiles.py [--max-zoom 6] [--france-max-zoom 10]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+import urllib.request
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+import data_loader
+
+TILE_DIR = '.tiles'
+MANIFEST_FILE = 'manifest.json'
+TILE_SIZE = 256
+# Adresse de l'API qui sert les tuiles (api.py)
+TILE_URL = os.environ.get('TILE_URL', 'http://127.0.0.1:8000').rstrip('/')
+# Chemin des tuiles sous cette adresse ({z}/{x}/{y} sont remplacés par la carte)
+TILE_PATH = '/tiles/{preset}/{measure}/{{z}}/{{x}}/{{y}}.png'
+
+# Rayon (pixels) du disque dessiné pour chaque incident
+POINT_RADIUS = 2
+# Zooms supplémentaires rendus uniquement sur l'emprise de la France métropolitaine
+FRANCE_BOUNDS = (41.0, 51.5, -5.5, 10.0)
+
+MEASURES = {
+    'incidents': "Incidents",
+    'victimes': "Victimes (tués + blessés)",
+}
+
+# Palette 8 bits : entrée 0 transparente, puis dégradé jaune -> rouge foncé
+# d'opacité croissante avec la densité
+_RAMP = np.linspace(0.0, 1.0, 255)[:, None]
+PALETTE = np.vstack([[0, 0, 0], [255, 237, 160] + ([189, 0, 38] - np.array([255, 237, 160])) * _RAMP]).astype(np.uint8)
+ALPHA = bytes([0] + [int(90 + 165 * level) for level in _RAMP[:, 0]])
+
+def project(latitude, longitude, zoom):
+    """Coordonnées pixel Web Mercator globales au niveau `zoom`"""
+    scale = TILE_SIZE * 2 ** zoom
+    latitude = np.clip(latitude, -85.0511, 85.0511)
+    x = (longitude + 180.0) / 360.0 * scale
+    y = (1.0 - np.log(np.tan(np.radians(latitude)) + 1.0 / np.cos(np.radians(latitude))) / np.pi) / 2.0 * scale
+    return x, y
+
+
+def tile_range(bounds, zoom):
+    """Tuiles (x_min, x_max, y_min, y_max) couvrant l'emprise (lat_min, lat_max, lon_min, lon_max)"""
+    lat_min, lat_max, lon_min, lon_max = bounds
+    x_min, y_min = project(np.array([lat_max]), np.array([lon_min]), zoom)
+    x_max, y_max = project(np.array([lat_min]), np.array([lon_max]), zoom)
+    return int(x_min[0] // TILE_SIZE), int(x_max[0] // TILE_SIZE), int(y_min[0] // TILE_SIZE), int(y_max[0] // TILE_SIZE)
+
+
+def presets(df):
+    """Calques précalculés : tous les incidents puis chaque type d'attaque, {identifiant: (libellé, masque)}"""
+    result = {'tous': ("Tous les incidents", np.ones(len(df), dtype=bool))}
+    for position, attack in enumerate(sorted(df['attacktype1_txt'].dropna().unique())):
+        result[f"attaque-{position:02d}"] = (attack, (df['attacktype1_txt'] == attack).to_numpy())
+    return result
+
+
+def render_level(x, y, weights, zoom, cap, tile_filter=None):
+    """Tuiles d'un niveau de zoom : {(x, y): image RGBA}, pour des points en pixels globaux"""
+    radius = POINT_RADIUS
+    size = TILE_SIZE + 2 * radius
+    pixel_x = np.floor(x).astype(np.int64)
+    pixel_y = np.floor(y).astype(np.int64)
+
+    # Un point peut déborder sur les tuiles voisines : il est affecté à chacune
+    tiles_x = np.stack([(pixel_x - radius) // TILE_SIZE, (pixel_x + radius) // TILE_SIZE])
+    tiles_y = np.stack([(pixel_y - radius) // TILE_SIZE, (pixel_y + radius) // TILE_SIZE])
+    candidates = []
+    for i in range(2):
+        for j in range(2):
+            candidates.append(np.stack([tiles_x[i], tiles_y[j], np.arange(len(x))], axis=1))
+    candidates = np.unique(np.concatenate(candidates), axis=0)
+    count = 2 ** zoom
+    candidates = candidates[(candidates[:, 0] >= 0) & (candidates[:, 0] < count) & (candidates[:, 1] >= 0) & (candidates[:, 1] < count)]
+    if tile_filter is not None:
+        candidates = candidates[tile_filter(candidates[:, 0], candidates[:, 1])]
+
+    images = {}
+    boundaries = np.flatnonzero(np.any(np.diff(candidates[:, :2], axis=0) != 0, axis=1)) + 1
+    for group in np.split(candidates, boundaries):
+        if len(group) == 0:
+            continue
+        tile_x, tile_y = int(group[0, 0]), int(group[0, 1])
+        points = group[:, 2]
+        local_x = pixel_x[points] - tile_x * TILE_SIZE + radius
+        local_y = pixel_y[points] - tile_y * TILE_SIZE + radius
+        inside = (local_x >= 0) & (local_x < size) & (local_y >= 0) & (local_y < size)
+        grid = np.bincount(
+            local_y[inside] * size + local_x[inside],
+            weights=weights[points][inside],
+            minlength=size * size
+        ).reshape(size, size)
+        if not grid.any():
+            continue
+        images[(tile_x, tile_y)] = colorize(spread(grid, radius)[radius:-radius, radius:-radius], cap)
+    return images
+
+
+def spread(grid, radius):
+    """Somme de chaque pixel sur un carré de rayon `radius` (sommes cumulées)"""
+    padded = np.pad(grid, radius + 1)
+    cumulative = padded.cumsum(axis=0).cumsum(axis=1)
+    width = 2 * radius + 1
+    return (cumulative[width:, width:] - cumulative[:-width, width:] - cumulative[width:, :-width] + cumulative[:-width, :-width])[:grid.shape[0], :grid.shape[1]]
+
+
+def colorize(values, cap):
+    """Image en palette d'une grille de densité, échelle logarithmique bornée par `cap`"""
+    intensity = np.clip(np.log1p(values) * (254 / np.log1p(max(cap, 1.0))), 0, 254)
+    levels = np.where(values > 0, intensity.astype(np.uint8) + 1, 0).astype(np.uint8)
+    image = Image.fromarray(levels, 'P')
+    image.putpalette(PALETTE.tobytes())
+    image.info['transparency'] = ALPHA
+    return image
+
+
+def level_cap(x, y, weights, zoom):
+    """Valeur de référence du dégradé à ce zoom : densité du pixel le plus chargé (identique pour toutes les tuiles)"""
+    width = TILE_SIZE * 2 ** zoom
+    pixels = np.floor(y).astype(np.int64) * width + np.floor(x).astype(np.int64)
+    _, inverse = np.unique(pixels, return_inverse=True)
+    return float(np.bincount(inverse, weights=weights).max()) if len(pixels) else 1.0
+
+
+def build_tiles(df, directory=TILE_DIR, max_zoom=6, france_max_zoom=10):
+    """Rend toutes les tuiles non vides de chaque calque et mesure, retourne le manifeste"""
+    df = df[df['has_coordinates']]
+    latitude = df['latitude'].to_numpy(dtype=np.float64)
+    longitude = df['longitude'].to_numpy(dtype=np.float64)
+    measures = {
+        'incidents': np.ones(len(df)),
+        'victimes': (df['nkill'] + df['nwound']).to_numpy(dtype=np.float64),
+    }
+
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    manifest = {'presets': {}, 'measures': MEASURES, 'max_zoom': max_zoom, 'france_max_zoom': france_max_zoom, 'tiles': 0}
+    for preset, (label, mask) in presets(df).items():
+        manifest['presets'][preset] = label
+        for zoom in range(0, max(max_zoom, france_max_zoom) + 1):
+            tile_filter = None
+            if zoom > max_zoom:
+                # Au-delà du zoom mondial, seule l'emprise de la France est rendue
+                x_min, x_max, y_min, y_max = tile_range(FRANCE_BOUNDS, zoom)
+                tile_filter = lambda tx, ty: (tx >= x_min) & (tx <= x_max) & (ty >= y_min) & (ty <= y_max)
+            x, y = project(latitude[mask], longitude[mask], zoom)
+            for measure, weights in measures.items():
+                weights = weights[mask]
+                cap = level_cap(x, y, weights, zoom)
+                for (tile_x, tile_y), image in render_level(x, y, weights, zoom, cap, tile_filter).items():
+                    path = os.path.join(directory, preset, measure, str(zoom), str(tile_x), f"{tile_y}.png")
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    image.save(path)
+                    manifest['tiles'] += 1
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, ensure_ascii=False)
+    return manifest
+
+
+def find_tile_dir():
+    """Répertoire des tuiles s'il a été construit, sinon None"""
+    for base in data_loader.SEARCH_DIRS:
+        directory = os.path.join(base, TILE_DIR)
+        if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            return directory
+    return None
+
+
+def read_manifest(directory=None):
+    """Manifeste des tuiles (calques, mesures, zooms), None si elles n'ont pas été construites"""
+    directory = directory or find_tile_dir()
+    if directory is None:
+        return None
+    with open(os.path.join(directory, MANIFEST_FILE), encoding='utf-8') as manifest_file:
+        return json.load(manifest_file)
+
+
+def preset_for(manifest, attacks):
+    """Calque correspondant aux types d'attaque sélectionnés (tous, ou un seul type), sinon 'tous'"""
+    if len(attacks) == 1:
+        for preset, label in manifest['presets'].items():
+            if label == attacks[0]:
+                return preset
+    return 'tous'
+
+
+def tile_layers(preset, measure, opacity=0.85):
+    """Couche raster Mapbox pointant vers les tuiles locales"""
+    return [{
+        'below': 'traces',
+        'sourcetype': 'raster',
+        'source': [TILE_URL + TILE_PATH.format(preset=preset, measure=measure)],
+        'opacity': opacity,
+    }]
+
+
+def mapbox_layout(preset, measure, center, zoom):
+    """Mise en page Mapbox hors ligne : fond blanc et tuiles locales du calque"""
+    return dict(
+        style='white-bg',
+        layers=tile_layers(preset, measure),
+        center=center,
+        zoom=zoom,
+    )
+
+
+def server_available(url=None, timeout=1.0):
+    """Vrai si l'API des tuiles répond sur /health (sinon la carte revient aux points)"""
+    try:
+        with urllib.request.urlopen(f"{url or TILE_URL}/health", timeout=timeout) as response:
+            return response.status == 200
+    except (OSError, ValueError):
+        return False
+
+
+def empty_tile():
+    """Tuile PNG transparente (réponse pour les tuiles sans incident)"""
+    buffer = BytesIO()
+    Image.new('RGBA', (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0)).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Précalcule les tuiles des couches d'incidents")
+    parser.add_argument('--output', default=TILE_DIR, help="Répertoire des tuiles")
+    parser.add_argument('--max-zoom', type=int, default=6, help="Zoom maximal de la carte mondiale")
+    parser.add_argument('--france-max-zoom', type=int, default=10, help="Zoom maximal sur la France")
+    args = parser.parse_args()
+
+    try:
+        df = data_loader.read_dataset()
+    except FileNotFoundError as e:
+        print(f"[KO] {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    manifest = build_tiles(df, args.output, max_zoom=args.max_zoom, france_max_zoom=args.france_max_zoom)
+    elapsed = time.perf_counter() - start
+    print(f"[OK] {manifest['tiles']:,} tuiles écrites dans {args.output} en {elapsed:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Analyse de tendances en lot : toutes les entités (pays, groupes) traitées ensemble
+
+Les comptages sont rangés dans une matrice entités x années ; moyennes glissantes,
+variations annuelles, anomalies et ruptures sont calculées par opérations NumPy
+sur toute la matrice, sans boucle par entité.
+"""
+import numpy as np
+import pandas as pd
+
+
+def count_matrix(df, column):
+    """Matrice (entités x années) du nombre d'incidents, années manquantes à zéro"""
+    df = df[df[column].notna()]
+    codes, entities = pd.factorize(df[column], sort=True)
+    first_year = int(df['iyear'].min())
+    years = np.arange(first_year, int(df['iyear'].max()) + 1)
+    cells = codes * len(years) + (df['iyear'].to_numpy(dtype=np.int64) - first_year)
+    counts = np.bincount(cells, minlength=len(entities) * len(years))
+    return pd.DataFrame(counts.reshape(len(entities), len(years)), index=entities, columns=years)
+
+
+def rolling_mean(matrix, window):
+    """Moyenne glissante sur les `window` dernières années (fenêtre tronquée au début)"""
+    cumulative = np.cumsum(matrix, axis=1, dtype=np.float64)
+    shifted = np.zeros_like(cumulative)
+    shifted[:, window:] = cumulative[:, :-window]
+    lengths = np.minimum(np.arange(1, matrix.shape[1] + 1), window)
+    return (cumulative - shifted) / lengths
+
+
+def anomaly_scores(matrix, window):
+    """Écart de chaque année à la moyenne des `window` années précédentes, en écarts-types
+
+    L'écart-type est borné par le bas (racine de la moyenne, bruit de Poisson) pour
+    ne pas signaler les petites variations des séries presque constantes.
+    """
+    values = matrix.astype(np.float64)
+    cumulative = np.concatenate([np.zeros((len(values), 1)), np.cumsum(values, axis=1)], axis=1)
+    cumulative_sq = np.concatenate([np.zeros((len(values), 1)), np.cumsum(values ** 2, axis=1)], axis=1)
+
+    columns = np.arange(values.shape[1])
+    start = np.maximum(columns - window, 0)
+    lengths = columns - start
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (cumulative[:, columns] - cumulative[:, start]) / lengths
+        variance = (cumulative_sq[:, columns] - cumulative_sq[:, start]) / lengths - mean ** 2
+        scale = np.sqrt(np.maximum(variance, np.maximum(mean, 1.0)))
+        scores = (values - mean) / scale
+    scores[:, lengths < 2] = 0.0
+    return np.nan_to_num(scores)
+
+
+def change_points(matrix):
+    """Année de rupture la plus marquée de chaque série (rupture unique de moyenne)
+
+    Pour chaque découpage possible, statistique |moyenne après - moyenne avant|
+    pondérée par sqrt(t (n - t) / n) ; on garde le découpage maximal par ligne.
+    """
+    values = matrix.astype(np.float64)
+    n = values.shape[1]
+    if n < 2:
+        return np.zeros(len(values), dtype=np.int64), np.zeros(len(values))
+    cumulative = np.cumsum(values, axis=1)
+    total = cumulative[:, -1:]
+    t = np.arange(1, n)
+    mean_before = cumulative[:, :-1] / t
+    mean_after = (total - cumulative[:, :-1]) / (n - t)
+    statistic = np.abs(mean_after - mean_before) * np.sqrt(t * (n - t) / n)
+    best = np.argmax(statistic, axis=1)
+    scale = np.sqrt(np.maximum(values.var(axis=1), 1.0))
+    return best + 1, statistic[np.arange(len(values)), best] / scale
+
+
+def trend_table(counts, window=5, end_year=None, z_threshold=3.0):
+    """Classement « menace croissante » : dernière fenêtre comparée à la précédente, pour toutes les entités"""
+    if end_year is not None:
+        counts = counts.loc[:, :end_year]
+    matrix = counts.to_numpy()
+    years = counts.columns.to_numpy()
+    recent = matrix[:, -window:]
+    previous = matrix[:, -2 * window:-window]
+
+    recent_mean = recent.mean(axis=1)
+    previous_mean = previous.mean(axis=1) if previous.shape[1] else np.zeros(len(matrix))
+    # Pente (moindres carrés) sur la dernière fenêtre
+    x = np.arange(recent.shape[1]) - (recent.shape[1] - 1) / 2
+    slope = (recent * x).sum(axis=1) / max((x ** 2).sum(), 1)
+
+    scores = anomaly_scores(matrix, window)
+    change_index, change_strength = change_points(matrix)
+    yoy = matrix[:, -1] - matrix[:, -2] if matrix.shape[1] > 1 else np.zeros(len(matrix))
+
+    table = pd.DataFrame({
+        'Incidents (fenêtre récente)': recent.sum(axis=1),
+        'Moyenne récente': recent_mean.round(1),
+        'Moyenne précédente': previous_mean.round(1),
+        'Croissance (%)': np.round((recent_mean - previous_mean) / np.maximum(previous_mean, 1) * 100, 1),
+        'Pente (incidents/an)': slope.round(2),
+        'Variation dernière année': yoy,
+        'Anomalies récentes': (scores[:, -window:] > z_threshold).sum(axis=1),
+        'Année de rupture': years[change_index],
+        'Force de la rupture': change_strength.round(2),
+    }, index=counts.index)
+    # Score de menace : croissance absolue de la moyenne, pénalisée pour les très petits effectifs
+    table['Score'] = ((recent_mean - previous_mean) * np.sqrt(recent_mean)).round(2)
+    return table.sort_values('Score', ascending=False)
+
+
+def entity_series(counts, entity, window=5, z_threshold=3.0):
+    """Série d'une entité avec moyenne glissante et anomalies (calculées sur toute la matrice)"""
+    row = counts.index.get_loc(entity)
+    matrix = counts.to_numpy()
+    return pd.DataFrame({
+        'incidents': matrix[row],
+        'moyenne_glissante': rolling_mean(matrix[row:row + 1], window)[0],
+        'anomalie': anomaly_scores(matrix[row:row + 1], window)[0] > z_threshold,
+    }, index=counts.columns)